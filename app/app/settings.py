@@ -37,11 +37,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
-    'core',
-    'user',
-    'recipe',
+    'core.apps.CoreConfig',
+    'user.apps.UserConfig',
+    'recipe.apps.RecipeConfig',
 ]
 
 MIDDLEWARE = [
@@ -96,6 +97,53 @@ DATABASES = {
 }
 
 
+"""
+Local memory cache by default. A cache shared by every process
+is configured in production through the environment, eg:
+CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache
+CACHE_LOCATION=memcached:11211
+"""
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+"""
+Cache alias and timeout (seconds) of the tag and ingredient
+list responses, see recipe.cache
+"""
+RECIPE_LIST_CACHE = os.environ.get('RECIPE_LIST_CACHE', 'default')
+RECIPE_LIST_CACHE_TIMEOUT = 300
+
+"""
+Cache of the users authenticated by a token, see user.authentication:
+size and TTL (seconds) of the cache of each process, and the optional
+cache alias shared by the processes with its TTL.
+A deleted token or a deactivated user is accepted by the other processes
+for TOKEN_AUTH_CACHE_TTL seconds at most.
+"""
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 30
+TOKEN_AUTH_SHARED_CACHE = os.environ.get('TOKEN_AUTH_SHARED_CACHE')
+TOKEN_AUTH_SHARED_CACHE_TTL = 300
+
+"""
+Signed access and refresh tokens, see user.tokens (opt-in):
+their lifetimes (seconds), and the cache alias of their deny-list,
+which must be shared by every process (checked by user.checks,
+the tokens are refused meanwhile).
+"""
+SIGNED_TOKENS = os.environ.get('SIGNED_TOKENS', '') == '1'
+SIGNED_TOKEN_ACCESS_TTL = 300
+SIGNED_TOKEN_REFRESH_TTL = 14 * 24 * 3600
+SIGNED_TOKEN_DENY_CACHE = os.environ.get('SIGNED_TOKEN_DENY_CACHE')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -114,6 +162,49 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+"""
+The passwords are hashed with PBKDF2, with the iterations picked for
+the servers by the tune_password_hasher command.
+The other hashers verify the passwords hashed before.
+"""
+PASSWORD_HASHERS = [
+    'user.hashers.TunablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+PASSWORD_HASHER_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASHER_ITERATIONS', 120000)
+)
+
+"""
+Threads serving the requests in each process (eg: gunicorn --threads,
+1 for the sync workers), which the limits below must stay under
+"""
+REQUEST_THREADS = int(os.environ.get('REQUEST_THREADS', 8))
+
+"""
+Threads hashing the passwords of the login and signup requests,
+and how many passwords can be hashed or waiting before answering 503,
+see user.hashing: in each process (a quarter of its request threads),
+and in every process together, counted in the optional cache alias
+PASSWORD_HASHING_SHARED_CACHE shared by the processes, which is needed
+to shed anything with single-threaded workers.
+"""
+PASSWORD_HASHING_MAX_PENDING = int(os.environ.get(
+    'PASSWORD_HASHING_MAX_PENDING',
+    max(REQUEST_THREADS // 4, 1)
+))
+PASSWORD_HASHING_WORKERS = int(os.environ.get(
+    'PASSWORD_HASHING_WORKERS',
+    min(2, PASSWORD_HASHING_MAX_PENDING)
+))
+PASSWORD_HASHING_SHARED_CACHE = os.environ.get('PASSWORD_HASHING_SHARED_CACHE')
+PASSWORD_HASHING_MAX_SHARED_PENDING = int(
+    os.environ.get('PASSWORD_HASHING_MAX_SHARED_PENDING', 4)
+)
+PASSWORD_HASHING_SHARED_TIMEOUT = 60
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
@@ -151,6 +242,52 @@ All the static files will list when accessing 127.0.0.1:8000/static
 """
 MEDIA_URL = '/media/'
 
+"""
+Serving of the media files by core.views.serve_media:
+how long the clients can cache them (seconds), and the front server
+sending them, if any: 'x-sendfile' or 'x-accel-redirect' (nginx, with
+an internal location serving MEDIA_ROOT at MEDIA_ACCEL_REDIRECT_LOCATION)
+"""
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 3600
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE')
+MEDIA_ACCEL_REDIRECT_LOCATION = '/protected-media/'
+
+"""
+Resized copies of the recipe images made by process_image_jobs:
+the box (width, height) each variant fits in, and the formats of each.
+"""
+RECIPE_IMAGE_VARIANTS = {
+    'thumb': (200, 200),
+    'medium': (800, 800),
+}
+RECIPE_IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+
+"""
+Seconds before the first retry of a failed image job,
+doubled with each attempt up to the maximum
+"""
+RECIPE_IMAGE_JOB_RETRY_DELAY = 30
+RECIPE_IMAGE_JOB_MAX_RETRY_DELAY = 3600
+
+"""
+Largest recipe image accepted, in bytes and in pixels, checked from
+the header of the uploads before decoding them (see recipe.images).
+Pillow refuses to open the images of twice the pixels anywhere.
+"""
+RECIPE_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+RECIPE_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+"""
+Chunked uploads of the recipe images, see recipe.uploads:
+the directory of the partial files, outside of MEDIA_ROOT so they're
+never served, the largest file and chunk accepted (bytes), and the hours
+without a chunk after which expire_image_uploads deletes an upload.
+"""
+RECIPE_UPLOAD_DIR = '/vol/web/uploads'
+RECIPE_UPLOAD_MAX_SIZE = RECIPE_IMAGE_MAX_BYTES
+RECIPE_UPLOAD_MAX_CHUNK = 8 * 1024 * 1024
+RECIPE_UPLOAD_EXPIRY_HOURS = 24
+
 
 """
 Setting that our default user model will be the one in core.User
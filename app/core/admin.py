@@ -33,3 +33,8 @@ admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
 admin.site.register(models.Recipe)
+admin.site.register(models.ImportCheckpoint)
+admin.site.register(models.ImageJob)
+admin.site.register(models.ImageVariant)
+admin.site.register(models.ImageUpload)
+admin.site.register(models.ImageBlob)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """ Connecting the signal receivers of the core models """
+        import core.signals  # noqa: F401
@@ -0,0 +1,193 @@
+from django.db import connection
+
+from core.models import Recipe
+
+
+"""
+The id array columns of Recipe and the ManyToMany field each one mirrors.
+"""
+RELATION_COLUMNS = (
+    ('ingredient_ids', 'ingredients'),
+    ('tag_ids', 'tags'),
+)
+
+"""
+Text search configuration of Recipe.search_vector.
+Queries must use the same one for matching the stored lexemes.
+"""
+SEARCH_CONFIG = 'english'
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _recipe_column(name):
+    return f'{_quote(Recipe._meta.db_table)}.{_quote(name)}'
+
+
+def _join_table(field_name):
+    """
+    Join table of a ManyToMany field of Recipe,
+    with its column pointing to the recipe and the one to the other model.
+    """
+
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through._meta
+    source = through.get_field(field.m2m_field_name()).column
+    target = through.get_field(field.m2m_reverse_field_name()).column
+
+    return (
+        _quote(through.db_table),
+        _quote(source),
+        _quote(target),
+        field.related_model._meta,
+    )
+
+
+def _relation_ids_sql(field_name):
+    """
+    SQL expression computing the sorted ids of a ManyToMany relation
+    of the recipe row being updated or selected.
+    """
+
+    table, source, target, _ = _join_table(field_name)
+
+    return (
+        f'ARRAY(SELECT {target} FROM {table} '
+        f'WHERE {source} = {_recipe_column("id")} ORDER BY {target})'
+    )
+
+
+def _relation_names_sql(field_name):
+    """
+    SQL expression concatenating the names of the objects related
+    to the recipe row being updated or selected.
+    """
+
+    table, source, target, related = _join_table(field_name)
+    related_table = _quote(related.db_table)
+
+    return (
+        f"COALESCE((SELECT string_agg(r.{_quote('name')}, ' ') "
+        f'FROM {table} JOIN {related_table} r ON r.id = {target} '
+        f'WHERE {source} = {_recipe_column("id")}), \'\')'
+    )
+
+
+def _search_vector_sql():
+    """
+    SQL expression of the search document of the recipe row:
+    the title weighted A, the tag and ingredient names weighted B.
+    """
+
+    def weighted(text, weight):
+        return (
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', {text}), '{weight}')"
+        )
+
+    return ' || '.join([
+        weighted(f"COALESCE({_recipe_column('title')}, '')", 'A'),
+        weighted(_relation_names_sql('tags'), 'B'),
+        weighted(_relation_names_sql('ingredients'), 'B'),
+    ])
+
+
+def _denormalized_columns():
+    """
+    Every column of Recipe derived from other rows,
+    with the SQL expression computing it.
+    """
+
+    columns = [
+        (column, _relation_ids_sql(field_name))
+        for column, field_name in RELATION_COLUMNS
+    ]
+    columns.append(('search_vector', _search_vector_sql()))
+
+    return columns
+
+
+def lock_recipes(recipe_ids):
+    """
+    Lock the rows of the recipes until the end of the transaction,
+    in the order of their ids so that concurrent lockers can't deadlock
+    """
+
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        list(
+            Recipe.objects.select_for_update()
+            .filter(id__in=recipe_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+
+
+def refresh_recipe_relations(recipe_ids):
+    """
+    Rewrite the id arrays and the search vector of the given recipes
+    from their title and their join tables, in a single UPDATE.
+    Return the number of recipes updated.
+    """
+
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return 0
+
+    assignments = ', '.join(
+        f'{_quote(column)} = {sql}'
+        for column, sql in _denormalized_columns()
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {_quote(Recipe._meta.db_table)} SET {assignments} '
+            f'WHERE id = ANY(%s)',
+            [recipe_ids]
+        )
+        return cursor.rowcount
+
+
+def find_inconsistent_recipes(recipe_ids):
+    """
+    Return the ids, among the given ones, of the recipes whose id arrays
+    or search vector differ from what refresh_recipe_relations computes.
+    """
+
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return []
+
+    differences = ' OR '.join(
+        f'{_quote(column)} IS DISTINCT FROM {sql}'
+        for column, sql in _denormalized_columns()
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM {_quote(Recipe._meta.db_table)} '
+            f'WHERE id = ANY(%s) AND ({differences}) ORDER BY id',
+            [recipe_ids]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def recipe_id_batches(batch_size):
+    """
+    Yield the ids of every recipe in ascending batches,
+    selecting each batch after the last id of the previous one.
+    """
+
+    last_id = 0
+    while True:
+        batch = list(
+            Recipe.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return
+
+        yield batch
+        last_id = batch[-1]
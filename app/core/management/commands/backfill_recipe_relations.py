@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.denormalize import recipe_id_batches, refresh_recipe_relations
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Django command to rebuild the tag and ingredient id arrays
+    and the search vector of every recipe
+    """
+
+    help = 'Rebuild the relation id arrays and search vector of the recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of recipes updated per transaction',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        updated = 0
+
+        for batch in recipe_id_batches(options['batch_size']):
+            with transaction.atomic():
+                updated += refresh_recipe_relations(batch)
+                get_user_model().objects.bump_data_version(
+                    Recipe.objects.filter(id__in=batch)
+                    .values_list('user_id', flat=True)
+                )
+            self.stdout.write(f'{updated} recipes updated...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Backfilled the relation ids of {updated} recipes'
+        ))
@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.denormalize import (
+    find_inconsistent_recipes,
+    recipe_id_batches,
+    refresh_recipe_relations,
+)
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Django command to compare the tag and ingredient id arrays
+    and the search vector of the recipes with the rows they derive from
+    """
+
+    help = 'Check the relation id arrays and search vector of the recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of recipes compared per query',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Refresh the arrays of the inconsistent recipes',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        inconsistent = []
+
+        for batch in recipe_id_batches(options['batch_size']):
+            found = find_inconsistent_recipes(batch)
+            if found and options['fix']:
+                refresh_recipe_relations(found)
+                get_user_model().objects.bump_data_version(
+                    Recipe.objects.filter(id__in=found)
+                    .values_list('user_id', flat=True)
+                )
+            inconsistent.extend(found)
+
+        if not inconsistent:
+            self.stdout.write(self.style.SUCCESS('All recipes consistent'))
+            return
+
+        shown = ', '.join(str(recipe_id) for recipe_id in inconsistent[:20])
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Fixed {len(inconsistent)} inconsistent recipes: {shown}'
+            ))
+            return
+
+        raise CommandError(
+            f'{len(inconsistent)} inconsistent recipes: {shown}'
+        )
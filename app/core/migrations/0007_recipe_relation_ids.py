@@ -0,0 +1,47 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:49
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.RunSQL(
+            sql="""
+            UPDATE core_recipe SET
+                ingredient_ids = ARRAY(
+                    SELECT ingredient_id FROM core_recipe_ingredients
+                    WHERE recipe_id = core_recipe.id ORDER BY ingredient_id
+                ),
+                tag_ids = ARRAY(
+                    SELECT tag_id FROM core_recipe_tags
+                    WHERE recipe_id = core_recipe.id ORDER BY tag_id
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['ingredient_ids'], name='core_recipe_ingredient_ids_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='core_recipe_tag_ids_gin'),
+        ),
+    ]
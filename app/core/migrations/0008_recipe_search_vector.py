@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:51
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_relation_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            sql="""
+            UPDATE core_recipe SET search_vector =
+                setweight(to_tsvector('english', title), 'A') ||
+                setweight(to_tsvector('english', COALESCE((
+                    SELECT string_agg(t.name, ' ')
+                    FROM core_recipe_tags JOIN core_tag t ON t.id = tag_id
+                    WHERE recipe_id = core_recipe.id
+                ), '')), 'B') ||
+                setweight(to_tsvector('english', COALESCE((
+                    SELECT string_agg(i.name, ' ')
+                    FROM core_recipe_ingredients
+                    JOIN core_ingredient i ON i.id = ingredient_id
+                    WHERE recipe_id = core_recipe.id
+                ), '')), 'B')
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.contrib.postgres.operations import (
+    BtreeGinExtension,
+    TrigramExtension,
+)
+from django.db import migrations
+
+
+"""
+GIN indexes on (user_id, name gin_trgm_ops) for the typeahead lookups.
+btree_gin lets the integer user_id be part of the GIN index,
+so each lookup only reads the entries of the requesting user.
+The operator class can't be declared in Meta.indexes on this
+Django version, hence the raw SQL.
+"""
+INDEXES = (
+    ('core_tag', 'core_tag_user_name_trgm'),
+    ('core_ingredient', 'core_ingredient_user_name_trgm'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        BtreeGinExtension(),
+    ] + [
+        migrations.RunSQL(
+            sql=(
+                f'CREATE INDEX {index} ON {table} '
+                f'USING gin (user_id, name gin_trgm_ops)'
+            ),
+            reverse_sql=f'DROP INDEX {index}',
+        )
+        for table, index in INDEXES
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+
+"""
+Composite indexes matching the queries of recipe.views:
+the rows of one user ordered by (-name, id) or by -id.
+They are built with CREATE INDEX CONCURRENTLY, which can't run
+inside a transaction, so this migration is not atomic and the state
+operations are declared apart from the SQL actually run.
+"""
+INDEXES = (
+    (
+        'tag',
+        models.Index(
+            fields=['user', '-name', 'id'],
+            name='core_tag_user_name_id_idx'
+        ),
+        'core_tag ("user_id", "name" DESC, "id")',
+    ),
+    (
+        'ingredient',
+        models.Index(
+            fields=['user', '-name', 'id'],
+            name='core_ingr_user_name_id_idx'
+        ),
+        'core_ingredient ("user_id", "name" DESC, "id")',
+    ),
+    (
+        'recipe',
+        models.Index(
+            fields=['user', '-id'],
+            name='core_recipe_user_id_desc_idx'
+        ),
+        'core_recipe ("user_id", "id" DESC)',
+    ),
+)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_trigram_name_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    sql=(
+                        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS '
+                        f'"{index.name}" ON {columns}'
+                    ),
+                    reverse_sql=(
+                        f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'
+                    ),
+                ),
+            ],
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index),
+            ],
+        )
+        for model_name, index, columns in INDEXES
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+
+"""
+Merging the tags and ingredients whose names only differ by case
+or whitespace, then making (user, lower(name)) unique.
+The recipes of a duplicate are moved to the row kept (the oldest one)
+and their id arrays and search vectors are recomputed.
+"""
+MERGE_DUPLICATES = """
+SET CONSTRAINTS ALL IMMEDIATE;
+
+UPDATE {table} SET name = regexp_replace(btrim(name), '\\s+', ' ', 'g')
+WHERE name <> regexp_replace(btrim(name), '\\s+', ' ', 'g');
+
+CREATE TEMPORARY TABLE {table}_duplicates ON COMMIT DROP AS
+SELECT id, keep_id FROM (
+    SELECT id, min(id) OVER (PARTITION BY user_id, lower(name)) AS keep_id
+    FROM {table}
+) ranked
+WHERE id <> keep_id;
+
+INSERT INTO {join_table} (recipe_id, {column})
+SELECT j.recipe_id, d.keep_id
+FROM {join_table} j JOIN {table}_duplicates d ON d.id = j.{column}
+ON CONFLICT DO NOTHING;
+
+DELETE FROM {join_table}
+WHERE {column} IN (SELECT id FROM {table}_duplicates);
+
+UPDATE core_recipe SET
+    {array} = ARRAY(
+        SELECT {column} FROM {join_table}
+        WHERE recipe_id = core_recipe.id ORDER BY {column}
+    ),
+    search_vector =
+        setweight(to_tsvector('english', title), 'A') ||
+        setweight(to_tsvector('english', COALESCE((
+            SELECT string_agg(t.name, ' ')
+            FROM core_recipe_tags JOIN core_tag t ON t.id = tag_id
+            WHERE recipe_id = core_recipe.id
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE((
+            SELECT string_agg(i.name, ' ')
+            FROM core_recipe_ingredients
+            JOIN core_ingredient i ON i.id = ingredient_id
+            WHERE recipe_id = core_recipe.id
+        ), '')), 'B')
+WHERE id IN (
+    SELECT j.recipe_id
+    FROM {join_table} j JOIN {table}_duplicates d ON d.keep_id = j.{column}
+);
+
+DELETE FROM {table} WHERE id IN (SELECT id FROM {table}_duplicates);
+
+CREATE UNIQUE INDEX {table}_user_lower_name_uniq
+ON {table} (user_id, lower(name));
+"""
+
+TABLES = (
+    {
+        'table': 'core_tag',
+        'join_table': 'core_recipe_tags',
+        'column': 'tag_id',
+        'array': 'tag_ids',
+    },
+    {
+        'table': 'core_ingredient',
+        'join_table': 'core_recipe_ingredients',
+        'column': 'ingredient_id',
+        'array': 'ingredient_ids',
+    },
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=MERGE_DUPLICATES.format(**names),
+            reverse_sql=f'DROP INDEX {names["table"]}_user_lower_name_uniq',
+        )
+        for names in TABLES
+    ]
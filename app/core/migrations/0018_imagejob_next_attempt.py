@@ -0,0 +1,19 @@
+# Generated by Django 2.1.15 on 2026-10-18 16:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='next_attempt',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
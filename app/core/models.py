@@ -1,10 +1,17 @@
 import uuid
 import os
-from django.db import models
+from django.db import models, connection
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.storage import ContentAddressedStorage
 
 
 def recipe_image_file_path(instance, filename):
@@ -25,7 +32,39 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
-class UserManager(BaseUserManager):
+"""
+Sent after a queryset update() of users, which doesn't send post_save,
+with the ids of the users and the names of the fields updated.
+The caches of the authenticated users receive it (see user.signals).
+"""
+users_updated = Signal(providing_args=['user_ids', 'fields'])
+
+
+class UserQuerySet(models.QuerySet):
+
+    """ Fields updated without changing how a user authenticates """
+    UNSIGNALED_FIELDS = {'last_login', 'data_version'}
+
+    def update(self, **kwargs):
+        """
+        Sending users_updated, eg: for the users deactivated in bulk
+        by an admin action or a script
+        """
+        if set(kwargs) <= self.UNSIGNALED_FIELDS:
+            return super().update(**kwargs)
+
+        user_ids = list(self.values_list('pk', flat=True))
+        rows = super().update(**kwargs)
+        users_updated.send(
+            sender=self.model,
+            user_ids=user_ids,
+            fields=set(kwargs)
+        )
+
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
 
     def create_user(self, email, password=None, **extra_fields):
         """
@@ -89,6 +128,18 @@ class UserManager(BaseUserManager):
 
         return user
 
+    def bump_data_version(self, user_ids):
+        """
+        Increment the data version of the users (ids or a values_list
+        queryset of ids), in the same transaction as the change of
+        their recipes, tags or ingredients.
+        Called by core.signals, and explicitly by the bulk operations
+        that don't send signals.
+        """
+        return self.filter(pk__in=user_ids).update(
+            data_version=models.F('data_version') + 1
+        )
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     """
@@ -108,6 +159,13 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)  # default value is true
     is_staff = models.BooleanField(default=False)
 
+    """
+    Incremented on every change of the recipes, tags or ingredients
+    of the user, including their relations.
+    The ETags of the recipe API responses are derived from it.
+    """
+    data_version = models.BigIntegerField(default=0, editable=False)
+
     """
     Setting the custom UserManager for this user model.
     """
@@ -119,6 +177,82 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+def normalize_name(name):
+    """
+    Name of a tag or ingredient as stored:
+    without leading, trailing or repeated whitespace.
+    Names are unique per user ignoring the case (see migration 0011).
+    """
+    return ' '.join(name.split())
+
+
+class UserAttrManager(models.Manager):
+    """ Manager of the user owned recipe attributes (tags, ingredients) """
+
+    def bulk_get_or_create(self, user, names):
+        """
+        Return (id, name, created) for every one of the names,
+        creating the missing ones with a single
+        INSERT ... ON CONFLICT DO NOTHING RETURNING statement.
+        Names differing only by case or whitespace are the same object,
+        the name stored first is kept.
+        """
+
+        """ Normalized names, in order and without duplicates """
+        wanted = {}
+        for name in names:
+            name = normalize_name(name)
+            wanted.setdefault(name.lower(), name)
+
+        if not wanted:
+            return []
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+
+        """
+        The rows inserted by the statement are returned by its CTE,
+        the ones already there are read from the table.
+        """
+        sql = f"""
+            WITH input AS (SELECT unnest(%s::text[]) AS name),
+            inserted AS (
+                INSERT INTO {table} (user_id, name)
+                SELECT %s, name FROM input
+                ON CONFLICT (user_id, lower(name)) DO NOTHING
+                RETURNING id, name
+            )
+            SELECT id, name, true FROM inserted
+            UNION ALL
+            SELECT t.id, t.name, false FROM {table} t
+            WHERE t.user_id = %s
+            AND lower(t.name) = ANY(SELECT lower(name) FROM input)
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(wanted.values()), user.pk, user.pk])
+            found = {row[1].lower(): row for row in cursor.fetchall()}
+
+            """
+            Names inserted by a concurrent transaction after this
+            statement started are neither inserted nor visible to it
+            """
+            missing = [key for key in wanted if key not in found]
+            if missing:
+                cursor.execute(
+                    f'SELECT id, name, false FROM {table} '
+                    f'WHERE user_id = %s AND lower(name) = ANY(%s)',
+                    [user.pk, missing]
+                )
+                found.update(
+                    (row[1].lower(), row) for row in cursor.fetchall()
+                )
+
+        if any(row[2] for row in found.values()):
+            User.objects.bump_data_version([user.pk])
+
+        return [found[key] for key in wanted]
+
+
 class Tag(models.Model):
     """ Tag to be used for a recipe """
     name = models.CharField(max_length=255)
@@ -132,6 +266,24 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        """
+        Index matching the listing of the tags of a user,
+        ordered by name descending and id (see recipe.views).
+        """
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_tag_user_name_id_idx'
+            ),
+        ]
+
+    objects = UserAttrManager()
+
+    def save(self, *args, **kwargs):
+        self.name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -144,6 +296,20 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-name', 'id'],
+                name='core_ingr_user_name_id_idx'
+            ),
+        ]
+
+    objects = UserAttrManager()
+
+    def save(self, *args, **kwargs):
+        self.name = normalize_name(self.name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -169,8 +335,209 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
 
-    """Just reference the function and recipe_image_file_path not call it"""
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    """
+    Just reference the function and recipe_image_file_path not call it.
+    Stored by the hash of the content (core.storage), once for every
+    recipe with the same image.
+    """
+    image = models.ImageField(
+        null=True,
+        max_length=255,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+
+    """
+    Read from the header of the image when it's uploaded, for laying out
+    pages without downloading it, and a tiny copy of it (data: URI)
+    to show blurred meanwhile, made by process_image_jobs
+    """
+    image_width = models.PositiveIntegerField(null=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, editable=False)
+    image_format = models.CharField(max_length=10, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
+
+    """
+    Copies of the ids in the ingredients and tags join tables,
+    kept in sync by core.signals, sorted ascending.
+    Filtering by them with @> and && uses their GIN index
+    instead of scanning the join tables.
+    """
+    ingredient_ids = ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+    )
+    tag_ids = ArrayField(
+        models.IntegerField(),
+        default=list,
+        blank=True,
+        editable=False,
+    )
+
+    """
+    Full text search document of the title, weighted A,
+    and the tag and ingredient names, weighted B.
+    Kept current by core.signals on save and on relation changes.
+    """
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='core_recipe_user_id_desc_idx'
+            ),
+            GinIndex(
+                fields=['ingredient_ids'],
+                name='core_recipe_ingredient_ids_gin'
+            ),
+            GinIndex(fields=['tag_ids'], name='core_recipe_tag_ids_gin'),
+            GinIndex(
+                fields=['search_vector'],
+                name='core_recipe_search_vector_gin'
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Progress of a recipe import (manage.py import_recipes),
+    saved with every batch for resuming an interrupted import
+    after the last recipe committed.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    source = models.CharField(max_length=255)
+    records_done = models.PositiveIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('user', 'source'),)
+
+    def __str__(self):
+        return f'{self.source} ({self.records_done})'
+
+
+def recipe_image_variant_file_path(instance, filename):
+    """ Path of the resized copies of the uploaded recipe images """
+    return os.path.join('uploads/recipe/variants/', filename)
+
+
+class ImageJob(models.Model):
+    """
+    Queue of the recipe images to resize, filled by the uploads
+    and emptied by manage.py process_image_jobs.
+    A worker locks the next pending job (select_for_update, skip_locked)
+    for the time of processing it, so the jobs of a crashed worker
+    are pending again once its transaction is rolled back.
+    """
+    PENDING = 'pending'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+
+    """ Name of the uploaded image in the storage """
+    image = models.CharField(max_length=255)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    """ Not processed before, delayed after a failed attempt """
+    next_attempt = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['status', 'id'],
+                name='core_imagejob_status_id_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.image} ({self.status})'
+
+
+class ImageVariant(models.Model):
+    """
+    Resized copy of the uploaded image of a recipe,
+    eg: the WebP thumbnail, made by the image jobs.
+    """
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+    )
+
+    """ Name of the uploaded image the variant was made from """
+    source = models.CharField(max_length=255)
+    name = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(upload_to=recipe_image_variant_file_path)
+
+    class Meta:
+        unique_together = (('recipe', 'name', 'format'),)
+
+    def __str__(self):
+        return f'{self.file.name} ({self.width}x{self.height})'
+
+
+class ImageUpload(models.Model):
+    """
+    Image of a recipe uploaded in chunks (see recipe.uploads).
+    The chunks are appended to a partial file, the bytes up to
+    `received` are stored, and an interrupted upload resumes from there.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey('Recipe', on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+
+    """ Declared size and SHA-256 (hex) of the whole file """
+    size = models.PositiveIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.PositiveIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.received}/{self.size})'
+
+
+class ImageBlob(models.Model):
+    """
+    File of the content addressed storage (core.storage),
+    with the number of references to it: the same image saved
+    for several recipes is stored once.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=1)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.refcount})'
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.denormalize import lock_recipes, refresh_recipe_relations
+
+
+"""
+The id array column of Recipe that holds the ids of each related model.
+"""
+RELATED_ID_COLUMNS = {
+    Tag: 'tag_ids',
+    Ingredient: 'ingredient_ids',
+}
+
+
+def _linked_recipe_ids(instance):
+    """ Ids of the recipes whose arrays contain the tag or ingredient """
+
+    column = RELATED_ID_COLUMNS[type(instance)]
+
+    return list(
+        Recipe.objects.filter(**{f'{column}__contains': [instance.pk]})
+        .values_list('id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_saved_recipe(sender, instance, **kwargs):
+    """
+    Recomputing the derived columns of a saved recipe.
+    The title feeds the search vector, and save() writes back
+    the arrays held in memory, which can be older than the join tables.
+    """
+    refresh_recipe_relations([instance.pk])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_renamed_recipes(sender, instance, created, **kwargs):
+    """ The names of the tags and ingredients feed the search vector """
+
+    if not created:
+        refresh_recipe_relations(_linked_recipe_ids(instance))
+
+
+def _changed_recipe_ids(instance, reverse, pk_set):
+    """
+    Ids of the recipes whose tags or ingredients change.
+    When the change is made from the tag or ingredient side (reverse),
+    pk_set holds recipe ids, or None when the relation is cleared.
+    """
+
+    if not reverse:
+        return [instance.pk]
+    if pk_set is not None:
+        return pk_set
+    return _linked_recipe_ids(instance)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def sync_recipe_relations(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """
+    Refresh the id arrays and search vector of the recipes whose tags
+    or ingredients changed.
+
+    The recipes are locked before the join rows change: the UPDATE
+    refreshing them reads the join tables as of the start of the statement,
+    so a concurrent change of the same recipe has to be committed before,
+    or its rows would be missing from the arrays written last.
+    """
+
+    if action in ('pre_add', 'pre_remove', 'pre_clear'):
+        lock_recipes(_changed_recipe_ids(instance, reverse, pk_set))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        refresh_recipe_relations(
+            _changed_recipe_ids(instance, reverse, pk_set)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_linked_recipes(sender, instance, **kwargs):
+    """
+    Deleting a tag or ingredient removes its join table rows
+    without sending m2m_changed. Remembering its recipes for refreshing
+    them once the rows are gone.
+    """
+    instance._linked_recipe_ids = _linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_linked_recipes(sender, instance, **kwargs):
+    refresh_recipe_relations(getattr(instance, '_linked_recipe_ids', ()))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def bump_owner_data_version(sender, instance, **kwargs):
+    """ Any change of the recipes, tags or ingredients of a user """
+    get_user_model().objects.bump_data_version([instance.user_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_relation_data_version(sender, instance, action, **kwargs):
+    """
+    Any change of the tags or ingredients of a recipe.
+    From either side, the instance belongs to the user of the recipes.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        get_user_model().objects.bump_data_version([instance.user_id])
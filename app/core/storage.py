@@ -0,0 +1,160 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, models, transaction
+from django.utils.deconstruct import deconstructible
+
+
+def lock_name(name):
+    """
+    Lock a stored file name until the end of the transaction,
+    taken by the saves referencing the file and by gc_recipe_images
+    between checking its references and removing it
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [name])
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming the files by the SHA-256 of their content,
+    in the directory of the name given, sharded by the first characters
+    of the hash, eg: uploads/recipe/ab/cd/abcd...ef.jpg
+
+    Saving a content already stored only adds a reference to it
+    (core.models.ImageBlob), and delete() releases a reference,
+    removing the file with the last one.
+    The content is hashed while it's written to a temporary file,
+    read once, then moved to its name.
+
+    The files saved before, under other names, are deleted directly.
+    """
+
+    """ Levels of directories and characters of the hash per level """
+    SHARD_DEPTH = 2
+    SHARD_WIDTH = 2
+
+    TEMP_DIR = '.tmp'
+    READ_SIZE = 64 * 1024
+
+    def _blob_model(self):
+        """ Looked up late, the models module uses this storage """
+        return apps.get_model('core', 'ImageBlob')
+
+    def get_available_name(self, name, max_length=None):
+        """ The name is only known once the content is hashed """
+        return name
+
+    def hashed_name(self, name, digest):
+        """ Name of a content of the hash, saved under `name` """
+
+        directory, basename = posixpath.split(name)
+        shards = [
+            digest[i * self.SHARD_WIDTH:(i + 1) * self.SHARD_WIDTH]
+            for i in range(self.SHARD_DEPTH)
+        ]
+        ext = os.path.splitext(basename)[1].lower()
+
+        return posixpath.join(directory, *shards, f'{digest}{ext}')
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        temp = None
+
+        if hasattr(content, 'temporary_file_path'):
+            """ Already on disk: hashed, then moved if new """
+            source = content.temporary_file_path()
+            with open(source, 'rb') as f:
+                for data in iter(lambda: f.read(self.READ_SIZE), b''):
+                    digest.update(data)
+                    size += len(data)
+        else:
+            temp_dir = self.path(self.TEMP_DIR)
+            os.makedirs(temp_dir, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=temp_dir)
+            with os.fdopen(fd, 'wb') as f:
+                for data in content.chunks():
+                    if isinstance(data, str):
+                        data = data.encode()
+                    digest.update(data)
+                    f.write(data)
+                    size += len(data)
+            source = temp
+
+        name = self.hashed_name(name, digest.hexdigest())
+        try:
+            """
+            Locking the name until the reference is committed:
+            gc_recipe_images re-checks it under the lock before removing
+            an unreferenced file, see lock_name
+            """
+            with transaction.atomic():
+                lock_name(name)
+
+                """
+                Referencing the blob first: a concurrent delete() of its
+                last reference holds its row until the file is removed,
+                and the file is written again below.
+                """
+                self._reference(name, size)
+
+                path = self.path(name)
+                try:
+                    """ Newly referenced: recent again for the grace period """
+                    os.utime(path)
+                except FileNotFoundError:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    file_move_safe(source, path, allow_overwrite=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(path, self.file_permissions_mode)
+        finally:
+            if temp is not None and os.path.exists(temp):
+                os.remove(temp)
+
+        return name
+
+    def _reference(self, name, size):
+        table = connection.ops.quote_name(self._blob_model()._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (name, size, refcount, created) '
+                f'VALUES (%s, %s, 1, now()) '
+                f'ON CONFLICT (name) '
+                f'DO UPDATE SET refcount = {table}.refcount + 1',
+                [name, size]
+            )
+
+    def delete(self, name):
+        """ Release a reference to the file, removing it with the last one """
+
+        ImageBlob = self._blob_model()
+
+        with transaction.atomic():
+            released = ImageBlob.objects.filter(name=name).update(
+                refcount=models.F('refcount') - 1
+            )
+            if released:
+                released, _ = ImageBlob.objects.filter(
+                    name=name,
+                    refcount=0
+                ).delete()
+            else:
+                """ A file saved before this storage, never shared """
+                released = True
+
+            if released:
+                super().delete(name)
+
+    def refcount(self, name):
+        """ Number of references to the file """
+        return self._blob_model().objects.filter(name=name) \
+            .values_list('refcount', flat=True).first() or 0
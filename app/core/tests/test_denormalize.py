@@ -0,0 +1,185 @@
+import threading
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Tag, Ingredient, Recipe
+
+
+def sample_recipe(user, title='Sample recipe'):
+    """ Helper function for creating recipes """
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class RecipeRelationIdsTests(TestCase):
+    """ Test the tag and ingredient id arrays of the recipes """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+        self.recipe = sample_recipe(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def assertArrays(self, recipe, tags, ingredients=()):
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.tag_ids, sorted(tag.id for tag in tags))
+        self.assertEqual(
+            recipe.ingredient_ids,
+            sorted(ingredient.id for ingredient in ingredients)
+        )
+
+    def test_add_remove_clear(self):
+        """ Test that the arrays follow the changes of the relations """
+
+        self.recipe.tags.add(self.dessert, self.vegan)
+        self.recipe.ingredients.add(self.salt)
+        self.assertArrays(self.recipe, [self.vegan, self.dessert], [self.salt])
+
+        self.recipe.tags.remove(self.vegan)
+        self.assertArrays(self.recipe, [self.dessert], [self.salt])
+
+        self.recipe.ingredients.clear()
+        self.assertArrays(self.recipe, [self.dessert])
+
+        self.recipe.tags.set([self.vegan])
+        self.assertArrays(self.recipe, [self.vegan])
+
+    def test_reverse_changes(self):
+        """ Test changing the relation from the tag side """
+
+        other = sample_recipe(self.user, title='Other')
+
+        self.vegan.recipe_set.add(self.recipe, other)
+        self.assertArrays(self.recipe, [self.vegan])
+        self.assertArrays(other, [self.vegan])
+
+        self.vegan.recipe_set.remove(other)
+        self.assertArrays(other, [])
+
+        self.vegan.recipe_set.clear()
+        self.assertArrays(self.recipe, [])
+
+    def test_delete_related_object(self):
+        """ Test that deleting a tag removes it from the arrays """
+
+        self.recipe.tags.add(self.vegan, self.dessert)
+
+        self.vegan.delete()
+
+        self.assertArrays(self.recipe, [self.dessert])
+
+    def test_check_command_detects_and_fixes(self):
+        """ Test the consistency checker with a stale array """
+
+        self.recipe.tags.add(self.vegan)
+        Recipe.objects.filter(id=self.recipe.id).update(tag_ids=[])
+
+        with self.assertRaises(CommandError):
+            call_command('check_recipe_relations', stdout=StringIO())
+
+        call_command('check_recipe_relations', '--fix', stdout=StringIO())
+
+        self.assertArrays(self.recipe, [self.vegan])
+        call_command('check_recipe_relations', stdout=StringIO())
+
+    def test_backfill_command(self):
+        """ Test rebuilding the arrays of every recipe in batches """
+
+        recipes = [self.recipe] + [
+            sample_recipe(self.user, title=f'Recipe {i}') for i in range(4)
+        ]
+        for recipe in recipes:
+            recipe.tags.add(self.vegan)
+        Recipe.objects.update(tag_ids=[])
+
+        out = StringIO()
+        call_command('backfill_recipe_relations', '--batch-size=2', stdout=out)
+
+        self.assertIn('5 recipes', out.getvalue())
+        for recipe in recipes:
+            self.assertArrays(recipe, [self.vegan])
+
+    def test_check_command_detects_stale_search_vector(self):
+        """ Test that a search vector out of date is reported and fixed """
+
+        Recipe.objects.filter(id=self.recipe.id).update(title='Renamed')
+
+        with self.assertRaises(CommandError):
+            call_command('check_recipe_relations', stdout=StringIO())
+
+        call_command('check_recipe_relations', '--fix', stdout=StringIO())
+        call_command('check_recipe_relations', stdout=StringIO())
+
+        self.assertTrue(
+            Recipe.objects.filter(search_vector='renamed').exists()
+        )
+
+
+class ConcurrentRelationChangesTests(TransactionTestCase):
+    """ Test the arrays of a recipe changed by concurrent transactions """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+        self.recipe = sample_recipe(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+
+    def test_concurrent_adds(self):
+        """
+        Test a tag added while another transaction adds one
+        keeps both in the arrays
+        """
+
+        added = threading.Event()
+        release = threading.Event()
+
+        def add_vegan():
+            try:
+                with transaction.atomic():
+                    Recipe.objects.get(pk=self.recipe.pk).tags.add(self.vegan)
+                    added.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        def add_dessert():
+            try:
+                Recipe.objects.get(pk=self.recipe.pk).tags.add(self.dessert)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=add_vegan)
+        first.start()
+        added.wait(5)
+
+        second = threading.Thread(target=add_dessert)
+        second.start()
+        """ The second transaction waiting for the first one """
+        time.sleep(0.3)
+        release.set()
+
+        first.join()
+        second.join()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.tag_ids,
+            sorted([self.vegan.id, self.dessert.id])
+        )
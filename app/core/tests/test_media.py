@@ -0,0 +1,139 @@
+import hashlib
+import os
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+
+class MediaServingTests(TestCase):
+    """ Test serving the media files """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            MEDIA_ROOT=self.media.name,
+            MEDIA_SENDFILE=None
+        )
+        self.settings.enable()
+
+        self.content = bytes(range(256)) * 4
+        self.digest = hashlib.sha256(self.content).hexdigest()
+        self.name = f'uploads/recipe/{self.digest[:2]}/{self.digest}.jpg'
+        self.path = os.path.join(self.media.name, self.name)
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(self.content)
+
+        self.url = reverse('media', args=[self.name])
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def test_serve_file(self):
+        """ Test the whole file with its cache headers """
+
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Content-Length'], str(len(self.content)))
+        self.assertEqual(res['ETag'], f'"{self.digest}"')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+
+    def test_not_modified(self):
+        """ Test the conditional requests are answered with a 304 """
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{self.digest}"')
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], f'"{self.digest}"')
+
+        res = self.client.get(
+            self.url,
+            HTTP_IF_MODIFIED_SINCE=http_date(os.stat(self.path).st_mtime)
+        )
+        self.assertEqual(res.status_code, 304)
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(res.status_code, 200)
+
+    def test_etag_of_unhashed_name(self):
+        """ Test a file not named by its hash gets a size-mtime ETag """
+
+        path = os.path.join(self.media.name, 'legacy.jpg')
+        with open(path, 'wb') as f:
+            f.write(b'old')
+
+        res = self.client.get(reverse('media', args=['legacy.jpg']))
+
+        st = os.stat(path)
+        self.assertEqual(res['ETag'], f'"3-{st.st_mtime_ns:x}"')
+
+    def test_ranges(self):
+        """ Test the byte ranges """
+
+        for header, start, end in (('bytes=0-9', 0, 9),
+                                   ('bytes=1000-', 1000, 1023),
+                                   ('bytes=-24', 1000, 1023),
+                                   ('bytes=1020-5000', 1020, 1023)):
+            res = self.client.get(self.url, HTTP_RANGE=header)
+
+            self.assertEqual(res.status_code, 206)
+            self.assertEqual(
+                b''.join(res.streaming_content),
+                self.content[start:end + 1]
+            )
+            self.assertEqual(res['Content-Range'], f'bytes {start}-{end}/1024')
+            self.assertEqual(res['Content-Length'], str(end - start + 1))
+
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */1024')
+
+        """ Several ranges, or a range of another version: whole file """
+        for headers in ({'HTTP_RANGE': 'bytes=0-1,5-6'},
+                        {'HTTP_RANGE': 'bytes=0-1', 'HTTP_IF_RANGE': '"x"'}):
+            res = self.client.get(self.url, **headers)
+            self.assertEqual(res.status_code, 200)
+
+        res = self.client.get(
+            self.url,
+            HTTP_RANGE='bytes=0-1',
+            HTTP_IF_RANGE=f'"{self.digest}"'
+        )
+        self.assertEqual(res.status_code, 206)
+
+    def test_sendfile_offload(self):
+        """ Test the front server is asked to send the file """
+
+        with override_settings(MEDIA_SENDFILE='x-accel-redirect'):
+            res = self.client.get(self.url)
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{self.name}'
+        )
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], f'"{self.digest}"')
+
+        with override_settings(MEDIA_SENDFILE='x-sendfile'):
+            res = self.client.get(self.url)
+        self.assertEqual(res['X-Sendfile'], self.path)
+
+    def test_not_found(self):
+        """ Test missing, hidden and outside files are not found """
+
+        os.makedirs(os.path.join(self.media.name, '.tmp'))
+        with open(os.path.join(self.media.name, '.tmp', 'part'), 'wb') as f:
+            f.write(b'partial')
+
+        for path in ('missing.jpg', '.tmp/part', 'uploads', '../etc/passwd',
+                     'uploads/../../x'):
+            res = self.client.get(f'/media/{path}')
+            self.assertEqual(res.status_code, 404, path)
+
+        res = self.client.post(self.url)
+        self.assertEqual(res.status_code, 405)
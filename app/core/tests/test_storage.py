@@ -0,0 +1,170 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import (
+    SimpleUploadedFile,
+    TemporaryUploadedFile,
+)
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework.test import APIClient
+
+from core.models import ImageBlob, Recipe
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(TestCase):
+    """ Test the storage of the files by the hash of their content """
+
+    def setUp(self):
+        self.location = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.location.name)
+
+    def tearDown(self):
+        self.location.cleanup()
+
+    def test_named_by_hash(self):
+        """ Test the name is the sharded hash with the extension """
+
+        content = b'recipe image'
+        digest = hashlib.sha256(content).hexdigest()
+
+        name = self.storage.save('uploads/recipe/x.JPG', ContentFile(content))
+
+        self.assertEqual(
+            name,
+            f'uploads/recipe/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(ImageBlob.objects.get(name=name).size, len(content))
+        self.assertEqual(os.listdir(self.storage.path('.tmp')), [])
+
+    def test_same_content_stored_once(self):
+        """ Test the references are counted, the last one removes it """
+
+        first = self.storage.save('uploads/recipe/a.jpg', ContentFile(b'a'))
+        second = self.storage.save('uploads/recipe/b.jpg', ContentFile(b'a'))
+        other = self.storage.save('uploads/recipe/c.jpg', ContentFile(b'c'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(self.storage.refcount(first), 2)
+
+        self.storage.delete(first)
+        self.assertTrue(self.storage.exists(first))
+        self.assertEqual(self.storage.refcount(first), 1)
+
+        self.storage.delete(first)
+        self.assertFalse(self.storage.exists(first))
+        self.assertFalse(ImageBlob.objects.filter(name=first).exists())
+
+        """ Saved again after being removed """
+        self.storage.save('uploads/recipe/a.jpg', ContentFile(b'a'))
+        self.assertTrue(self.storage.exists(first))
+
+    def test_temporary_upload_moved(self):
+        """ Test an upload spooled to disk is hashed and moved """
+
+        upload = TemporaryUploadedFile('big.jpg', 'image/jpeg', 5, None)
+        upload.write(b'large')
+        upload.seek(0)
+
+        name = self.storage.save('uploads/recipe/big.jpg', upload)
+        upload.close()
+
+        self.assertTrue(name.endswith(
+            hashlib.sha256(b'large').hexdigest() + '.jpg'
+        ))
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'large')
+
+    def test_delete_legacy_file(self):
+        """ Test a file stored under a random name is deleted directly """
+
+        path = self.storage.path('uploads/recipe/legacy.jpg')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as f:
+            f.write(b'old')
+
+        self.storage.delete('uploads/recipe/legacy.jpg')
+
+        self.assertFalse(os.path.exists(path))
+
+
+def image_file():
+    content = BytesIO()
+    Image.new('RGB', (10, 10)).save(content, 'JPEG')
+
+    return SimpleUploadedFile('photo.jpg', content.getvalue())
+
+
+class RecipeImageReferencesTests(TransactionTestCase):
+    """ Test the references of the recipes to their stored images """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=5.00
+            )
+            for title in ('Curry', 'Soup')
+        ]
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def _upload(self, recipe):
+        self.client.post(
+            reverse('recipe:recipe-upload-image', args=[recipe.id]),
+            {'image': image_file()},
+            format='multipart'
+        )
+        recipe.refresh_from_db()
+
+        return recipe.image.name
+
+    def test_shared_image_released(self):
+        """ Test an image shared by recipes stays until the last one """
+
+        name = self._upload(self.recipes[0])
+        self.assertEqual(self._upload(self.recipes[1]), name)
+
+        storage = Recipe._meta.get_field('image').storage
+        self.assertEqual(storage.refcount(name), 2)
+
+        """ Uploading the same image again keeps a single reference """
+        self._upload(self.recipes[1])
+        self.assertEqual(storage.refcount(name), 2)
+
+        self.recipes[0].delete()
+        self.assertTrue(storage.exists(name))
+
+        self.client.delete(
+            reverse('recipe:recipe-detail', args=[self.recipes[1].id])
+        )
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(ImageBlob.objects.exists())
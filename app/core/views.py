@@ -0,0 +1,171 @@
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.encoding import escape_uri_path
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+"""
+The media files are never changed once saved: the recipe images are
+named by their hash (core.storage), the variants and the older uploads
+by a random name. Their ETag is the hash when the name has one,
+and their size and modification time otherwise.
+"""
+HASHED_NAME_RE = re.compile(r'^([0-9a-f]{64})\.')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """ The `length` bytes of a file from `start` """
+
+    def __init__(self, f, start, length):
+        f.seek(start)
+        self.file = f
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _etag(path, st):
+    match = HASHED_NAME_RE.match(os.path.basename(path))
+    if match:
+        return f'"{match.group(1)}"'
+
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _not_modified(request, etag, mtime):
+    """ If-None-Match, or else If-Modified-Since, match the file """
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        matches = parse_etags(if_none_match)
+        return '*' in matches or etag in matches
+
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return since is not None and int(mtime) <= since
+
+
+def _byte_range(request, etag, mtime, size):
+    """
+    The (start, end) bytes requested by the Range header, inclusive,
+    or None for the whole file: no range, a range ignored (several
+    ranges, If-Range of an older version) or invalid.
+    Raises ValueError for a range starting after the end of the file.
+    """
+
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').replace(' ', ''))
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None and if_range != etag:
+        date = parse_http_date_safe(if_range)
+        if date is None or int(mtime) > date:
+            return None
+
+    first, last = match.groups()
+    if not first:
+        """ The last bytes """
+        if int(last) == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - int(last), 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError('Range after the end of the file')
+    if start > end:
+        return None
+
+    return start, end
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serving the files of MEDIA_ROOT with cache headers, conditional
+    requests and byte ranges.
+    With MEDIA_SENDFILE, the front server sends the file (and handles
+    the ranges): 'x-sendfile' for Apache (mod_xsendfile) and lighttpd,
+    'x-accel-redirect' for nginx, with an internal location serving
+    MEDIA_ROOT at MEDIA_ACCEL_REDIRECT_LOCATION.
+    Otherwise the whole files are given to the WSGI server's file wrapper,
+    which can send them without copying (sendfile).
+    """
+
+    """ Neither outside of MEDIA_ROOT nor hidden, eg: the storage .tmp """
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404()
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(full_path)
+    except (SuspiciousFileOperation, ValueError, OSError):
+        raise Http404()
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404()
+
+    etag = _etag(full_path, st)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(st.st_mtime),
+        'Cache-Control':
+            f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}, immutable',
+        'Accept-Ranges': 'bytes',
+    }
+    content_type = mimetypes.guess_type(full_path)[0] or \
+        'application/octet-stream'
+
+    if _not_modified(request, etag, st.st_mtime):
+        response = HttpResponse(status=304)
+    elif settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = escape_uri_path(
+            settings.MEDIA_ACCEL_REDIRECT_LOCATION + path
+        )
+    elif settings.MEDIA_SENDFILE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        try:
+            byte_range = _byte_range(request, etag, st.st_mtime, st.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{st.st_size}'
+            return response
+
+        f = open(full_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(f, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = FileResponse(
+                RangeFile(f, start, end - start + 1),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{st.st_size}'
+            response['Content-Length'] = end - start + 1
+
+    for name, value in headers.items():
+        response[name] = value
+
+    return response
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        """ Connecting the signal receivers of the recipe images """
+        import recipe.signals  # noqa: F401
+
+        """ Decompression bomb limit of Pillow, see RECIPE_IMAGE_MAX_PIXELS """
+        from django.conf import settings
+        from PIL import Image
+        Image.MAX_IMAGE_PIXELS = settings.RECIPE_IMAGE_MAX_PIXELS
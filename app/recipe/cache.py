@@ -0,0 +1,75 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class ListCache:
+    """
+    Cache of the list responses of a model owned by the users
+    (tags, ingredients), in the cache alias of RECIPE_LIST_CACHE.
+
+    Every response of a user is stored under the data version of the user,
+    which is incremented in the database by any change of its recipes,
+    tags or ingredients (see core.signals), and read by every request for
+    the ETag. A change makes the responses stored before unreachable,
+    in every process, whether the cache is shared or not (LocMemCache).
+    They expire on their own, without listing them.
+
+    The hits and misses are counted in the cache too, for the totals
+    of every process sharing it.
+    """
+
+    PREFIX = 'recipe-list'
+
+    @property
+    def cache(self):
+        return caches[settings.RECIPE_LIST_CACHE]
+
+    def key(self, request, model, data_version):
+        """
+        Key of the response to a list request of the authenticated user.
+        The data version is read before building the response: if the list
+        changes meanwhile, the response is stored under the old version.
+        """
+
+        url = request.build_absolute_uri()
+        return (
+            f'{self.PREFIX}:{model._meta.label}:{request.user.pk}:'
+            f'{data_version}:'
+            f'{hashlib.sha256(url.encode()).hexdigest()}'
+        )
+
+    def get(self, key):
+        """ The data of the response stored under the key, or None """
+
+        data = self.cache.get(key)
+        self._count('hits' if data is not None else 'misses')
+
+        return data
+
+    def set(self, key, data):
+        self.cache.set(key, data, settings.RECIPE_LIST_CACHE_TIMEOUT)
+
+    def _count(self, name):
+        key = f'{self.PREFIX}:stats:{name}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, None):
+                self.cache.incr(key)
+
+    def stats(self):
+        """ Number of hits and misses, since the cache was emptied """
+
+        counts = self.cache.get_many([
+            f'{self.PREFIX}:stats:{name}' for name in ('hits', 'misses')
+        ])
+
+        return {
+            name: counts.get(f'{self.PREFIX}:stats:{name}', 0)
+            for name in ('hits', 'misses')
+        }
+
+
+list_cache = ListCache()
@@ -0,0 +1,112 @@
+import csv
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Tag, Ingredient
+
+
+"""
+Columns of every exported recipe, in order.
+The tags and ingredients are exported by name.
+"""
+EXPORT_FIELDS = (
+    'id', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients',
+)
+
+"""
+Rows fetched from the server-side cursor at once,
+and recipes whose tags and ingredients are resolved together.
+"""
+CHUNK_SIZE = 2000
+
+"""
+Id array column of Recipe holding each exported relation,
+and the model of the related objects.
+"""
+RELATIONS = (
+    ('tags', 'tag_ids', Tag),
+    ('ingredients', 'ingredient_ids', Ingredient),
+)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield a dict per recipe of the queryset, by ascending id.
+    The recipes are read through a server-side cursor and the names
+    of their tags and ingredients with one query per chunk and relation,
+    so memory use depends on the chunk size only.
+    """
+
+    rows = queryset.order_by('id').values(
+        *EXPORT_FIELDS[:-2],
+        *(column for _, column, _ in RELATIONS)
+    ).iterator(chunk_size=chunk_size)
+
+    for chunk in _chunks(rows, chunk_size):
+        names = {
+            column: dict(
+                model.objects.filter(
+                    id__in={pk for row in chunk for pk in row[column]}
+                ).values_list('id', 'name')
+            )
+            for _, column, model in RELATIONS
+        }
+
+        for row in chunk:
+            for field_name, column, _ in RELATIONS:
+                row[field_name] = [
+                    names[column][pk] for pk in row.pop(column)
+                    if pk in names[column]
+                ]
+
+            yield row
+
+
+def ndjson_lines(rows):
+    """ One JSON document per line """
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+class _Echo:
+    """ File-like object returning what is written, for csv.writer """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    """
+    A header line, then one line per recipe.
+    The tags and ingredients cells hold a JSON array of names.
+    """
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+
+    for row in rows:
+        for field_name, _, _ in RELATIONS:
+            row[field_name] = json.dumps(row[field_name])
+
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+"""
+Formats of the export: ?output=<name>
+with the function rendering the rows and the content type.
+"""
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key of an object owned by the user making the request,
+    eg: the tags of a recipe can only be the user's own tags.
+    With many=True the IDs are resolved together by
+    BatchedManyRelatedField.
+    """
+
+    def get_queryset(self):
+        """
+        Only the objects of the authenticated user are valid,
+        none without a request to tell who the user is.
+        """
+        queryset = super().get_queryset()
+
+        request = self.context.get('request')
+        if request is None:
+            return queryset.none()
+
+        return queryset.filter(user=request.user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """ Using BatchedManyRelatedField for many=True """
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+
+        return BatchedManyRelatedField(**list_kwargs)
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """
+    List of primary keys resolved with a single id IN (...) query,
+    instead of one query per ID like ManyRelatedField.
+    Every ID that is missing or not allowed is reported at once.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+
+        """ Converting the IDs, in order and without duplicates """
+        pks = {}
+        for value in data:
+            if isinstance(value, bool):
+                self.child_relation.fail(
+                    'incorrect_type',
+                    data_type=type(value).__name__
+                )
+            try:
+                pks.setdefault(pk_field.to_python(value), value)
+            except (TypeError, DjangoValidationError):
+                self.child_relation.fail(
+                    'incorrect_type',
+                    data_type=type(value).__name__
+                )
+
+        found = queryset.in_bulk(list(pks))
+
+        missing = [value for pk, value in pks.items() if pk not in found]
+        if missing:
+            raise serializers.ValidationError([
+                self.child_relation.error_messages['does_not_exist'].format(
+                    pk_value=value
+                )
+                for value in missing
+            ])
+
+        return [found[pk] for pk in pks]
@@ -0,0 +1,132 @@
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+
+from rest_framework.exceptions import ValidationError
+
+from core.denormalize import SEARCH_CONFIG
+
+
+"""
+How the requested IDs of a relation are matched.
+any -> the recipe has at least one of the IDs
+all -> the recipe has every one of the IDs
+"""
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def params_to_ints(name, value):
+    """
+    Convert a string of IDs separated by commas to a list of integers
+    """
+    try:
+        return [int(str_id) for str_id in value.split(',') if str_id]
+    except ValueError:
+        raise ValidationError({
+            name: ['Must be a list of integer IDs separated by commas.']
+        })
+
+
+"""
+The id array column of Recipe mirroring each filterable relation.
+"""
+RELATION_COLUMNS = {
+    'tags': 'tag_ids',
+    'ingredients': 'ingredient_ids',
+}
+
+
+def filter_by_related(queryset, relation, ids, mode=MATCH_ANY):
+    """
+    Filter recipes by the IDs of one of their ManyToMany relations.
+
+    The filter runs on the id array of the recipe that mirrors the
+    relation, with the array operators backed by its GIN index:
+    any -> tag_ids && ARRAY[ids] (overlap)
+    all -> tag_ids @> ARRAY[ids] (contains)
+    The join tables are not touched, so each recipe is returned once.
+    """
+
+    column = RELATION_COLUMNS[relation]
+    lookup = 'contains' if mode == MATCH_ALL else 'overlap'
+
+    return queryset.filter(**{f'{column}__{lookup}': sorted(set(ids))})
+
+
+"""
+ts_rank returns a float4. It is scaled and rounded to an integer
+so that the pagination cursor can compare it exactly.
+"""
+RANK_SCALE = 1000000
+
+
+def search_recipes(queryset, text):
+    """
+    Keep the recipes whose title, tag or ingredient names match the text,
+    annotated with their rank as `search_rank`.
+    The match runs on the GIN index of Recipe.search_vector.
+    """
+
+    query = SearchQuery(text, config=SEARCH_CONFIG)
+    rank = SearchRank(F('search_vector'), query)
+
+    return queryset.annotate(
+        search_rank=Cast(rank * RANK_SCALE, IntegerField())
+    ).filter(search_vector=query)
+
+
+def typeahead(queryset, text, limit):
+    """
+    Return the best `limit` tags or ingredients for an autocomplete text.
+    Names starting with the text come first, then the names similar to it
+    (trigram similarity above the pg_trgm threshold), most similar first.
+    Both conditions are answered by the (user_id, name) trigram index:
+    the prefix is matched with a case insensitive regex (~*) because
+    istartswith compares UPPER(name), which the index doesn't cover.
+    """
+
+    prefix = Q(name__iregex='^' + re.escape(text))
+
+    return queryset.annotate(
+        is_prefix=Case(
+            When(prefix, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        similarity=TrigramSimilarity('name', text),
+    ).filter(
+        prefix | Q(name__trigram_similar=text)
+    ).order_by('-is_prefix', '-similarity', 'name', 'id')[:limit]
+
+
+def filter_recipes(queryset, query_params):
+    """
+    Apply the tags and ingredients filters of the request query params.
+    ?tags=1,2&tags_mode=all&ingredients=3&ingredients_mode=any
+    """
+
+    for relation in ('tags', 'ingredients'):
+        value = query_params.get(relation)
+        if not value:
+            continue
+
+        mode_param = f'{relation}_mode'
+        mode = query_params.get(mode_param, MATCH_ANY)
+        if mode not in MATCH_MODES:
+            raise ValidationError({
+                mode_param: [f'Must be one of: {", ".join(MATCH_MODES)}.']
+            })
+
+        ids = params_to_ints(relation, value)
+        if ids:
+            queryset = filter_by_related(queryset, relation, ids, mode)
+
+    return queryset
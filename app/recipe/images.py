@@ -0,0 +1,282 @@
+import base64
+import os
+from datetime import timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from PIL import Image, features
+
+from core.models import ImageJob, ImageVariant, Recipe
+
+
+"""
+Pillow format and save() options of each variant format.
+WebP is only made when Pillow was built with it.
+"""
+FORMATS = {
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+
+"""
+Longest side of the placeholders of the images, in pixels
+"""
+PLACEHOLDER_SIZE = 16
+
+
+class ImageRejected(ValueError):
+    """ A file that is not an image, or above the limits """
+
+
+def inspect_image(f):
+    """
+    (width, height, format) of an image file, read from its header,
+    checking RECIPE_IMAGE_MAX_BYTES and RECIPE_IMAGE_MAX_PIXELS
+    before anything decodes the pixels.
+    Raises ImageRejected.
+    """
+
+    f.seek(0, os.SEEK_END)
+    if f.tell() > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise ImageRejected(
+            f'The image is larger than '
+            f'{settings.RECIPE_IMAGE_MAX_BYTES} bytes.'
+        )
+    f.seek(0)
+
+    try:
+        """ Lazy: only the header is read """
+        image = Image.open(f)
+    except Image.DecompressionBombError:
+        image = None
+    except Exception:
+        raise ImageRejected('The file is not a valid image.')
+
+    """ Pillow refuses the images of twice its MAX_IMAGE_PIXELS """
+    width, height = image.size if image is not None else (0, 0)
+    if image is None or width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise ImageRejected(
+            f'The image has more than '
+            f'{settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+        )
+    f.seek(0)
+
+    return width, height, image.format.lower()
+
+
+def set_image_metadata(recipe, metadata):
+    """
+    Set the (width, height, format) of a new image on the recipe,
+    its placeholder is made with its variants.
+    (None, None, '') when the image is removed.
+    """
+    recipe.image_width, recipe.image_height, recipe.image_format = metadata
+    recipe.image_placeholder = ''
+    recipe._image_metadata_set = True
+
+
+def _placeholder(source):
+    """ data: URI of a tiny JPEG of the image """
+
+    image = source.copy()
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BILINEAR)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    content = BytesIO()
+    image.save(content, 'JPEG', quality=40)
+
+    return 'data:image/jpeg;base64,' + \
+        base64.b64encode(content.getvalue()).decode()
+
+
+def variant_formats():
+    return [
+        name for name in settings.RECIPE_IMAGE_VARIANT_FORMATS
+        if name != 'webp' or features.check('webp')
+    ]
+
+
+def release_image(name):
+    """
+    Release the reference of a recipe to its replaced or deleted image
+    (see core.storage), once the change is committed
+    """
+
+    if name:
+        storage = Recipe._meta.get_field('image').storage
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def enqueue(recipe):
+    """ Queue the resizing of the current image of the recipe """
+    return ImageJob.objects.create(recipe=recipe, image=recipe.image.name)
+
+
+def remove_variants(recipe):
+    """
+    Delete the variants of the removed image of the recipe,
+    and their files once the change is committed
+    """
+
+    variants = list(recipe.image_variants.all())
+    ImageVariant.objects.filter(id__in=[variant.id for variant in variants]) \
+        .delete()
+
+    def delete_files():
+        for variant in variants:
+            variant.file.storage.delete(variant.file.name)
+
+    transaction.on_commit(delete_files)
+
+
+def _resize(source, size, image_format):
+    """
+    Copy of the image fitting in size, without enlarging it,
+    encoded in the format
+    """
+
+    image = source.copy()
+    image.thumbnail(size, Image.LANCZOS)
+
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        """ Transparent pixels on white, JPEG has no alpha channel """
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1])
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+
+    content = BytesIO()
+    image.save(content, image_format, **FORMATS[image_format.lower()][1])
+
+    return image.size, content.getvalue()
+
+
+def make_variants(recipe, image_name):
+    """
+    Create the variants of RECIPE_IMAGE_VARIANTS of the image,
+    replacing the variants of the previous images of the recipe.
+    Returns the replaced variants, whose files are to be deleted
+    once the transaction is committed.
+    """
+
+    sizes = settings.RECIPE_IMAGE_VARIANTS
+    largest = max(max(size) for size in sizes.values())
+
+    with recipe.image.storage.open(image_name) as f:
+        """ Checked again, the image can predate the limits """
+        metadata = inspect_image(f)
+        source = Image.open(f)
+
+        """
+        Decoding a JPEG at the smallest scale (1/2, 1/4, 1/8)
+        still larger than the largest variant, which is much faster
+        """
+        source.draft('RGB', (largest, largest))
+        source.load()
+
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    variants = []
+    try:
+        for name, size in sizes.items():
+            for variant_format in variant_formats():
+                image_format = FORMATS[variant_format][0]
+                (width, height), data = _resize(source, size, image_format)
+
+                variant = ImageVariant(
+                    recipe=recipe,
+                    source=image_name,
+                    name=name,
+                    format=variant_format,
+                    width=width,
+                    height=height,
+                )
+                ext = 'jpg' if variant_format == 'jpeg' else variant_format
+                variant.file.save(
+                    f'{stem}-{name}.{ext}',
+                    ContentFile(data),
+                    save=False
+                )
+                variants.append(variant)
+    except Exception:
+        for variant in variants:
+            variant.file.delete(save=False)
+        raise
+
+    old = list(recipe.image_variants.all())
+    ImageVariant.objects.filter(id__in=[variant.id for variant in old]) \
+        .delete()
+    ImageVariant.objects.bulk_create(variants)
+
+    """ Without saving the recipe, which can have changed meanwhile """
+    width, height, image_format = metadata
+    Recipe.objects.filter(pk=recipe.pk, image=image_name).update(
+        image_width=width,
+        image_height=height,
+        image_format=image_format,
+        image_placeholder=_placeholder(source),
+    )
+
+    """ The ETags of the recipe responses include the variants """
+    get_user_model().objects.bump_data_version([recipe.user_id])
+
+    return old
+
+
+def process_next_job(max_attempts):
+    """
+    Process the oldest pending job, returning it, or None when
+    the queue is empty (or the pending jobs are locked by other workers).
+    A failed job is tried again until max_attempts, after a delay
+    doubling with each attempt (RECIPE_IMAGE_JOB_RETRY_DELAY seconds,
+    at most RECIPE_IMAGE_JOB_MAX_RETRY_DELAY), so that a transient error
+    doesn't use up the attempts at once.
+    """
+
+    with transaction.atomic():
+        """ Locking the job only, the recipe can still be changed """
+        job = ImageJob.objects \
+            .select_for_update(skip_locked=True, of=('self',)) \
+            .filter(status=ImageJob.PENDING,
+                    next_attempt__lte=timezone.now()) \
+            .select_related('recipe') \
+            .order_by('id') \
+            .first()
+        if job is None:
+            return None
+
+        replaced = []
+        try:
+            with transaction.atomic():
+                """ A newer upload replaced the image: nothing to do """
+                if job.recipe.image.name == job.image:
+                    replaced = make_variants(job.recipe, job.image)
+            job.status = ImageJob.DONE
+            job.error = ''
+        except Exception as error:
+            job.attempts += 1
+            job.error = f'{type(error).__name__}: {error}'
+            if job.attempts >= max_attempts:
+                job.status = ImageJob.FAILED
+            else:
+                delay = min(
+                    settings.RECIPE_IMAGE_JOB_RETRY_DELAY *
+                    2 ** (job.attempts - 1),
+                    settings.RECIPE_IMAGE_JOB_MAX_RETRY_DELAY
+                )
+                job.next_attempt = timezone.now() + timedelta(seconds=delay)
+
+        job.save()
+
+    for variant in replaced:
+        variant.file.storage.delete(variant.file.name)
+
+    return job
@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from core.denormalize import refresh_recipe_relations
+from core.models import Tag, Ingredient, Recipe
+
+
+class RecipeImportError(ValueError):
+    """ Invalid record of an import file """
+
+
+"""
+Columns of the staging table the records are copied into.
+The names of the tags and ingredients are copied as JSON arrays.
+"""
+STAGING_COLUMNS = (
+    'line', 'title', 'time_minutes', 'price', 'link', 'tags', 'ingredients',
+)
+
+STAGING_TABLE = 'import_recipe_staging'
+
+"""
+ManyToMany fields of Recipe loaded from the arrays of names,
+with their staging column.
+"""
+RELATIONS = (
+    ('tags', Tag),
+    ('ingredients', Ingredient),
+)
+
+
+def read_records(file, output):
+    """
+    Yield (line, record) for every recipe of an NDJSON or CSV file,
+    in the format of recipe.export, one record at a time.
+    """
+
+    if output == 'ndjson':
+        for line, text in enumerate(file, start=1):
+            if text.strip():
+                try:
+                    yield line, json.loads(text)
+                except ValueError as exc:
+                    raise RecipeImportError(f'Line {line}: {exc}')
+
+    elif output == 'csv':
+        """ The header is line 1 """
+        for line, row in enumerate(csv.DictReader(file), start=2):
+            for field_name, _ in RELATIONS:
+                try:
+                    row[field_name] = json.loads(row.get(field_name) or '[]')
+                except ValueError as exc:
+                    raise RecipeImportError(
+                        f'Line {line}: {field_name}: {exc}'
+                    )
+            yield line, row
+
+    else:
+        raise RecipeImportError(f'Unknown format {output}')
+
+
+def clean_record(line, record):
+    """
+    Return the row copied to the staging table for a record,
+    with the same constraints as the Recipe fields.
+    """
+
+    def fail(message):
+        raise RecipeImportError(f'Line {line}: {message}')
+
+    if not isinstance(record, dict):
+        fail('a recipe must be an object')
+
+    title = str(record.get('title') or '').strip()
+    if not title or len(title) > 255:
+        fail('title must have between 1 and 255 characters')
+
+    try:
+        time_minutes = int(record.get('time_minutes'))
+    except (TypeError, ValueError):
+        fail('time_minutes must be an integer')
+
+    try:
+        price = Decimal(str(record.get('price'))).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        fail('price must be a decimal number')
+    if not price.is_finite():
+        fail('price must be a decimal number')
+    if abs(price) >= 1000:
+        fail('price must be lower than 1000')
+
+    link = str(record.get('link') or '')
+    if len(link) > 255:
+        fail('link must have at most 255 characters')
+
+    names = []
+    for field_name, _ in RELATIONS:
+        value = record.get(field_name) or []
+        if not isinstance(value, list) or \
+                not all(isinstance(name, str) for name in value):
+            fail(f'{field_name} must be a list of names')
+        if any(len(name) > 255 for name in value):
+            fail(f'{field_name} names must have at most 255 characters')
+        names.append(json.dumps(value))
+
+    return [line, title, time_minutes, price, link, *names]
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _copy_to_staging(cursor, rows):
+    """ Load the rows into a new staging table with a single COPY """
+
+    cursor.execute(
+        f'CREATE TEMPORARY TABLE {STAGING_TABLE} ('
+        f'line bigint, title text, time_minutes integer, '
+        f'price numeric(5, 2), link text, tags jsonb, ingredients jsonb, '
+        f'recipe_id integer) ON COMMIT DROP'
+    )
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    cursor.copy_expert(
+        f'COPY {STAGING_TABLE} ({", ".join(STAGING_COLUMNS)}) '
+        f'FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+
+
+def _merge_recipes(cursor, user):
+    """
+    Insert the staged recipes with ids taken from the sequence
+    beforehand, so the join rows can be inserted without reading back
+    the ids of the new recipes.
+    """
+
+    table = _quote(Recipe._meta.db_table)
+
+    cursor.execute(
+        f'UPDATE {STAGING_TABLE} SET recipe_id = '
+        f"nextval(pg_get_serial_sequence('{table}', 'id'))"
+    )
+    cursor.execute(
+        f'INSERT INTO {table} (id, user_id, title, time_minutes, price, '
+        f'link, ingredient_ids, tag_ids, image_format, image_placeholder) '
+        f"SELECT recipe_id, %s, title, time_minutes, price, "
+        f"COALESCE(link, ''), '{{}}', '{{}}', '', '' "
+        f'FROM {STAGING_TABLE} ORDER BY line',
+        [user.pk]
+    )
+
+
+def _merge_relation(cursor, user, field_name, model):
+    """
+    Create the missing tags or ingredients of the staged recipes,
+    then link every recipe to them, with one statement each.
+    The names are matched like UserAttrManager.bulk_get_or_create:
+    whitespace normalized, ignoring the case.
+    """
+
+    table = _quote(model._meta.db_table)
+    field = Recipe._meta.get_field(field_name)
+    through = field.remote_field.through._meta
+    join_table = _quote(through.db_table)
+    target = _quote(
+        through.get_field(field.m2m_reverse_field_name()).column
+    )
+
+    names = (
+        f"SELECT s.recipe_id, "
+        f"regexp_replace(btrim(n), '\\s+', ' ', 'g') AS name "
+        f'FROM {STAGING_TABLE} s, jsonb_array_elements_text(s.{field_name}) n'
+    )
+
+    cursor.execute(
+        f'INSERT INTO {table} (user_id, name) '
+        f'SELECT DISTINCT ON (lower(name)) %s, name FROM ({names}) names '
+        f"WHERE name <> '' ORDER BY lower(name), name "
+        f'ON CONFLICT (user_id, lower(name)) DO NOTHING',
+        [user.pk]
+    )
+    cursor.execute(
+        f'INSERT INTO {join_table} (recipe_id, {target}) '
+        f'SELECT DISTINCT names.recipe_id, r.id FROM ({names}) names '
+        f'JOIN {table} r ON r.user_id = %s '
+        f'AND lower(r.name) = lower(names.name) '
+        f'ON CONFLICT DO NOTHING',
+        [user.pk]
+    )
+
+
+def load_batch(user, rows):
+    """
+    Import the cleaned rows for the user with a COPY into a staging table
+    and set-based INSERT ... SELECT statements from it.
+    Must run in a transaction.
+    Return the ids of the new recipes.
+    """
+
+    with connection.cursor() as cursor:
+        _copy_to_staging(cursor, rows)
+        _merge_recipes(cursor, user)
+        for field_name, model in RELATIONS:
+            _merge_relation(cursor, user, field_name, model)
+
+        cursor.execute(f'SELECT recipe_id FROM {STAGING_TABLE}')
+        recipe_ids = [row[0] for row in cursor.fetchall()]
+
+        """ Dropped now for the next batch of an outer transaction """
+        cursor.execute(f'DROP TABLE {STAGING_TABLE}')
+
+    """
+    The inserts skip the signals keeping the id arrays,
+    the search vectors, the data version of the user and the cached
+    tag and ingredient lists in sync
+    """
+    refresh_recipe_relations(recipe_ids)
+    get_user_model().objects.bump_data_version([user.pk])
+
+    return recipe_ids
@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from core.models import ImageJob, Recipe
+
+
+class Command(BaseCommand):
+    """
+    Django command queueing an image job for the recipes whose image
+    has no dimensions yet, uploaded before they were stored:
+    process_image_jobs reads them with the placeholder and the variants.
+    The recipes with a pending job for their image are skipped,
+    so running it again queues nothing twice.
+    """
+
+    help = 'Queue the image jobs filling the metadata of the older images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of jobs queued per transaction',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        pending = ImageJob.objects.filter(
+            recipe=OuterRef('pk'),
+            image=OuterRef('image'),
+            status=ImageJob.PENDING
+        )
+        recipes = Recipe.objects.exclude(image='') \
+            .filter(image__isnull=False, image_width__isnull=True) \
+            .annotate(pending=Exists(pending)) \
+            .filter(pending=False) \
+            .order_by('id') \
+            .values_list('id', 'image')
+
+        queued = 0
+        last_id = 0
+        while True:
+            batch = list(
+                recipes.filter(id__gt=last_id)[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            with transaction.atomic():
+                ImageJob.objects.bulk_create(
+                    ImageJob(recipe_id=recipe_id, image=image)
+                    for recipe_id, image in batch
+                )
+            queued += len(batch)
+            last_id = batch[-1][0]
+            self.stdout.write(f'{queued} image jobs queued...')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Queued the image jobs of {queued} recipes'
+        ))
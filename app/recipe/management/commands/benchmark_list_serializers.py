@@ -0,0 +1,144 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import serializers
+
+
+"""
+The list responses of recipe.views: the model, the ordering,
+the relations prefetched for the model serializer, the model serializer
+and the fast serializer of values() rows.
+"""
+LISTS = (
+    (Recipe, ('-id',), ('tags', 'ingredients'),
+     serializers.RecipeSerializer, serializers.RecipeValuesSerializer),
+    (Tag, ('-name', 'id'), (),
+     serializers.TagSerializer, serializers.TagValuesSerializer),
+    (Ingredient, ('-name', 'id'), (),
+     serializers.IngredientSerializer, serializers.IngredientValuesSerializer),
+)
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """
+    Django command to compare the throughput of the model serializers
+    and of the values() serializers used by the list actions,
+    from the query to the rendered JSON.
+    The rows are seeded in a transaction that is rolled back.
+    """
+
+    help = 'Benchmark the list serializers against the values() ' \
+           'serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Number of recipes, tags and ingredients serialized',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Number of runs, the best one is reported',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = self._seed(options['rows'])
+
+            for model, ordering, relations, serializer_class, \
+                    values_serializer_class in LISTS:
+                queryset = model.objects.filter(user=user).order_by(*ordering)
+
+                def model_path():
+                    return serializer_class(
+                        queryset.prefetch_related(*relations),
+                        many=True
+                    ).data
+
+                def values_path():
+                    serializer = values_serializer_class()
+                    return serializer.to_representation(
+                        serializer.values(queryset)
+                    )
+
+                name = model.__name__
+                before = self._rate(model_path, options['repeat'])
+                after = self._rate(values_path, options['repeat'])
+
+                self.stdout.write(f'{name}: model serializer {before} rows/s')
+                self.stdout.write(f'{name}: values serializer {after} rows/s')
+                self.stdout.write(f'{name}: x{after / max(before, 1):.1f}')
+
+            transaction.set_rollback(True)
+
+    def _rate(self, serialize, repeat):
+        """ Best rows/s of serializing and rendering the whole list """
+
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = serialize()
+            JSONRenderer().render(data)
+            elapsed = time.perf_counter() - started
+
+            best = elapsed if best is None else min(best, elapsed)
+
+        return int(len(data) / max(best, 1e-9))
+
+    def _seed(self, rows):
+        """ Create a throwaway user owning `rows` of each model """
+
+        user = get_user_model().objects.create_user(
+            'benchmark-list-serializers@localhost'
+        )
+        self.stdout.write(f'Seeding {rows} rows per table...')
+
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}') for i in range(rows)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'Ingredient {i}') for i in range(rows)
+        )
+
+        """ Every recipe has 3 tags and 5 ingredients """
+        for start in range(0, rows, BATCH_SIZE):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=i % 120,
+                    price=i % 100,
+                    tag_ids=sorted(tag.id for tag in tags[i:i + 3]),
+                    ingredient_ids=sorted(
+                        ingredient.id for ingredient in ingredients[i:i + 5]
+                    ),
+                )
+                for i in range(start, min(start + BATCH_SIZE, rows))
+            )
+            Recipe.tags.through.objects.bulk_create(
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in recipes for tag_id in recipe.tag_ids
+            )
+            Recipe.ingredients.through.objects.bulk_create(
+                Recipe.ingredients.through(
+                    recipe_id=recipe.id,
+                    ingredient_id=ingredient_id
+                )
+                for recipe in recipes
+                for ingredient_id in recipe.ingredient_ids
+            )
+
+        return user
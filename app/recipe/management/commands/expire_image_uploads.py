@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipe.uploads import expire_uploads
+
+
+class Command(BaseCommand):
+    """
+    Django command deleting the chunked image uploads abandoned by
+    the clients, and their partial files in RECIPE_UPLOAD_DIR,
+    along with the partial files of the uploads deleted with their recipe.
+    Meant to run periodically, eg: from cron.
+    """
+
+    help = 'Delete the abandoned chunked uploads and their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-hours',
+            type=float,
+            default=settings.RECIPE_UPLOAD_EXPIRY_HOURS,
+            help='Hours since the last chunk after which an upload expires',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        cutoff = timezone.now() - timedelta(hours=options['max_age_hours'])
+        uploads, files, reclaimed = expire_uploads(cutoff)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Expired {uploads} uploads. Removed {files} partial files, '
+            f'{reclaimed / 1024 / 1024:.1f} MiB ({reclaimed} bytes) '
+            f'reclaimed.'
+        ))
@@ -0,0 +1,156 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.pagination import KeysetPagination
+
+
+"""
+The list queries of recipe.views, with the ordering they are paginated on,
+and the composite index built for each one.
+"""
+ACCESS_PATHS = (
+    (Tag, ('-name', 'id'), 'core_tag_user_name_id_idx'),
+    (Ingredient, ('-name', 'id'), 'core_ingr_user_name_id_idx'),
+    (Recipe, ('-id',), 'core_recipe_user_id_desc_idx'),
+)
+
+BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """
+    Django command to show the plans and timings of the recipe API
+    list queries with the composite indexes and without them.
+    Everything runs in a transaction that is rolled back,
+    but dropping the indexes locks the tables until it ends:
+    don't run it against a production database.
+    """
+
+    help = 'Benchmark the plans of the recipe API lists with and without ' \
+           'the composite indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=100000,
+            help='Number of tags, ingredients and recipes seeded',
+        )
+        parser.add_argument(
+            '--email',
+            help='Use the rows of this existing user instead of seeding',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=KeysetPagination.page_size,
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            if options['email']:
+                user = self._get_user(options['email'])
+            else:
+                user = self._seed(options['rows'])
+
+            self._analyze()
+            after = self._explain_all(user, options['page_size'], 'with')
+
+            with connection.cursor() as cursor:
+                for _, _, index in ACCESS_PATHS:
+                    cursor.execute(f'DROP INDEX {index}')
+
+            before = self._explain_all(user, options['page_size'], 'without')
+
+            self.stdout.write('\nExecution time (ms): without -> with')
+            for name in after:
+                self.stdout.write(
+                    f'{name}: {before[name]:.3f} -> {after[name]:.3f}'
+                )
+
+            transaction.set_rollback(True)
+
+    def _get_user(self, email):
+        try:
+            return get_user_model().objects.get(email=email)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with the email {email}')
+
+    def _seed(self, rows):
+        """ Create a throwaway user owning `rows` of each model """
+
+        user = get_user_model().objects.create_user(
+            'explain-access-paths@localhost'
+        )
+        self.stdout.write(f'Seeding {rows} rows per table...')
+
+        for start in range(0, rows, BATCH_SIZE):
+            numbers = range(start, min(start + BATCH_SIZE, rows))
+            Tag.objects.bulk_create(
+                Tag(user=user, name=f'Tag {i}') for i in numbers
+            )
+            Ingredient.objects.bulk_create(
+                Ingredient(user=user, name=f'Ingredient {i}')
+                for i in numbers
+            )
+            Recipe.objects.bulk_create(
+                Recipe(
+                    user=user,
+                    title=f'Recipe {i}',
+                    time_minutes=10,
+                    price=5
+                )
+                for i in numbers
+            )
+
+        return user
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            for model, _, _ in ACCESS_PATHS:
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def _explain_all(self, user, page_size, label):
+        """ Print the plans of the first and a deep page of every list """
+
+        timings = {}
+        for model, ordering, index in ACCESS_PATHS:
+            queryset = model.objects.filter(user=user).order_by(*ordering)
+
+            paginator = KeysetPagination()
+            paginator.ordering = ordering
+
+            """ Position of a row near the end of the list """
+            fields = [field.lstrip('-') for field in ordering]
+            count = queryset.count()
+            deep = list(
+                queryset.values_list(*fields)[max(count * 9 // 10, 0):][:1]
+            )
+
+            pages = [('first page', queryset)]
+            if deep:
+                pages.append((
+                    'deep page',
+                    queryset.filter(paginator.position_filter(list(deep[0])))
+                ))
+
+            for page, page_queryset in pages:
+                name = f'{model.__name__} {page}'
+                plan = page_queryset[:page_size + 1].explain(
+                    analyze=True,
+                    buffers=True
+                )
+                self.stdout.write(f'\n== {name} {label} {index}\n{plan}')
+                timings[name] = self._execution_time(plan)
+
+        return timings
+
+    def _execution_time(self, plan):
+        match = re.search(r'Execution Time: ([\d.]+) ms', plan)
+        return float(match.group(1)) if match else float('nan')
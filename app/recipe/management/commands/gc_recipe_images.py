@@ -0,0 +1,183 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import ImageBlob, ImageVariant, Recipe
+from core.storage import lock_name
+
+
+"""
+Directory of the recipe images and their variants, in MEDIA_ROOT
+"""
+IMAGES_DIR = 'uploads/recipe'
+
+
+class Command(BaseCommand):
+    """
+    Django command removing the recipe image files referenced by
+    no recipe, variant or content addressed blob: left by replaced
+    images of older versions, deleted recipes and users, interrupted
+    uploads...
+
+    The directory is walked with os.scandir and the files are checked
+    against the database in batches, so neither the files nor the names
+    are ever all in memory. Only the files older than the grace period are
+    removed, the newer ones can belong to an upload not committed yet.
+    Each file is checked again and removed under the lock of its name,
+    so a concurrent save referencing it again keeps it.
+    """
+
+    help = 'Remove the recipe image files no longer referenced'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=24,
+            help='Age of the files below which they are kept',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of files checked per query',
+        )
+        parser.add_argument(
+            '--max-per-second',
+            type=float,
+            default=100,
+            help='Most files removed per second, 0 for no limit',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the files to remove without removing them',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.options = options
+        self.cutoff = time.time() - options['grace_hours'] * 3600
+        self.started = time.monotonic()
+        self.scanned = self.removed = self.reclaimed = 0
+
+        batch = []
+        for name, entry in self._walk(IMAGES_DIR):
+            self.scanned += 1
+            if entry.stat().st_mtime < self.cutoff:
+                batch.append((name, entry))
+            if len(batch) >= options['batch_size']:
+                self._collect(batch)
+                batch = []
+        self._collect(batch)
+
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {self.scanned} files. {verb} {self.removed} files, '
+            f'{self.reclaimed / 1024 / 1024:.1f} MiB '
+            f'({self.reclaimed} bytes) reclaimed.'
+        ))
+
+    def _walk(self, directory):
+        """ (name in the storage, DirEntry) of the files under directory """
+
+        pending = [directory]
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = os.scandir(
+                    os.path.join(settings.MEDIA_ROOT, directory)
+                )
+            except FileNotFoundError:
+                continue
+
+            with entries:
+                for entry in entries:
+                    name = f'{directory}/{entry.name}'
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield name, entry
+
+    def _referenced(self, names):
+        """ Which of the names are referenced """
+
+        referenced = set(
+            Recipe.objects.filter(image__in=names)
+            .values_list('image', flat=True)
+        )
+        referenced.update(
+            ImageVariant.objects.filter(file__in=names)
+            .values_list('file', flat=True)
+        )
+        referenced.update(
+            ImageBlob.objects.filter(name__in=names, refcount__gt=0)
+            .values_list('name', flat=True)
+        )
+
+        return referenced
+
+    def _collect(self, batch):
+        if not batch:
+            return
+
+        referenced = self._referenced([name for name, _ in batch])
+
+        for name, entry in batch:
+            if name in referenced:
+                continue
+
+            if not self.options['dry_run']:
+                self._throttle()
+
+            size = self._remove(name, entry)
+            if size is None:
+                continue
+
+            self.removed += 1
+            self.reclaimed += size
+            if self.options['verbosity'] >= 2:
+                self.stdout.write(name)
+
+    def _remove(self, name, entry):
+        """
+        Remove the file if still unreferenced and old, returning its size.
+        Checked again under the lock of the name, which a save referencing
+        the file holds until committed (see core.storage.lock_name)
+        """
+
+        with transaction.atomic():
+            lock_name(name)
+            if self._referenced([name]):
+                return None
+
+            try:
+                st = os.stat(entry.path)
+            except FileNotFoundError:
+                return None
+            if st.st_mtime >= self.cutoff:
+                return None
+
+            if not self.options['dry_run']:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    return None
+
+        return st.st_size
+
+    def _throttle(self):
+        """ Waiting until removing one more file keeps under the rate """
+
+        rate = self.options['max_per_second']
+        if rate <= 0:
+            return
+
+        wait = self.started + self.removed / rate - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
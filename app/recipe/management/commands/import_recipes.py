@@ -0,0 +1,128 @@
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import ImportCheckpoint
+
+from recipe.export import EXPORT_FORMATS
+from recipe.importer import (
+    RecipeImportError,
+    clean_record,
+    load_batch,
+    read_records,
+)
+
+
+class Command(BaseCommand):
+    """
+    Django command to import the recipes of a user from an NDJSON or
+    CSV file, in the format of the recipes export.
+    Each batch is copied into a staging table and merged with
+    set-based statements, in its own transaction.
+    The progress is saved with every batch: running the command again
+    with the same file resumes after the last batch imported.
+    """
+
+    help = 'Import recipes from an NDJSON or CSV file with COPY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--email',
+            required=True,
+            help='Owner of the imported recipes',
+        )
+        parser.add_argument(
+            '--output',
+            choices=list(EXPORT_FORMATS),
+            help='Format of the file, by default from its extension',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of recipes imported per transaction',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Import the whole file again instead of resuming',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        path = options['path']
+        output = options['output'] or os.path.splitext(path)[1].lstrip('.')
+        if output not in EXPORT_FORMATS:
+            raise CommandError(f'Unknown format of {path}, use --output')
+
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(
+            user=user,
+            source=os.path.abspath(path)[-255:]
+        )
+        if options['restart']:
+            checkpoint.records_done = 0
+            checkpoint.finished = False
+        elif checkpoint.finished:
+            self.stdout.write(f'{path} was already imported, see --restart')
+            return
+        elif checkpoint.records_done:
+            self.stdout.write(
+                f'Resuming after {checkpoint.records_done} recipes...'
+            )
+
+        started = time.monotonic()
+        imported = 0
+
+        with open(path, newline='', encoding='utf-8') as file:
+            records = islice(
+                read_records(file, output),
+                checkpoint.records_done,
+                None
+            )
+
+            try:
+                while True:
+                    batch = [
+                        clean_record(line, record) for line, record
+                        in islice(records, options['batch_size'])
+                    ]
+                    if not batch:
+                        break
+
+                    with transaction.atomic():
+                        load_batch(user, batch)
+                        checkpoint.records_done += len(batch)
+                        checkpoint.save()
+
+                    imported += len(batch)
+                    self.stdout.write(
+                        f'{checkpoint.records_done} recipes imported '
+                        f'({self._rate(imported, started)} rows/s)'
+                    )
+            except RecipeImportError as exc:
+                raise CommandError(
+                    f'{exc}. Fix the file and run the command again '
+                    f'to resume after recipe {checkpoint.records_done}'
+                )
+
+        checkpoint.finished = True
+        checkpoint.save()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in '
+            f'{time.monotonic() - started:.1f}s '
+            f'({self._rate(imported, started)} rows/s)'
+        ))
+
+    def _rate(self, rows, started):
+        return int(rows / max(time.monotonic() - started, 1e-6))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipe.cache import list_cache
+
+
+class Command(BaseCommand):
+    """
+    Django command to show the hits and misses of the cache
+    of the tag and ingredient lists
+    """
+
+    help = 'Show the hit and miss counters of the list cache'
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        stats = list_cache.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+
+        self.stdout.write(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit ratio: {ratio:.1%}'
+        )
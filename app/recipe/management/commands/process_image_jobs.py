@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.models import ImageJob
+
+from recipe.images import process_next_job
+
+
+class Command(BaseCommand):
+    """
+    Django command running a worker of the image jobs queue,
+    making the resized variants of the uploaded recipe images.
+    Any number of workers can run at once.
+    """
+
+    help = 'Process the queued recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit when the queue is empty instead of waiting',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2,
+            help='Seconds between the checks of an empty queue',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=3,
+            help='Attempts of a job before it is marked as failed',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        while True:
+            job = process_next_job(options['max_attempts'])
+
+            if job is None:
+                if options['once']:
+                    return
+                close_old_connections()
+                time.sleep(options['sleep'])
+            elif job.status == ImageJob.DONE:
+                self.stdout.write(f'{job.image}: done')
+            else:
+                self.stdout.write(self.style.ERROR(
+                    f'{job.image}: {job.status}, attempt {job.attempts}, '
+                    f'{job.error}'
+                ))
@@ -0,0 +1,182 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset (cursor) pagination.
+
+    The page is selected with a WHERE clause on the ordering columns
+    of the last row of the previous page, instead of an OFFSET,
+    so every page costs the same as the first one when the ordering
+    is backed by an index. No COUNT(*) is ever issued, one extra row is
+    fetched to know whether there is a next page.
+
+    The ordering is taken from the `keyset_ordering` attribute of the view
+    and must end with a unique column (eg: id) so that the position
+    of a row is never ambiguous.
+    """
+
+    ordering = ('-id',)
+    page_size = 100
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """ Return the rows of the page selected by the request cursor """
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self.convert_position(queryset, position)
+            queryset = queryset.filter(self.position_filter(position))
+
+        """
+        Fetching one row more than the page size for knowing
+        if there is a next page without counting the rows.
+        """
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        """ Page size requested by the client, bounded by max_page_size """
+
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        if page_size <= 0:
+            return self.page_size
+
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        last = self.page[-1]
+        position = [
+            self._get_value(last, field.lstrip('-'))
+            for field in self.ordering
+        ]
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url,
+            self.cursor_query_param,
+            self.encode_cursor(position)
+        )
+
+    def position_filter(self, position):
+        """
+        Build the filter selecting the rows after the given position.
+        For an ordering (-name, id) and a position (n, i):
+        name <= n AND (name < n OR (name = n AND id > i))
+        The leading `name <= n` is redundant but gives the database
+        the start of the index range to scan.
+        """
+
+        fields = [
+            (field.lstrip('-'), field.startswith('-'))
+            for field in self.ordering
+        ]
+
+        condition = None
+        for (name, descending), value in reversed(list(zip(fields,
+                                                           position))):
+            lookup = 'lt' if descending else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            if condition is not None:
+                after |= Q(**{name: value}) & condition
+            condition = after
+
+        name, descending = fields[0]
+        lookup = 'lte' if descending else 'gte'
+        return Q(**{f'{name}__{lookup}': position[0]}) & condition
+
+    def encode_cursor(self, position):
+        """ Opaque representation of the position of the last row """
+
+        data = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """ Return the position stored in the cursor, or None """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            data = base64.urlsafe_b64decode(encoded + padding)
+            position = json.loads(data.decode())
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        for value in position:
+            if not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+
+        return position
+
+    def convert_position(self, queryset, position):
+        """
+        Convert the values of the cursor to the types of the ordering
+        fields, a tampered cursor would fail building the query
+        """
+
+        converted = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            try:
+                annotation = queryset.query.annotations.get(name)
+                if annotation is not None:
+                    model_field = annotation.output_field
+                else:
+                    model_field = queryset.model._meta.get_field(name)
+
+                converted.append(model_field.to_python(value))
+            except (FieldDoesNotExist, ValidationError, ValueError,
+                    TypeError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return converted
+
+    def _get_value(self, row, name):
+        """ Rows can be model instances or dictionaries from values() """
+
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
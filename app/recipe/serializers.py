@@ -1,9 +1,105 @@
+import os
+import re
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from core.denormalize import refresh_recipe_relations
+from core.models import (
+    Tag,
+    Ingredient,
+    Recipe,
+    ImageUpload,
+    normalize_name,
+)
+
+from recipe.images import ImageRejected, inspect_image, set_image_metadata
+
+from recipe.fields import UserPrimaryKeyRelatedField
+
+
+class BaseRecipeAttrSerializer(serializers.ModelSerializer):
+    """ Base serializer for user owned recipe attributes """
+
+    def validate_name(self, value):
+        """
+        Names are stored normalized and are unique per user
+        ignoring the case, eg: 'Salt' and ' salt ' are the same tag.
+        """
+        value = normalize_name(value)
+        if not value:
+            raise serializers.ValidationError('This field may not be blank.')
+
+        user = self.context['request'].user
+        queryset = self.Meta.model.objects.annotate(
+            lower_name=Lower('name')
+        ).filter(user=user, lower_name=value.lower())
+
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+
+        if queryset.exists():
+            raise serializers.ValidationError(self._duplicate_name_message())
+
+        return value
+
+    def _duplicate_name_message(self):
+        return (
+            f'A {self.Meta.model._meta.verbose_name} '
+            f'with this name already exists.'
+        )
+
+    def _save_unique_name(self, save, *args):
+        """
+        validate_name races with a concurrent request saving the same name,
+        the unique index of the name (see the 0011 migration) then fails
+        the insert and is reported like validate_name
+        """
+        try:
+            with transaction.atomic():
+                return save(*args)
+        except IntegrityError as error:
+            diag = getattr(error.__cause__, 'diag', None)
+            index = f'{self.Meta.model._meta.db_table}_user_lower_name_uniq'
+            if getattr(diag, 'constraint_name', None) != index:
+                raise
 
-from core.models import Tag, Ingredient, Recipe
+            raise serializers.ValidationError({
+                'name': [self._duplicate_name_message()]
+            })
 
+    def create(self, validated_data):
+        return self._save_unique_name(super().create, validated_data)
 
-class TagSerializer(serializers.ModelSerializer):
+    def update(self, instance, validated_data):
+        return self._save_unique_name(
+            super().update,
+            instance,
+            validated_data
+        )
+
+
+class BulkNamesSerializer(serializers.Serializer):
+    """
+    Serializer for creating many tags or ingredients at once,
+    eg: {"names": ["Salt", "Pepper"]}
+    """
+    MAX_NAMES = 1000
+
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=MAX_NAMES
+    )
+
+
+class TagSerializer(BaseRecipeAttrSerializer):
     """
     Serializer for the Tag object.
     This will run first when doing any HTTP requests (POST, GET, UPDATE).
@@ -26,7 +122,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(BaseRecipeAttrSerializer):
     """
     Serializer for the Ingredient object.
     This will run first when doing any HTTP requests (POST, GET, UPDATE).
@@ -49,25 +145,40 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Serializer returning only the fields listed in context['fields'],
+    eg: ['id', 'title'] for ?fields=id,title
+    Every field is returned when there is no such list.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        fields = self.context.get('fields')
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """ Serializer for the Recipe model """
 
     """
     How detailed the ingredient part of the GET response.
     The queryset field is used for model instance lookups
-    when validating the field input of a POST method.
-    To the queryset field it will be appended a .get(pk=data)
-    resulting in Ingredient.objects.all().get(pk=data)
-    so that it filters by primary key.
+    when validating the field input of a POST method,
+    restricted to the objects of the user making the request.
+    All the submitted IDs are looked up in one id IN (...) query.
     many=True because it will be returning many instances
     Just returning the id in the DB
     """
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -103,10 +214,291 @@ class RecipeDetailSerializer(RecipeSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
+class RecipeBulkListSerializer(serializers.ListSerializer):
+    """
+    Serializer for creating many recipes at once.
+    The tags and ingredients of every item are looked up together,
+    and the recipes and their relations are inserted in bulk.
+    """
+    MAX_ITEMS = 500
+
+    RELATED_FIELDS = (('tags', Tag), ('ingredients', Ingredient))
+
+    def to_internal_value(self, data):
+        """
+        Validating every item, then checking in one query per model
+        that the IDs belong to the user.
+        The errors are returned per item, in the same order as the input.
+        """
+
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        if len(data) > self.MAX_ITEMS:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Ensure there are no more than {self.MAX_ITEMS} '
+                    f'recipes.'
+                ]
+            })
+
+        items = []
+        errors = []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append({'tags': [], 'ingredients': []})
+                errors.append(exc.detail)
+
+        user = self.context['request'].user
+
+        for field_name, model in self.RELATED_FIELDS:
+            wanted = {pk for item in items for pk in item[field_name]}
+            found = set(
+                model.objects.filter(user=user, id__in=wanted)
+                .values_list('id', flat=True)
+            )
+
+            for item, item_errors in zip(items, errors):
+                missing = [pk for pk in item[field_name] if pk not in found]
+                if missing:
+                    item_errors[field_name] = [
+                        f'Invalid pk "{pk}" - object does not exist.'
+                        for pk in missing
+                    ]
+
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
+
+    def create(self, validated_data):
+        """
+        Inserting the recipes with one INSERT and the rows of each
+        join table with another one, all or nothing.
+        The bulk inserts skip the signals keeping the id arrays,
+        search vectors and data version in sync, so these are
+        updated here.
+        """
+
+        user = self.context['request'].user
+
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([
+                Recipe(user=user, **{
+                    key: value for key, value in item.items()
+                    if key not in dict(self.RELATED_FIELDS)
+                })
+                for item in validated_data
+            ])
+
+            for field_name, _ in self.RELATED_FIELDS:
+                field = Recipe._meta.get_field(field_name)
+                through = field.remote_field.through
+                column = through._meta.get_field(
+                    field.m2m_reverse_field_name()
+                ).attname
+                through.objects.bulk_create([
+                    through(recipe_id=recipe.id, **{column: pk})
+                    for recipe, item in zip(recipes, validated_data)
+                    for pk in dict.fromkeys(item[field_name])
+                ])
+
+            refresh_recipe_relations(recipe.id for recipe in recipes)
+            get_user_model().objects.bump_data_version([user.pk])
+
+        return recipes
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """
+    Serializer for an item of the batch recipe creation.
+    The IDs are validated together by RecipeBulkListSerializer
+    instead of one query per ID.
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        default=list
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = RecipeBulkListSerializer
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes"""
 
+    """
+    URLs of the resized copies of the image, by name and format,
+    eg: {'thumb': {'webp': URL, 'jpeg': URL}}.
+    Empty until the image jobs have made them.
+    """
+    variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        fields = (
+            'id', 'image', 'variants',
+            'image_width', 'image_height', 'image_format',
+            'image_placeholder',
+        )
+        read_only_fields = (
+            'id', 'image_width', 'image_height', 'image_format',
+            'image_placeholder',
+        )
+
+    def validate_image(self, value):
+        """
+        Checking the size and the dimensions of the image from its header,
+        keeping them for the recipe. None removes the image.
+        """
+        self._image_metadata = (None, None, '')
+        if value is None:
+            return value
+
+        try:
+            self._image_metadata = inspect_image(value)
+        except ImageRejected as error:
+            raise serializers.ValidationError(str(error))
+
+        return value
+
+    def update(self, instance, validated_data):
+        if 'image' in validated_data:
+            set_image_metadata(instance, self._image_metadata)
+
+        return super().update(instance, validated_data)
+
+    def get_variants(self, recipe):
+        request = self.context.get('request')
+
+        variants = {}
+        for variant in recipe.image_variants.all():
+            """ The variants of a replaced image until the new ones """
+            if variant.source != recipe.image.name:
+                continue
+
+            url = variant.file.url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            variants.setdefault(variant.name, {})[variant.format] = url
+
+        return variants
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the chunked uploads of recipe images.
+    `received` is the offset of the next chunk.
+    """
+
+    class Meta:
+        model = ImageUpload
+        fields = ('id', 'filename', 'size', 'sha256', 'received')
+        read_only_fields = ('id', 'received')
+
+    def validate_filename(self, value):
+        """ Only the extension is kept, see recipe_image_file_path """
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.RECIPE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Must be between 1 and {settings.RECIPE_UPLOAD_MAX_SIZE}.'
+            )
+
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError('Not a SHA-256 hex digest.')
+
+        return value
+
+
+class ValuesListSerializer:
+    """
+    Read-only serializer of the rows of a values() queryset,
+    returning the same data as `model_serializer` does for the model
+    instances, for the list responses.
+    The rows are turned into dictionaries directly: only the fields
+    whose representation differs from the database value (eg: Decimal)
+    go through their DRF field.
+    """
+
+    """ ModelSerializer whose output is reproduced """
+    model_serializer = None
+
+    """ values() column of an output field, when named differently """
+    sources = {}
+
+    """ Fields whose value is returned as read from the database """
+    PASSTHROUGH_FIELDS = (
+        serializers.IntegerField,
+        serializers.CharField,
+        serializers.ManyRelatedField,
+    )
+
+    def __init__(self, fields=None):
+        """ fields: output fields, as for SparseFieldsMixin """
+
+        serializer = self.model_serializer(context={'fields': fields})
+
+        self.columns = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, self.PASSTHROUGH_FIELDS):
+                convert = None
+            else:
+                convert = field.to_representation
+            self.columns.append((name, self.sources.get(name, name), convert))
+
+    def values(self, queryset, *extra):
+        """
+        The queryset returning the rows to serialize,
+        with the `extra` columns needed by the pagination.
+        """
+        return queryset.prefetch_related(None).values(
+            *dict.fromkeys([source for _, source, _ in self.columns] +
+                           list(extra))
+        )
+
+    def to_representation(self, rows):
+        return [
+            OrderedDict([
+                (
+                    name,
+                    row[source] if convert is None or row[source] is None
+                    else convert(row[source])
+                )
+                for name, source, convert in self.columns
+            ])
+            for row in rows
+        ]
+
+
+class TagValuesSerializer(ValuesListSerializer):
+    """ Fast list serializer with the output of TagSerializer """
+    model_serializer = TagSerializer
+
+
+class IngredientValuesSerializer(ValuesListSerializer):
+    """ Fast list serializer with the output of IngredientSerializer """
+    model_serializer = IngredientSerializer
+
+
+class RecipeValuesSerializer(ValuesListSerializer):
+    """
+    Fast list serializer with the output of RecipeSerializer.
+    The tag and ingredient IDs are read from the id arrays of the
+    recipe row (see core.signals), without querying the join tables.
+    """
+    model_serializer = RecipeSerializer
+    sources = {'tags': 'tag_ids', 'ingredients': 'ingredient_ids'}
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.models import Recipe
+
+from recipe.images import (
+    enqueue,
+    release_image,
+    remove_variants,
+    set_image_metadata,
+)
+
+
+@receiver(pre_save, sender=Recipe)
+def find_replaced_recipe_image(sender, instance, update_fields=None,
+                               **kwargs):
+    """
+    Keeping the stored image of a recipe whose image changes, by any
+    means (API, upload, admin...). A new file saves a new reference even
+    when it has the name of the stored one (same content, see core.storage)
+    """
+
+    instance._replaced_image = None
+    if update_fields is not None and 'image' not in update_fields:
+        return
+
+    stored = None
+    if not instance._state.adding:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+        if connection.in_atomic_block:
+            """ A concurrent replacement releases the stored image once """
+            recipes = recipes.select_for_update()
+        stored = recipes.values_list('image', flat=True).first()
+
+    new_file = bool(instance.image) and not instance.image._committed
+    if not new_file and (stored or None) == (instance.image.name or None):
+        return
+
+    instance._replaced_image = stored or ''
+
+    """ Filled by the image job when not set from the header """
+    if not getattr(instance, '_image_metadata_set', False):
+        set_image_metadata(instance, (None, None, ''))
+
+
+@receiver(post_save, sender=Recipe)
+def queue_replaced_recipe_image(sender, instance, **kwargs):
+    """ Releasing the replaced image and queueing the variants of the new """
+
+    replaced = getattr(instance, '_replaced_image', None)
+    instance._replaced_image = None
+    instance._image_metadata_set = False
+    if replaced is None:
+        return
+
+    release_image(replaced)
+
+    """ The variants are made by process_image_jobs """
+    if instance.image:
+        enqueue(instance)
+    else:
+        remove_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_recipe_image(sender, instance, **kwargs):
+    """ The image stays stored while other recipes use it """
+    release_image(instance.image.name)
@@ -0,0 +1,78 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Tag, Recipe
+
+from recipe.management.commands.explain_access_paths import ACCESS_PATHS
+
+
+class AccessPathIndexTests(TestCase):
+    """ Test the composite indexes of the list queries """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+    def _plan(self, queryset):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        return queryset.explain()
+
+    def test_tag_list_ordered_by_index(self):
+        """
+        Test that the tags of a user are read in order from the index,
+        without sorting them
+        """
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        plan = self._plan(
+            Tag.objects.filter(user=self.user).order_by('-name', 'id')[:101]
+        )
+
+        self.assertIn('core_tag_user_name_id_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_recipe_list_ordered_by_index(self):
+        """ Test that the recipes of a user are read from the index """
+
+        Recipe.objects.create(
+            user=self.user,
+            title='Soyo',
+            time_minutes=5,
+            price=1.00
+        )
+
+        plan = self._plan(
+            Recipe.objects.filter(user=self.user).order_by('-id')[:101]
+        )
+
+        self.assertIn('core_recipe_user_id_desc_idx', plan)
+        self.assertNotIn('Sort', plan)
+
+    def test_explain_access_paths_command(self):
+        """ Test the benchmark prints the timings before and after """
+
+        out = StringIO()
+        call_command('explain_access_paths', '--rows=50', stdout=out)
+
+        output = out.getvalue()
+        for model, _, index in ACCESS_PATHS:
+            self.assertIn(f'{model.__name__} first page', output)
+            self.assertIn(f'with {index}', output)
+            self.assertIn(f'without {index}', output)
+
+        """ The dropped indexes are restored by the rollback """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_indexes WHERE indexname = ANY(%s)',
+                [[index for _, _, index in ACCESS_PATHS]]
+            )
+            self.assertEqual(cursor.fetchone()[0], len(ACCESS_PATHS))
@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe.serializers import TagSerializer
+
+
+TAGS_URL = reverse('recipe:tag-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+class BulkNamesTests(TestCase):
+    """ Test creating many tags and ingredients at once """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_returns_every_id(self):
+        """ Test that new and existing names are returned in order """
+
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        names = ['Pepper', ' salt ', 'Olive  oil', 'PEPPER', 'Salt']
+        """ The upsert, and the data version bump of the user """
+        with self.assertNumQueries(2):
+            res = self.client.post(
+                INGREDIENTS_BULK_URL,
+                {'names': names},
+                format='json'
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['name'], row['created']) for row in res.data],
+            [('Pepper', True), ('Salt', False), ('Olive oil', True)]
+        )
+        self.assertEqual(res.data[1]['id'], salt.id)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(),
+            3
+        )
+
+        """ Posting the same names again creates nothing """
+        res = self.client.post(
+            INGREDIENTS_BULK_URL,
+            {'names': names},
+            format='json'
+        )
+        self.assertFalse(any(row['created'] for row in res.data))
+
+    def test_bulk_names_per_user(self):
+        """ Test the same name of another user is a different tag """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        other = Tag.objects.create(user=user2, name='Vegan')
+
+        res = self.client.post(
+            TAGS_BULK_URL,
+            {'names': ['Vegan']},
+            format='json'
+        )
+
+        self.assertTrue(res.data[0]['created'])
+        self.assertNotEqual(res.data[0]['id'], other.id)
+
+    def test_bulk_invalid_payload(self):
+        """ Test the payload must be a non empty list of names """
+
+        for payload in ({}, {'names': []}, {'names': ['']},
+                        {'names': ['a' * 256]}, {'names': ['x'] * 1001}):
+            res = self.client.post(TAGS_BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertFalse(Tag.objects.exists())
+
+    def test_create_duplicate_name_rejected(self):
+        """ Test a single POST can't duplicate a name ignoring case """
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': '  VEGAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.count(), 1)
+
+    def test_names_unique_in_database(self):
+        """ Test the database rejects names differing only by case """
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tag.objects.create(user=self.user, name='vegan ')
+
+    def test_concurrent_duplicate_name(self):
+        """
+        Test a name saved by another request after validate_name
+        is a validation error and not a server error
+        """
+
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        with patch.object(
+            TagSerializer,
+            'validate_name',
+            lambda serializer, value: value
+        ):
+            res = self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('already exists', str(res.data['name']))
+        self.assertEqual(Tag.objects.count(), 1)
@@ -0,0 +1,364 @@
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.http.request import UnreadablePostError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from core.models import ImageJob, ImageUpload, Recipe
+
+from recipe import uploads
+from recipe.uploads import append_chunk
+
+
+CHUNK = 1000
+
+
+def uploads_url(recipe_id):
+    return reverse('recipe:recipe-create-upload', args=[recipe_id])
+
+
+def chunk_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-upload-chunk', args=[recipe_id, upload_id])
+
+
+def finalize_url(recipe_id, upload_id):
+    return reverse(
+        'recipe:recipe-finalize-upload',
+        args=[recipe_id, upload_id]
+    )
+
+
+def sample_image():
+    """ A JPEG of a few chunks """
+    content = BytesIO()
+    Image.effect_noise((100, 100), 50).convert('RGB').save(content, 'JPEG')
+
+    return content.getvalue()
+
+
+class ChunkedUploadTests(TestCase):
+    """ Test uploading the image of a recipe in chunks """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.partial = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            MEDIA_ROOT=self.media.name,
+            RECIPE_UPLOAD_DIR=self.partial.name,
+            RECIPE_UPLOAD_MAX_CHUNK=CHUNK
+        )
+        self.settings.enable()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=10,
+            price=5.00
+        )
+
+        self.data = sample_image()
+        self.assertGreater(len(self.data), 2 * CHUNK)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+        self.partial.cleanup()
+
+    def _start(self, data=None, sha256=None):
+        data = self.data if data is None else data
+        res = self.client.post(uploads_url(self.recipe.id), {
+            'filename': '../photo.jpg',
+            'size': len(data),
+            'sha256': sha256 or hashlib.sha256(data).hexdigest(),
+        })
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['received'], 0)
+
+        return res.data['id']
+
+    def _put(self, upload_id, offset, chunk, **headers):
+        return self.client.generic(
+            'PUT',
+            chunk_url(self.recipe.id, upload_id),
+            chunk,
+            content_type='application/octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+            **headers
+        )
+
+    def _send(self, upload_id, data=None, start=0):
+        data = self.data if data is None else data
+        for offset in range(start, len(data), CHUNK):
+            chunk = data[offset:offset + CHUNK]
+            res = self._put(
+                upload_id,
+                offset,
+                chunk,
+                HTTP_CHUNK_SHA256=hashlib.sha256(chunk).hexdigest()
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data['received'], offset + len(chunk))
+
+    def test_upload_in_chunks(self):
+        """ Test the chunks become the recipe image on finalize """
+
+        upload_id = self._start()
+        self._send(upload_id)
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['variants'], {})
+        self.assertEqual(res.data['image_width'], 100)
+        self.assertEqual(res.data['image_format'], 'jpeg')
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        self.assertEqual(self.recipe.image_height, 100)
+        with open(self.recipe.image.path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+        self.assertTrue(ImageJob.objects.filter(recipe=self.recipe).exists())
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertEqual(os.listdir(self.partial.name), [])
+
+    def test_resume_after_disconnect(self):
+        """ Test an upload resumes from the bytes received """
+
+        upload_id = self._start()
+        self._put(upload_id, 0, self.data[:CHUNK])
+
+        """ A chunk cut by the disconnection is discarded """
+        with self.assertRaises(ValidationError):
+            append_chunk(
+                ImageUpload.objects.get(),
+                CHUNK,
+                BytesIO(self.data[CHUNK:CHUNK + 10]),
+                CHUNK
+            )
+
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['received'], CHUNK)
+
+        self._send(upload_id, start=res.data['received'])
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.recipe.refresh_from_db()
+        with open(self.recipe.image.path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_chunk_received_outside_transaction(self):
+        """
+        Test the chunk is read from the client without a transaction,
+        and a disconnection is a client error
+        """
+
+        upload_id = self._start()
+        upload = ImageUpload.objects.get()
+        savepoints = len(connection.savepoint_ids)
+        test = self
+
+        class Stream(BytesIO):
+            def read(self, size=-1):
+                test.assertEqual(len(connection.savepoint_ids), savepoints)
+                return super().read(size)
+
+        append_chunk(upload, 0, Stream(self.data[:CHUNK]), CHUNK)
+
+        class Disconnected:
+            def read(self, size=-1):
+                raise UnreadablePostError('client disconnected')
+
+        with self.assertRaises(ValidationError):
+            append_chunk(
+                ImageUpload.objects.get(),
+                CHUNK,
+                Disconnected(),
+                CHUNK
+            )
+
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['received'], CHUNK)
+        self.assertEqual(
+            os.listdir(self.partial.name),
+            [f'{upload_id}.part']
+        )
+
+    def test_wrong_offset_and_chunk_checksum(self):
+        """ Test the chunks at another offset or corrupted are refused """
+
+        upload_id = self._start()
+        self._put(upload_id, 0, self.data[:CHUNK])
+
+        res = self._put(upload_id, 0, self.data[:CHUNK])
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['received'], CHUNK)
+
+        res = self._put(
+            upload_id,
+            CHUNK,
+            self.data[CHUNK:2 * CHUNK],
+            HTTP_CHUNK_SHA256='0' * 64
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self._put(upload_id, CHUNK, self.data[CHUNK:3 * CHUNK])
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+
+        self.assertEqual(ImageUpload.objects.get().received, CHUNK)
+        self.assertEqual(
+            os.path.getsize(os.path.join(
+                self.partial.name,
+                f'{upload_id}.part'
+            )),
+            CHUNK
+        )
+
+    def test_finalize_checks_the_file(self):
+        """ Test an incomplete, corrupted or non image file is refused """
+
+        upload_id = self._start()
+        self._put(upload_id, 0, self.data[:CHUNK])
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        upload_id = self._start(sha256='0' * 64)
+        self._send(upload_id)
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+
+        text = b'not an image' * 100
+        upload_id = self._start(text)
+        self._send(upload_id, text)
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_finalize_keeps_concurrent_edits(self):
+        """ Test finalize only writes the image of the recipe """
+
+        upload_id = self._start()
+        self._send(upload_id)
+
+        check_file = uploads._check_file
+
+        def check_file_while_edited(*args):
+            Recipe.objects.filter(pk=self.recipe.pk).update(title='Edited')
+            return check_file(*args)
+
+        with patch('recipe.uploads._check_file', check_file_while_edited):
+            res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Edited')
+        self.assertTrue(self.recipe.image)
+        self.assertEqual(self.recipe.image_width, 100)
+
+    def test_finalize_without_partial_file(self):
+        """ Test an upload whose file is gone is refused and deleted """
+
+        upload_id = self._start()
+        self._send(upload_id)
+        os.remove(os.path.join(self.partial.name, f'{upload_id}.part'))
+
+        res = self.client.post(finalize_url(self.recipe.id, upload_id))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+
+    def test_expire_abandoned_uploads(self):
+        """
+        Test the uploads without a chunk for too long are deleted with
+        their files, and the files of deleted uploads are removed
+        """
+
+        old = time.time() - 2 * 3600
+
+        abandoned = self._start()
+        self._put(abandoned, 0, self.data[:CHUNK])
+        ImageUpload.objects.filter(pk=abandoned).update(
+            updated=timezone.now() - timedelta(hours=2)
+        )
+
+        active = self._start()
+        self._put(active, 0, self.data[:CHUNK])
+
+        orphan = os.path.join(self.partial.name, f'{uuid.uuid4()}.part')
+        recent_orphan = os.path.join(self.partial.name, f'{uuid.uuid4()}.part')
+        for path in (orphan, recent_orphan):
+            with open(path, 'wb') as f:
+                f.write(b'x' * 10)
+        os.utime(orphan, (old, old))
+
+        out = StringIO()
+        call_command('expire_image_uploads', max_age_hours=1, stdout=out)
+
+        self.assertIn('Expired 1 uploads. Removed 2 partial files',
+                      out.getvalue())
+        self.assertEqual(
+            list(ImageUpload.objects.values_list('pk', flat=True)),
+            [uuid.UUID(active)]
+        )
+        self.assertCountEqual(
+            os.listdir(self.partial.name),
+            [f'{active}.part', os.path.basename(recent_orphan)]
+        )
+
+    def test_invalid_start(self):
+        """ Test the size and checksum of the file are validated """
+
+        for size, sha256 in ((0, 'a' * 64), (30 * 1024 * 1024, 'a' * 64),
+                             (10, 'xyz')):
+            res = self.client.post(uploads_url(self.recipe.id), {
+                'filename': 'photo.jpg',
+                'size': size,
+                'sha256': sha256,
+            })
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_of_other_user(self):
+        """ Test the uploads of another user are not found """
+
+        upload_id = self._start()
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        self.client.force_authenticate(user=user2)
+
+        res = self._put(upload_id, 0, self.data[:CHUNK])
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
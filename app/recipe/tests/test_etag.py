@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def sample_recipe(user, title='Curry'):
+    """ Helper function for creating recipes """
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class ConditionalGetTests(TestCase):
+    """ Test the ETags of the recipe API responses """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def _etag(self, url=RECIPE_URL):
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res['ETag']
+
+    def test_not_modified(self):
+        """
+        Test a request with the current ETag is answered with a 304
+        and a single query
+        """
+
+        sample_recipe(self.user)
+
+        for url in (RECIPE_URL, TAGS_URL, INGREDIENTS_URL):
+            etag = self._etag(url)
+
+            with self.assertNumQueries(1):
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res.content, b'')
+            self.assertEqual(res['ETag'], etag)
+
+    def test_etag_changes_with_writes(self):
+        """ Test every kind of write changes the ETag """
+
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+
+        writes = (
+            lambda: recipe.tags.add(tag),
+            lambda: tag.recipe_set.clear(),
+            lambda: self.client.patch(
+                reverse('recipe:recipe-detail', args=[recipe.id]),
+                {'title': 'Soup'}
+            ),
+            lambda: self.client.post(
+                reverse('recipe:ingredient-bulk'),
+                {'names': ['Salt']},
+                format='json'
+            ),
+            lambda: self.client.post(
+                reverse('recipe:recipe-bulk'),
+                [{'title': 'Cake', 'time_minutes': 1, 'price': '1.00'}],
+                format='json'
+            ),
+            lambda: Ingredient.objects.get(name='Salt').delete(),
+        )
+        for write in writes:
+            etag = self._etag()
+
+            write()
+
+            self.assertNotEqual(self._etag(), etag)
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_per_user(self):
+        """ Test the writes of another user don't change the ETag """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        etag = self._etag()
+
+        sample_recipe(user2)
+
+        self.assertEqual(self._etag(), etag)
+
+    def test_no_etag_on_errors(self):
+        """ Test that only successful reads get an ETag """
+
+        res = self.client.get(reverse('recipe:recipe-detail', args=[999]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
@@ -0,0 +1,147 @@
+import csv
+import json
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.export import export_rows
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def sample_recipe(user, title):
+    """ Helper function for creating recipes """
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class RecipeExportTests(TestCase):
+    """ Test the streaming export of the recipes """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.cake = sample_recipe(self.user, 'Cake')
+        self.cake.tags.add(
+            Tag.objects.create(user=self.user, name='Dessert'),
+            Tag.objects.create(user=self.user, name='Vegan')
+        )
+        self.cake.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Flour')
+        )
+        self.soup = sample_recipe(self.user, 'Soup, "hot"')
+
+    def _export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res, StreamingHttpResponse)
+
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """ Test every recipe is a JSON line with the related names """
+
+        lines = self._export().splitlines()
+
+        self.assertEqual([json.loads(line) for line in lines], [
+            {
+                'id': self.cake.id,
+                'title': 'Cake',
+                'time_minutes': 10,
+                'price': '5.00',
+                'link': '',
+                'tags': ['Dessert', 'Vegan'],
+                'ingredients': ['Flour'],
+            },
+            {
+                'id': self.soup.id,
+                'title': 'Soup, "hot"',
+                'time_minutes': 10,
+                'price': '5.00',
+                'link': '',
+                'tags': [],
+                'ingredients': [],
+            },
+        ])
+
+    def test_export_csv(self):
+        """ Test the CSV export with JSON arrays in the relation cells """
+
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+        self.assertEqual(res['Content-Type'], 'text/csv')
+
+        rows = list(csv.DictReader(
+            b''.join(res.streaming_content).decode().splitlines()
+        ))
+
+        self.assertEqual(
+            [row['title'] for row in rows],
+            ['Cake', 'Soup, "hot"']
+        )
+        self.assertEqual(json.loads(rows[0]['tags']), ['Dessert', 'Vegan'])
+
+    def test_export_limited_to_user_and_filters(self):
+        """ Test other users recipes are not exported """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        sample_recipe(user2, 'Other')
+
+        lines = self._export(search='soup').splitlines()
+
+        self.assertEqual(
+            [json.loads(line)['title'] for line in lines],
+            ['Soup, "hot"']
+        )
+
+    def test_export_invalid_output(self):
+        """ Test an unknown output format is rejected """
+
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_names_resolved_per_chunk(self):
+        """
+        Test the related names are looked up once per chunk
+        and relation, not once per recipe
+        """
+
+        for i in range(3):
+            sample_recipe(self.user, f'Recipe {i}').tags.add(
+                Tag.objects.get(name='Vegan')
+            )
+
+        """
+        5 recipes in chunks of 2: the cursor, then a lookup per chunk
+        and relation, except the 2 chunks without any ingredient
+        """
+        with self.assertNumQueries(5):
+            rows = list(export_rows(
+                Recipe.objects.filter(user=self.user),
+                chunk_size=2
+            ))
+
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[-1]['tags'], ['Vegan'])
@@ -0,0 +1,168 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.filters import filter_by_related, MATCH_ANY, MATCH_ALL
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class RecipeFilterTests(TestCase):
+    """ Test filtering the recipes by their tags and ingredients """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        """
+        Seeding the recipes so that the tags overlap:
+        recipe i has the tags i % 6 to i % 6 + 3
+        """
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(10)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(4)
+        ]
+        self.recipes = []
+        for i in range(30):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5.00
+            )
+            recipe.tags.add(*self.tags[i % 6:i % 6 + 4])
+            recipe.ingredients.add(self.ingredients[i % 4])
+            self.recipes.append(recipe)
+
+    def _tag_ids(self, *indexes):
+        return [self.tags[i].id for i in indexes]
+
+    def _expected(self, indexes, mode):
+        """ Recipes having any or all of the tags, computed in Python """
+
+        wanted = set(self._tag_ids(*indexes))
+        expected = set()
+        for recipe in self.recipes:
+            tag_ids = {tag.id for tag in recipe.tags.all()}
+            if mode == MATCH_ALL and wanted <= tag_ids:
+                expected.add(recipe.id)
+            if mode == MATCH_ANY and wanted & tag_ids:
+                expected.add(recipe.id)
+
+        return expected
+
+    def _get_ids(self, params):
+        params['page_size'] = 1000
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [row['id'] for row in res.data['results']]
+
+    def test_filter_any_tags_without_duplicates(self):
+        """
+        Test that a recipe matching several of the tags is returned once
+        """
+
+        ids = self._get_ids({'tags': ','.join(
+            str(tag_id) for tag_id in self._tag_ids(2, 3, 4)
+        )})
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), self._expected((2, 3, 4), MATCH_ANY))
+
+    def test_filter_all_tags(self):
+        """ Test returning the recipes that have every requested tag """
+
+        ids = self._get_ids({
+            'tags': ','.join(str(i) for i in self._tag_ids(3, 5)),
+            'tags_mode': 'all',
+        })
+
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertTrue(ids)
+        self.assertEqual(set(ids), self._expected((3, 5), MATCH_ALL))
+
+    def test_filter_all_tags_combined_with_ingredients(self):
+        """ Test combining the tags and the ingredients filters """
+
+        ingredient = self.ingredients[1]
+        ids = self._get_ids({
+            'tags': ','.join(str(i) for i in self._tag_ids(3, 4)),
+            'tags_mode': 'all',
+            'ingredients': str(ingredient.id),
+        })
+
+        expected = {
+            recipe_id for recipe_id in self._expected((3, 4), MATCH_ALL)
+            if Recipe.objects.get(id=recipe_id).ingredients.filter(
+                id=ingredient.id
+            ).exists()
+        }
+        self.assertEqual(set(ids), expected)
+
+    def test_invalid_filter_params(self):
+        """ Test that malformed IDs and modes are rejected """
+
+        res = self.client.get(RECIPE_URL, {'tags': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'tags_mode': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _explain(self, mode):
+        """ Plan of a tag filter, with sequential scans discouraged """
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        queryset = filter_by_related(
+            Recipe.objects.all(),
+            'tags',
+            self._tag_ids(1, 2),
+            mode
+        )
+
+        self.assertNotIn('DISTINCT', str(queryset.query))
+
+        return queryset.explain()
+
+    def test_any_plan_uses_array_index(self):
+        """
+        Test that the 'any' filter is an overlap on the tag ids array,
+        answered by its GIN index without reading the join table.
+        """
+
+        plan = self._explain(MATCH_ANY)
+
+        self.assertIn('core_recipe_tag_ids_gin', plan)
+        self.assertIn('&&', plan)
+        self.assertNotIn('core_recipe_tags', plan)
+
+    def test_all_plan_uses_array_index(self):
+        """
+        Test that the 'all' filter is a containment on the tag ids array,
+        answered by its GIN index without reading the join table.
+        """
+
+        plan = self._explain(MATCH_ALL)
+
+        self.assertIn('core_recipe_tag_ids_gin', plan)
+        self.assertIn('@>', plan)
+        self.assertNotIn('core_recipe_tags', plan)
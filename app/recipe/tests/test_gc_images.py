@@ -0,0 +1,215 @@
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.models import ImageBlob, ImageVariant, Recipe
+
+
+class GarbageCollectImagesTests(TestCase):
+    """ Test removing the unreferenced recipe image files """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+
+        user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title='Curry',
+            time_minutes=10,
+            price=5.00
+        )
+
+        """ Stored through the storages, so referenced """
+        self.recipe.image.save('photo.jpg', ContentFile(b'image'))
+        variant = ImageVariant(
+            recipe=self.recipe,
+            source=self.recipe.image.name,
+            name='thumb',
+            format='jpeg',
+            width=1,
+            height=1,
+        )
+        variant.file.save('thumb.jpg', ContentFile(b'thumb'), save=False)
+        variant.save()
+        self.shared = self.recipe.image.storage.save(
+            'uploads/recipe/other.jpg',
+            ContentFile(b'shared')
+        )
+
+        self.kept = [self.recipe.image.name, variant.file.name, self.shared]
+        self.orphans = [
+            self._file('uploads/recipe/old.jpg', 1000),
+            self._file('uploads/recipe/ab/cd/hashed.jpg', 2000),
+            self._file('uploads/recipe/variants/old-thumb.jpg', 500),
+        ]
+        self.recent = self._file('uploads/recipe/new.jpg', 10, age=60)
+        self.hidden = self._file('uploads/recipe/.partial', 10)
+
+        for name in self.kept:
+            self._age(name)
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.media.name, name)
+
+    def _age(self, name, age=48 * 3600):
+        mtime = time.time() - age
+        os.utime(self._path(name), (mtime, mtime))
+
+    def _file(self, name, size, age=48 * 3600):
+        os.makedirs(os.path.dirname(self._path(name)), exist_ok=True)
+        with open(self._path(name), 'wb') as f:
+            f.write(b'x' * size)
+        self._age(name, age)
+
+        return name
+
+    def _exists(self, names):
+        return [os.path.exists(self._path(name)) for name in names]
+
+    def _gc(self, **options):
+        out = StringIO()
+        call_command(
+            'gc_recipe_images',
+            batch_size=2,
+            max_per_second=0,
+            verbosity=2,
+            stdout=out,
+            **options
+        )
+
+        return out.getvalue()
+
+    def test_dry_run(self):
+        """ Test the dry run reports the orphans without removing them """
+
+        out = self._gc(dry_run=True)
+
+        for name in self.orphans:
+            self.assertIn(name, out)
+        self.assertIn('Would remove 3 files', out)
+        self.assertIn('(3500 bytes) reclaimed', out)
+        self.assertEqual(self._exists(self.orphans), [True] * 3)
+
+    def test_removes_old_orphans(self):
+        """ Test only the old unreferenced files are removed """
+
+        out = self._gc()
+
+        self.assertIn('Scanned 7 files. Removed 3 files', out)
+        self.assertEqual(self._exists(self.orphans), [False] * 3)
+        self.assertEqual(self._exists(self.kept), [True] * 3)
+        self.assertEqual(self._exists([self.recent, self.hidden]), [True] * 2)
+
+    def test_released_blob_removed(self):
+        """ Test a file whose last reference is gone is collected """
+
+        ImageBlob.objects.filter(name=self.shared).update(refcount=0)
+
+        self._gc()
+
+        self.assertEqual(self._exists([self.shared]), [False])
+
+    def test_rate_limit(self):
+        """ Test the removals are spaced by the rate """
+
+        with patch('time.sleep') as sleep:
+            call_command(
+                'gc_recipe_images',
+                max_per_second=1,
+                stdout=StringIO()
+            )
+
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(self._exists(self.orphans), [False] * 3)
+
+
+class ConcurrentSaveTests(TransactionTestCase):
+    """ Test collecting a file saved again by a concurrent transaction """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+
+        self.storage = Recipe._meta.get_field('image').storage
+
+        """ Stored, then released: an old orphan """
+        self.name = self.storage.save(
+            'uploads/recipe/photo.jpg',
+            ContentFile(b'image')
+        )
+        ImageBlob.objects.all().delete()
+        self.path = self.storage.path(self.name)
+        mtime = time.time() - 48 * 3600
+        os.utime(self.path, (mtime, mtime))
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def test_saved_during_collection(self):
+        """
+        Test a file referenced again by a transaction not committed yet
+        is kept
+        """
+
+        saved = threading.Event()
+        release = threading.Event()
+
+        def save():
+            try:
+                with transaction.atomic():
+                    self.storage.save(
+                        'uploads/recipe/again.jpg',
+                        ContentFile(b'image')
+                    )
+                    saved.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        def gc():
+            try:
+                call_command(
+                    'gc_recipe_images',
+                    grace_hours=0,
+                    max_per_second=0,
+                    stdout=StringIO()
+                )
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=save)
+        first.start()
+        saved.wait(5)
+        time.sleep(0.01)
+
+        second = threading.Thread(target=gc)
+        second.start()
+        """ The collection waiting for the save """
+        time.sleep(0.3)
+        release.set()
+
+        first.join()
+        second.join()
+
+        self.assertTrue(os.path.exists(self.path))
+        self.assertEqual(self.storage.refcount(self.name), 1)
@@ -0,0 +1,304 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageJob, ImageVariant, Recipe
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def image_url(recipe_id):
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
+def image_file(size=(1000, 500), mode='RGB', image_format='JPEG'):
+    """ An uploaded image of the size """
+    content = BytesIO()
+    Image.new(mode, size).save(content, image_format)
+
+    return SimpleUploadedFile(
+        f'photo.{image_format.lower()}',
+        content.getvalue()
+    )
+
+
+@override_settings(
+    RECIPE_IMAGE_VARIANTS={'thumb': (200, 200), 'medium': (800, 800)},
+    RECIPE_IMAGE_VARIANT_FORMATS=('webp', 'jpeg')
+)
+class ImageJobTests(TestCase):
+    """ Test the variants of the recipe images made by the image jobs """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def _upload(self, image):
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': image},
+            format='multipart'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res
+
+    def _process(self, max_attempts=3):
+        out = StringIO()
+        call_command(
+            'process_image_jobs',
+            once=True,
+            max_attempts=max_attempts,
+            stdout=out
+        )
+
+        return out.getvalue()
+
+    def test_upload_queues_job(self):
+        """ Test an upload queues a job and has no variants yet """
+
+        res = self._upload(image_file())
+
+        self.assertEqual(res.data['variants'], {})
+
+        job = ImageJob.objects.get()
+        self.assertEqual(job.recipe, self.recipe)
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertTrue(job.image.startswith('uploads/recipe/'))
+
+    def test_worker_makes_variants(self):
+        """ Test the worker resizes the image in every format """
+
+        self._upload(image_file())
+        etag = self.client.get(image_url(self.recipe.id))['ETag']
+
+        self.assertIn(': done', self._process())
+
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.DONE)
+        sizes = {
+            (variant.name, variant.format): (variant.width, variant.height)
+            for variant in ImageVariant.objects.filter(recipe=self.recipe)
+        }
+        self.assertEqual(sizes, {
+            ('thumb', 'webp'): (200, 100),
+            ('thumb', 'jpeg'): (200, 100),
+            ('medium', 'webp'): (800, 400),
+            ('medium', 'jpeg'): (800, 400),
+        })
+
+        for variant in ImageVariant.objects.all():
+            self.assertTrue(os.path.exists(variant.file.path))
+            with Image.open(variant.file.path) as image:
+                self.assertEqual(image.format, variant.format.upper())
+
+        res = self.client.get(image_url(self.recipe.id))
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(set(res.data['variants']), {'thumb', 'medium'})
+        self.assertTrue(
+            res.data['variants']['thumb']['webp'].startswith('http://')
+        )
+
+    def test_small_image_not_enlarged(self):
+        """ Test a transparent image smaller than the variants """
+
+        self._upload(image_file((10, 20), 'RGBA', 'PNG'))
+        self._process()
+
+        variants = ImageVariant.objects.all()
+        self.assertEqual(len(variants), 4)
+        for variant in variants:
+            self.assertEqual((variant.width, variant.height), (10, 20))
+
+    def test_replaced_image(self):
+        """ Test the variants of a replaced image are hidden and removed """
+
+        self._upload(image_file())
+        self._process()
+        old = [variant.file.path for variant in ImageVariant.objects.all()]
+
+        self._upload(image_file((300, 300)))
+        res = self.client.get(image_url(self.recipe.id))
+        self.assertEqual(res.data['variants'], {})
+
+        self._process()
+
+        variants = ImageVariant.objects.all()
+        self.assertEqual(len(variants), 4)
+        self.assertEqual(
+            {variant.width for variant in variants if variant.name == 'thumb'},
+            {200}
+        )
+        self.assertFalse(any(os.path.exists(path) for path in old))
+
+    def test_image_replaced_outside_api(self):
+        """ Test an image replaced by a save, as in the admin """
+
+        self._upload(image_file())
+        recipe = Recipe.objects.get()
+        old = recipe.image.name
+
+        with patch('recipe.signals.release_image') as release_image:
+            recipe.image = image_file((300, 200))
+            recipe.save()
+
+        release_image.assert_called_once_with(old)
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image.name, old)
+        self.assertEqual(
+            (recipe.image_width, recipe.image_format),
+            (None, '')
+        )
+
+        job = ImageJob.objects.latest('id')
+        self.assertEqual(job.image, recipe.image.name)
+
+        """ The metadata of the new image is set by its job """
+        self._process()
+        recipe.refresh_from_db()
+        self.assertEqual(
+            (recipe.image_width, recipe.image_height, recipe.image_format),
+            (300, 200, 'jpeg')
+        )
+
+        """ Other changes keep the image """
+        with patch('recipe.signals.release_image') as release_image:
+            recipe.title = 'Renamed'
+            recipe.save()
+        release_image.assert_not_called()
+        self.assertEqual(ImageJob.objects.count(), 2)
+
+    def test_same_image_uploaded_again(self):
+        """ Test the stored reference of an image uploaded twice """
+
+        self._upload(image_file())
+        name = Recipe.objects.get().image.name
+
+        with patch('recipe.signals.release_image') as release_image:
+            self._upload(image_file())
+
+        """ Same content, same name: the new reference replaces the old """
+        self.assertEqual(Recipe.objects.get().image.name, name)
+        release_image.assert_called_once_with(name)
+
+    def test_outdated_job_skipped(self):
+        """ Test a job of an image replaced since is done without work """
+
+        self._upload(image_file())
+        self._upload(image_file())
+
+        self._process()
+
+        self.assertEqual(
+            ImageJob.objects.filter(status=ImageJob.DONE).count(),
+            2
+        )
+        self.assertEqual(ImageVariant.objects.count(), 4)
+
+    def test_broken_image_fails(self):
+        """ Test a job failing every attempt is marked as failed """
+
+        self._upload(image_file())
+        with open(Recipe.objects.get().image.path, 'wb') as f:
+            f.write(b'not an image')
+
+        out = self._process(max_attempts=2)
+        self.assertIn('pending, attempt 1', out)
+
+        """ Once the retry is due """
+        ImageJob.objects.update(next_attempt=timezone.now())
+        out = self._process(max_attempts=2)
+
+        job = ImageJob.objects.get()
+        self.assertEqual(job.status, ImageJob.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIn('failed, attempt 2', out)
+        self.assertFalse(ImageVariant.objects.exists())
+
+    @override_settings(
+        RECIPE_IMAGE_JOB_RETRY_DELAY=60,
+        RECIPE_IMAGE_JOB_MAX_RETRY_DELAY=100
+    )
+    def test_failed_job_retried_later(self):
+        """ Test a failed job isn't retried before its backoff delay """
+
+        self._upload(image_file())
+        name = Recipe.objects.get().image.path
+        with open(name, 'rb') as f:
+            content = f.read()
+        with open(name, 'wb') as f:
+            f.write(b'not an image')
+
+        started = timezone.now()
+        self._process()
+
+        job = ImageJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (ImageJob.PENDING, 1))
+        self.assertGreaterEqual(
+            job.next_attempt,
+            started + timedelta(seconds=60)
+        )
+
+        """ A transient error: the file is fine again, but not due yet """
+        with open(name, 'wb') as f:
+            f.write(content)
+        self.assertEqual(self._process(), '')
+        self.assertEqual(ImageJob.objects.get().attempts, 1)
+
+        """ The delay doubles, up to the maximum """
+        ImageJob.objects.update(next_attempt=timezone.now())
+        with open(name, 'wb') as f:
+            f.write(b'not an image')
+        started = timezone.now()
+        self._process()
+        job = ImageJob.objects.get()
+        self.assertEqual(job.attempts, 2)
+        self.assertLess(
+            job.next_attempt,
+            started + timedelta(seconds=101)
+        )
+        self.assertGreaterEqual(
+            job.next_attempt,
+            started + timedelta(seconds=100)
+        )
+
+        ImageJob.objects.update(next_attempt=timezone.now())
+        with open(name, 'wb') as f:
+            f.write(content)
+        self.assertIn(': done', self._process())
@@ -0,0 +1,193 @@
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageJob, ImageVariant, Recipe
+
+from recipe.images import ImageRejected, inspect_image
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def image_url(recipe_id):
+    return reverse('recipe:recipe-image', args=[recipe_id])
+
+
+def image_content(size=(300, 200), image_format='PNG'):
+    content = BytesIO()
+    Image.new('RGB', size, (200, 100, 0)).save(content, image_format)
+
+    return content.getvalue()
+
+
+@override_settings(
+    RECIPE_IMAGE_VARIANTS={'thumb': (100, 100)},
+    RECIPE_IMAGE_VARIANT_FORMATS=('jpeg',)
+)
+class ImageMetadataTests(TestCase):
+    """ Test the metadata and the limits of the uploaded recipe images """
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=10,
+            price=5.00
+        )
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def _upload(self, content, name='photo.png'):
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
+
+    def test_upload_stores_metadata(self):
+        """ Test the size and format of the image are in the response """
+
+        res = self._upload(image_content())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['image_width'], 300)
+        self.assertEqual(res.data['image_height'], 200)
+        self.assertEqual(res.data['image_format'], 'png')
+        self.assertEqual(res.data['image_placeholder'], '')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            (self.recipe.image_width, self.recipe.image_height),
+            (300, 200)
+        )
+
+    def test_image_job_makes_placeholder(self):
+        """ Test the image job fills the placeholder of the image """
+
+        self._upload(image_content())
+        call_command('process_image_jobs', once=True, stdout=StringIO())
+
+        self.assertEqual(ImageJob.objects.get().status, ImageJob.DONE)
+        res = self.client.get(image_url(self.recipe.id))
+        placeholder = res.data['image_placeholder']
+        self.assertTrue(placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertLess(len(placeholder), 1000)
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=300 * 200 - 1)
+    def test_too_many_pixels_rejected(self):
+        """ Test an image with too many pixels is rejected before decoding """
+
+        res = self._upload(image_content())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', str(res.data['image']))
+        self.assertFalse(ImageJob.objects.exists())
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_too_many_bytes_rejected(self):
+        """ Test an image larger than RECIPE_IMAGE_MAX_BYTES is rejected """
+
+        content = image_content()
+        with override_settings(RECIPE_IMAGE_MAX_BYTES=len(content) - 1):
+            res = self._upload(content)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', str(res.data['image']))
+
+    def test_inspect_image_reads_header_only(self):
+        """ Test the dimensions are read from a truncated file """
+
+        content = image_content((4000, 3000), 'JPEG')
+        f = BytesIO(content[:len(content) // 4])
+
+        self.assertEqual(inspect_image(f), (4000, 3000, 'jpeg'))
+        self.assertEqual(f.tell(), 0)
+
+        with self.assertRaises(ImageRejected):
+            inspect_image(BytesIO(b'not an image'))
+
+    def test_remove_image(self):
+        """ Test a null image removes the image and its metadata """
+
+        self._upload(image_content())
+        call_command('process_image_jobs', once=True, stdout=StringIO())
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': None},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['image'])
+        self.assertIsNone(res.data['image_width'])
+        self.assertEqual(res.data['image_format'], '')
+        self.assertEqual(res.data['image_placeholder'], '')
+        self.assertEqual(res.data['variants'], {})
+
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertFalse(ImageVariant.objects.exists())
+        self.assertEqual(ImageJob.objects.filter(image='').count(), 0)
+        self.assertEqual(ImageJob.objects.exclude(image=name).count(), 0)
+
+    def test_backfill_older_images(self):
+        """ Test the images without metadata are queued once, then filled """
+
+        self._upload(image_content())
+        ImageJob.objects.all().delete()
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_width=None,
+            image_height=None,
+            image_format=''
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title='No image',
+            time_minutes=5,
+            price=1.00
+        )
+
+        out = StringIO()
+        call_command('backfill_image_metadata', stdout=out)
+        self.assertIn('Queued the image jobs of 1 recipes', out.getvalue())
+
+        call_command('backfill_image_metadata', stdout=out)
+        self.assertEqual(ImageJob.objects.count(), 1)
+
+        call_command('process_image_jobs', once=True, stdout=StringIO())
+
+        res = self.client.get(image_url(self.recipe.id))
+        self.assertEqual(res.data['image_width'], 300)
+        self.assertEqual(res.data['image_format'], 'png')
+        self.assertTrue(res.data['image_placeholder'])
@@ -0,0 +1,168 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.denormalize import find_inconsistent_recipes
+from core.models import Recipe, Tag, Ingredient, ImportCheckpoint
+
+
+def recipe_record(title, **params):
+    """ Helper function for a recipe of an import file """
+    record = {
+        'title': title,
+        'time_minutes': 10,
+        'price': '5.00',
+        'link': '',
+        'tags': [],
+        'ingredients': [],
+    }
+    record.update(params)
+
+    return record
+
+
+class ImportRecipesTests(TestCase):
+    """ Test the import_recipes command """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as file:
+            file.write(text)
+
+        return path
+
+    def _write_ndjson(self, records):
+        return self._write(
+            'recipes.ndjson',
+            ''.join(json.dumps(record) + '\n' for record in records)
+        )
+
+    def _import(self, path, *args):
+        out = StringIO()
+        call_command(
+            'import_recipes', path, '--email', self.user.email, *args,
+            stdout=out
+        )
+
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        """ Test the recipes, their tags and ingredients are imported """
+
+        path = self._write_ndjson([
+            recipe_record(
+                'Curry',
+                tags=['Spicy', ' spicy', 'Dinner'],
+                ingredients=['salt', 'Rice']
+            ),
+            recipe_record('Soup', tags=['Dinner'], price=3),
+        ])
+
+        output = self._import(path)
+
+        self.assertIn('rows/s', output)
+
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Dinner', 'Spicy']
+        )
+        self.assertIn(self.salt, curry.ingredients.all())
+        self.assertEqual(Ingredient.objects.count(), 2)
+        self.assertEqual(
+            str(Recipe.objects.get(title='Soup').price),
+            '3.00'
+        )
+
+        """ The id arrays and search vectors are filled too """
+        recipe_ids = Recipe.objects.values_list('id', flat=True)
+        self.assertEqual(find_inconsistent_recipes(recipe_ids), [])
+        self.assertTrue(
+            Recipe.objects.filter(search_vector='rice').exists()
+        )
+
+    def test_import_resumes_after_error(self):
+        """
+        Test an invalid record stops the import after the batches
+        already committed, and running it again resumes from there
+        """
+
+        records = [recipe_record(f'Recipe {i}') for i in range(5)]
+        records[3]['time_minutes'] = 'soon'
+        path = self._write_ndjson(records)
+
+        with self.assertRaisesRegex(CommandError, 'Line 4'):
+            self._import(path, '--batch-size=2')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+        records[3]['time_minutes'] = 15
+        self._write_ndjson(records)
+
+        output = self._import(path, '--batch-size=2')
+
+        self.assertIn('Resuming after 2 recipes', output)
+        self.assertEqual(
+            sorted(Recipe.objects.values_list('title', flat=True)),
+            [f'Recipe {i}' for i in range(5)]
+        )
+        self.assertTrue(ImportCheckpoint.objects.get().finished)
+
+        """ A finished import is not imported twice """
+        self.assertIn('already imported', self._import(path))
+        self.assertEqual(Recipe.objects.count(), 5)
+
+    def test_import_csv_export(self):
+        """ Test importing a CSV file made by the recipes export """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        recipe = Recipe.objects.create(
+            user=user2,
+            title='Cake, "best"',
+            time_minutes=60,
+            price=12.50
+        )
+        recipe.tags.add(Tag.objects.create(user=user2, name='Dessert'))
+
+        client = APIClient()
+        client.force_authenticate(user=user2)
+        res = client.get(reverse('recipe:recipe-export'), {'output': 'csv'})
+        path = self._write(
+            'export.csv',
+            b''.join(res.streaming_content).decode()
+        )
+
+        self._import(path)
+
+        imported = Recipe.objects.get(user=self.user)
+        self.assertEqual(imported.title, 'Cake, "best"')
+        self.assertEqual(str(imported.price), '12.50')
+        self.assertEqual(
+            list(imported.tags.values_list('name', flat=True)),
+            ['Dessert']
+        )
+        self.assertEqual(imported.tags.get().user, self.user)
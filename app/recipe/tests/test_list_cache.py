@@ -0,0 +1,186 @@
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe.cache import list_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'recipe-list-tests',
+        },
+    },
+    RECIPE_LIST_CACHE='default'
+)
+class ListCacheTests(TestCase):
+    """ Test the cache of the tag and ingredient lists """
+
+    def setUp(self):
+        caches['default'].clear()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def _names(self, url=TAGS_URL, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res['X-Cache'], [row['name'] for row in res.data['results']]
+
+    def test_list_served_from_cache(self):
+        """ Test the second request is answered without the list query """
+
+        self.assertEqual(self._names(), ('MISS', ['Vegan']))
+
+        """ Only the data version of the ETag is read """
+        with self.assertNumQueries(1):
+            self.assertEqual(self._names(), ('HIT', ['Vegan']))
+
+        """ Every query string is cached on its own """
+        self.assertEqual(self._names(page_size=1)[0], 'MISS')
+
+        self.assertEqual(list_cache.stats(), {'hits': 1, 'misses': 2})
+
+        out = StringIO()
+        call_command('list_cache_stats', stdout=out)
+        self.assertIn('hits: 1, misses: 2', out.getvalue())
+
+    def test_invalidated_by_changes(self):
+        """ Test saving or deleting a tag invalidates the lists """
+
+        self._names()
+        self._names(INGREDIENTS_URL)
+
+        self.tag.name = 'Dessert'
+        self.tag.save()
+        self.assertEqual(self._names(), ('MISS', ['Dessert']))
+        self.assertEqual(self._names(INGREDIENTS_URL)[0], 'MISS')
+        self.assertEqual(self._names(INGREDIENTS_URL)[0], 'HIT')
+
+        self.tag.delete()
+        self.assertEqual(self._names(), ('MISS', []))
+
+        Ingredient.objects.create(user=self.user, name='Salt')
+        self.assertEqual(self._names(INGREDIENTS_URL), ('MISS', ['Salt']))
+
+    def test_invalidated_by_bulk_upsert(self):
+        """ Test the bulk endpoint invalidates when it creates names """
+
+        self._names()
+
+        self.client.post(
+            reverse('recipe:tag-bulk'),
+            {'names': ['vegan']},
+            format='json'
+        )
+        self.assertEqual(self._names()[0], 'HIT')
+
+        self.client.post(
+            reverse('recipe:tag-bulk'),
+            {'names': ['Quick']},
+            format='json'
+        )
+        self.assertEqual(self._names(), ('MISS', ['Vegan', 'Quick']))
+
+    def test_invalidated_by_other_processes(self):
+        """
+        Test a change made without the signals of this process,
+        eg: by another worker, is seen through the data version
+        """
+
+        self._names()
+
+        Tag.objects.filter(pk=self.tag.pk).update(name='Dessert')
+        get_user_model().objects.bump_data_version([self.user.pk])
+
+        self.assertEqual(self._names(), ('MISS', ['Dessert']))
+
+    def test_cache_per_user(self):
+        """ Test the lists of another user are neither shared nor reset """
+
+        self._names()
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        Tag.objects.create(user=user2, name='Foreign')
+        self.assertEqual(self._names(), ('HIT', ['Vegan']))
+
+        self.client.force_authenticate(user=user2)
+        self.assertEqual(self._names(), ('MISS', ['Foreign']))
+
+
+class FileBasedListCacheTests(TestCase):
+    """ Test the list cache with a cache shared by the processes """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_file_based_backend(self):
+        """ Test a separate cache alias backed by files """
+
+        settings = {
+            'CACHES': {
+                'default': {
+                    'BACKEND':
+                        'django.core.cache.backends.locmem.LocMemCache',
+                },
+                'lists': {
+                    'BACKEND':
+                        'django.core.cache.backends.filebased.FileBasedCache',
+                    'LOCATION': self.tmp.name,
+                },
+            },
+            'RECIPE_LIST_CACHE': 'lists',
+        }
+
+        with override_settings(**settings):
+            Ingredient.objects.create(user=self.user, name='Salt')
+
+            for expected in ('MISS', 'HIT'):
+                res = self.client.get(INGREDIENTS_URL)
+                self.assertEqual(res['X-Cache'], expected)
+                self.assertEqual(res.data['results'][0]['name'], 'Salt')
+
+            Ingredient.objects.create(user=self.user, name='Pepper')
+
+            res = self.client.get(INGREDIENTS_URL)
+            self.assertEqual(res['X-Cache'], 'MISS')
+            self.assertEqual(len(res.data['results']), 2)
@@ -0,0 +1,143 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+from recipe.pagination import KeysetPagination
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """ Test the cursor pagination of the recipe API lists """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def _collect_pages(self, url, page_size):
+        """ Follow the next links and return the pages received """
+
+        pages = []
+        res = self.client.get(url, {'page_size': page_size})
+
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+
+            if res.data['next'] is None:
+                return pages
+
+            res = self.client.get(res.data['next'])
+
+    def test_tags_paginated_in_name_order(self):
+        """
+        Test that walking the pages returns every tag once,
+        ordered by name descending.
+        """
+
+        for name in ('Vegan', 'Dessert', 'Asian', 'Curry', 'Brunch'):
+            Tag.objects.create(user=self.user, name=name)
+
+        pages = self._collect_pages(TAGS_URL, 2)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
+        rows = [row for page in pages for row in page]
+        expected = Tag.objects.order_by('-name', 'id')
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [tag.id for tag in expected]
+        )
+
+    def test_recipes_paginated_newest_first(self):
+        """ Test that recipes are paginated by descending id """
+
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=1.00
+            )
+
+        pages = self._collect_pages(RECIPE_URL, 3)
+
+        rows = [row for page in pages for row in page]
+        expected = Recipe.objects.order_by('-id')
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [recipe.id for recipe in expected]
+        )
+
+    def test_pages_do_not_count_or_offset(self):
+        """
+        Test that a deep page is selected with the cursor condition
+        and not with an OFFSET or a COUNT(*) of the rows.
+        """
+
+        for i in range(6):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        res = self.client.get(res.data['next'])
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        """ The data version of the ETag, then the page """
+        self.assertEqual(len(context.captured_queries), 2)
+
+        sql = context.captured_queries[-1]['sql'].upper()
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT(', sql)
+
+    def test_invalid_cursor(self):
+        """ Test that a tampered cursor is rejected """
+
+        res = self.client.get(TAGS_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_of_wrong_types(self):
+        """ Test that cursor values not matching the ordering are rejected """
+
+        paginator = KeysetPagination()
+        for url, params, position in (
+            (RECIPE_URL, {}, ['x']),
+            (RECIPE_URL, {'search': 'curry'}, ['x', 1]),
+            (TAGS_URL, {}, ['Tag', 'x']),
+        ):
+            res = self.client.get(url, {
+                'cursor': paginator.encode_cursor(position),
+                **params
+            })
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_page_size_bounded(self):
+        """ Test that the client can't request unbounded pages """
+
+        for i in range(3):
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+
+        res = self.client.get(TAGS_URL, {'page_size': 10 ** 9})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNone(res.data['next'])
@@ -4,8 +4,10 @@ import os
 from PIL import Image  # PIL is the Pillow requirement
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -115,7 +117,7 @@ class PrivateIngredientsApiTests(TestCase):
         )
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serialized_queryset_from_DB.data)
+        self.assertEqual(res.data['results'], serialized_queryset_from_DB.data)
 
     def test_ingredients_limited_to_user(self):
         """
@@ -134,8 +136,8 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(RECIPE_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['title'], user_recipe.title)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['title'], user_recipe.title)
 
     def test_view_recipe_detail(self):
         """ Test viewing in detail any recipe by its URL """
@@ -242,6 +244,62 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_foreign_tags(self):
+        """
+        Test that the tags of another user can't be attached,
+        and that every invalid ID is reported
+        """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        tag = sample_tag(user=self.user, name='Vegan')
+        foreign = sample_tag(user=user2, name='Foreign')
+
+        payload = {
+            'title': 'Avocado lime cheescake',
+            'tags': [tag.id, foreign.id, 999999],
+            'time_minutes': 60,
+            'price': 20.00
+        }
+
+        res = self.client.post(RECIPE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertFalse(Recipe.objects.exists())
+
+    def _count_create_queries(self, ingredients):
+        payload = {
+            'title': 'Thai prawn red curry',
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'time_minutes': 20,
+            'price': 7.00
+        }
+
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(RECIPE_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        return len(context.captured_queries)
+
+    def test_create_recipe_validation_queries(self):
+        """
+        Test that the submitted IDs are validated with the same
+        number of queries, no matter how many there are
+        """
+
+        ingredients = [
+            sample_ingredient(user=self.user, name=f'Ingredient {i}')
+            for i in range(40)
+        ]
+
+        self.assertEqual(
+            self._count_create_queries(ingredients[:1]),
+            self._count_create_queries(ingredients)
+        )
+
     def test_partial_update_recipe(self):
         """ Test updating a recipe with a PATCH """
 
@@ -309,6 +367,60 @@ class PrivateIngredientsApiTests(TestCase):
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
 
+    def _create_recipes_with_relations(self, count):
+        """ Helper for creating recipes with several tags and ingredients """
+
+        tags = [
+            Tag.objects.get_or_create(user=self.user, name=f'Tag {i}')[0]
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.get_or_create(
+                user=self.user,
+                name=f'Ingredient {i}'
+            )[0]
+            for i in range(3)
+        ]
+
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(*tags)
+            recipe.ingredients.add(*ingredients)
+
+        return recipe
+
+    def test_list_recipes_query_budget(self):
+        """
+        Test that listing recipes costs the same number of queries
+        no matter how many recipes are returned.
+        The data version of the ETag, then a single query: the tag and
+        ingredient IDs are read from the id arrays of the recipes.
+        """
+
+        self._create_recipes_with_relations(2)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        self._create_recipes_with_relations(10)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 12)
+
+    def test_retrieve_recipe_query_budget(self):
+        """ Test that the nested detail view batch-loads its relations """
+
+        recipe = self._create_recipes_with_relations(1)
+
+        """ The data version, the recipe and one query per relation """
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 3)
+        self.assertEqual(len(res.data['ingredients']), 3)
+
 
 class RecipeImageUploadTests(TestCase):
     """  """
@@ -400,9 +512,9 @@ class RecipeImageUploadTests(TestCase):
         """
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipes_by_ingredients(self):
         """Test returning recipes with specific ingredients"""
@@ -433,6 +545,6 @@ class RecipeImageUploadTests(TestCase):
         """
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def sample_payload(title, **params):
+    """ Helper function for the payload of a recipe """
+    payload = {
+        'title': title,
+        'time_minutes': 10,
+        'price': '5.00',
+    }
+    payload.update(params)
+
+    return payload
+
+
+class RecipeBulkCreateTests(TestCase):
+    """ Test creating many recipes at once """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, name='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, name='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def test_bulk_create_recipes(self):
+        """ Test the recipes and their relations are created """
+
+        payload = [
+            sample_payload(
+                'Cake',
+                tags=[self.dessert.id, self.vegan.id],
+                ingredients=[self.salt.id]
+            ),
+            sample_payload('Soup', tags=[self.vegan.id]),
+            sample_payload('Toast'),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [row['title'] for row in res.data],
+            ['Cake', 'Soup', 'Toast']
+        )
+
+        cake = Recipe.objects.get(id=res.data[0]['id'])
+        self.assertEqual(cake.user, self.user)
+        self.assertCountEqual(cake.tags.all(), [self.dessert, self.vegan])
+        self.assertEqual(list(cake.ingredients.all()), [self.salt])
+        self.assertEqual(
+            cake.tag_ids,
+            sorted([self.dessert.id, self.vegan.id])
+        )
+        self.assertTrue(
+            Recipe.objects.filter(id=cake.id, search_vector='dessert').exists()
+        )
+
+    def test_bulk_create_ignores_list_params(self):
+        """ Test the list filters don't leave recipes out of the response """
+
+        payload = [
+            sample_payload('Cake', tags=[self.dessert.id]),
+            sample_payload('Toast'),
+        ]
+
+        res = self.client.post(
+            f'{RECIPES_BULK_URL}?tags={self.vegan.id}&search=soup'
+            f'&fields=id',
+            payload,
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [row['title'] for row in res.data],
+            ['Cake', 'Toast']
+        )
+
+    def test_bulk_create_query_count(self):
+        """
+        Test that the number of queries doesn't grow with the recipes:
+        the ID lookups, the inserts, the refresh, the data version bump
+        and the response.
+        """
+
+        payload = [
+            sample_payload(
+                f'Recipe {i}',
+                tags=[self.vegan.id, self.dessert.id],
+                ingredients=[self.salt.id]
+            )
+            for i in range(50)
+        ]
+
+        with self.assertNumQueries(12):
+            res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.count(), 50)
+
+    def test_bulk_create_errors_per_item(self):
+        """ Test that one invalid recipe rejects the whole batch """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        foreign = Tag.objects.create(user=user2, name='Foreign')
+
+        payload = [
+            sample_payload('Cake', tags=[self.vegan.id]),
+            sample_payload('Soup', tags=[foreign.id, 999999]),
+            sample_payload('', ingredients=[self.salt.id]),
+        ]
+
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(res.data[0], {})
+        self.assertEqual(len(res.data[1]['tags']), 2)
+        self.assertIn('title', res.data[2])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_limits(self):
+        """ Test the batch must be a list of bounded size """
+
+        res = self.client.post(
+            RECIPES_BULK_URL,
+            sample_payload('Cake'),
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(
+            RECIPES_BULK_URL,
+            [sample_payload('Cake')] * 501,
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,129 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.filters import search_recipes
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def sample_recipe(user, title):
+    """ Helper function for creating recipes """
+    return Recipe.objects.create(
+        user=user,
+        title=title,
+        time_minutes=10,
+        price=5.00
+    )
+
+
+class RecipeSearchTests(TestCase):
+    """ Test the full text search of the recipes """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+    def _search(self, text, **params):
+        params['search'] = text
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [row['title'] for row in res.data['results']]
+
+    def test_search_title_tags_and_ingredients(self):
+        """ Test matching the title and the related names """
+
+        curry = sample_recipe(self.user, 'Thai curry')
+        soup = sample_recipe(self.user, 'Pumpkin soup')
+        cake = sample_recipe(self.user, 'Carrot cake')
+
+        soup.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        cake.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Cinnamon')
+        )
+
+        self.assertEqual(self._search('curries'), [curry.title])
+        self.assertEqual(self._search('vegan'), [soup.title])
+        self.assertEqual(self._search('cinnamon'), [cake.title])
+        self.assertEqual(self._search('lasagna'), [])
+
+    def test_search_limited_to_user(self):
+        """ Test that other users recipes are not searched """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        sample_recipe(user2, 'Thai curry')
+
+        self.assertEqual(self._search('curry'), [])
+
+    def test_title_matches_ranked_first(self):
+        """ Test that a title match ranks above a tag match """
+
+        tagged = sample_recipe(self.user, 'Green salad')
+        tagged.tags.add(Tag.objects.create(user=self.user, name='Quick'))
+        titled = sample_recipe(self.user, 'Quick noodles')
+
+        self.assertEqual(self._search('quick'), [titled.title, tagged.title])
+
+    def test_search_vector_follows_changes(self):
+        """ Test that renames are searchable right away """
+
+        recipe = sample_recipe(self.user, 'Pancakes')
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Waffles'}
+        )
+        self.assertEqual(self._search('waffles'), ['Waffles'])
+        self.assertEqual(self._search('pancakes'), [])
+
+        tag.name = 'Brunch'
+        tag.save()
+        self.assertEqual(self._search('brunch'), ['Waffles'])
+        self.assertEqual(self._search('breakfast'), [])
+
+    def test_search_results_paginated(self):
+        """ Test walking the pages of equally ranked results """
+
+        for i in range(5):
+            sample_recipe(self.user, f'Curry {i}')
+
+        titles = []
+        res = self.client.get(RECIPE_URL, {'search': 'curry', 'page_size': 2})
+        while True:
+            titles.extend(row['title'] for row in res.data['results'])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(titles, [f'Curry {i}' for i in reversed(range(5))])
+
+    def test_search_uses_index(self):
+        """ Test that the match is answered by the GIN index """
+
+        sample_recipe(self.user, 'Thai curry')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = search_recipes(Recipe.objects.all(), 'curry').explain()
+
+        self.assertIn('core_recipe_search_vector_gin', plan)
@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """ Return the recipe detail URL """
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class SparseFieldsTests(TestCase):
+    """ Test selecting the fields of the recipe responses """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Curry',
+            time_minutes=30,
+            price=8.00
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Spicy')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            name='Rice'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def _get(self, url, fields):
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url, {'fields': fields})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        """ Leaving out the data version query of the ETag """
+        return res, [query['sql'] for query in context.captured_queries[1:]]
+
+    def test_list_only_requested_columns(self):
+        """
+        Test the list returns the requested fields only,
+        without selecting the other columns nor loading the relations
+        """
+
+        res, queries = self._get(RECIPE_URL, 'id,title')
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.recipe.id, 'title': 'Curry'}]
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"price"', queries[0])
+
+    def test_list_requested_relation(self):
+        """ Test only the requested relation is loaded """
+
+        res, queries = self._get(RECIPE_URL, 'title,tags')
+
+        self.assertEqual(
+            res.data['results'],
+            [{'title': 'Curry', 'tags': [self.tag.id]}]
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('ingredient', queries[0])
+
+    def test_detail_sparse_fields(self):
+        """ Test the nested detail response with a subset of fields """
+
+        res, queries = self._get(detail_url(self.recipe.id), 'ingredients')
+
+        self.assertEqual(
+            res.data,
+            {'ingredients': [{'id': self.ingredient.id, 'name': 'Rice'}]}
+        )
+        self.assertEqual(len(queries), 2)
+
+    def test_unknown_field_rejected(self):
+        """ Test requesting a field that doesn't exist """
+
+        res = self.client.get(RECIPE_URL, {'fields': 'id,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_every_field_by_default(self):
+        """ Test the responses are unchanged without ?fields= """
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(
+            set(res.data['results'][0]),
+            {'id', 'title', 'ingredients', 'tags', 'time_minutes', 'price',
+             'link'}
+        )
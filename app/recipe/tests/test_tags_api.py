@@ -69,7 +69,7 @@ class PrivateTagsApiTests(TestCase):
         """
         Checking if the GET result json is the same that the one serialized.
         """
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """
@@ -90,13 +90,13 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
         """ Checking that it only returned 1 item in the GET response. """
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
         """
         Checking that the name of the tag returned
         is the same that the tag created for the user.
         """
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
 
     def test_create_tags_successfully(self):
         """ Successfully created a tag for an user """
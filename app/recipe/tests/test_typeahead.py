@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe.filters import typeahead
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class TypeaheadTests(TestCase):
+    """ Test the autocomplete lookup of the tags and ingredients """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        self.client.force_authenticate(user=self.user)
+
+        for name in ('Tomato', 'Tomatillo', 'Potato', 'Basil', 'Thyme'):
+            Ingredient.objects.create(user=self.user, name=name)
+
+    def _lookup(self, url, text, **params):
+        params['q'] = text
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return [row['name'] for row in res.data]
+
+    def test_prefix_matches_first(self):
+        """ Test that names starting with the text come first """
+
+        names = self._lookup(INGREDIENTS_URL, 'toma')
+
+        self.assertEqual(names[:2], ['Tomato', 'Tomatillo'])
+
+    def test_fuzzy_match(self):
+        """ Test that a misspelled text still finds the name """
+
+        self.assertIn('Tomato', self._lookup(INGREDIENTS_URL, 'tomatoe'))
+        self.assertEqual(self._lookup(INGREDIENTS_URL, 'basel'), ['Basil'])
+
+    def test_case_insensitive_prefix(self):
+        """ Test the prefix lookup ignores the case and regex characters """
+
+        Tag.objects.create(user=self.user, name='C++ night')
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        self.assertEqual(self._lookup(TAGS_URL, 'VEG'), ['Vegan'])
+        self.assertEqual(self._lookup(TAGS_URL, 'c++'), ['C++ night'])
+
+    def test_limited_to_user(self):
+        """ Test that other users names are not suggested """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            '12345678'
+        )
+        Tag.objects.create(user=user2, name='Vegan')
+
+        self.assertEqual(self._lookup(TAGS_URL, 'vegan'), [])
+
+    def test_results_bounded(self):
+        """ Test the number of suggestions is bounded """
+
+        for i in range(60):
+            Tag.objects.create(user=self.user, name=f'Spicy {i}')
+
+        self.assertEqual(len(self._lookup(TAGS_URL, 'spicy')), 10)
+        self.assertEqual(len(self._lookup(TAGS_URL, 'spicy', limit=3)), 3)
+        self.assertEqual(
+            len(self._lookup(TAGS_URL, 'spicy', limit=1000)),
+            50
+        )
+
+        res = self.client.get(TAGS_URL, {'q': 'spicy', 'limit': 'all'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lookup_uses_trigram_index(self):
+        """
+        Test that the prefix and fuzzy conditions of a user lookup
+        are answered by the trigram index, on a table large enough
+        for the planner to prefer it over reading the user's rows
+        """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO core_ingredient (user_id, name) SELECT %s, "
+                "'Ingredient ' || i FROM generate_series(1, 50000) i",
+                [self.user.id]
+            )
+
+            """
+            Merging the GIN pending list, as autovacuum would do,
+            for the planner to estimate the index scan cost properly.
+            """
+            cursor.execute(
+                "SELECT gin_clean_pending_list("
+                "'core_ingredient_user_name_trgm'::regclass)"
+            )
+            cursor.execute('ANALYZE core_ingredient')
+
+        queryset = typeahead(
+            Ingredient.objects.filter(user=self.user),
+            'toma',
+            10
+        )
+        plan = queryset.explain()
+
+        self.assertIn('core_ingredient_user_name_trgm', plan)
+        self.assertEqual(
+            [ingredient.name for ingredient in queryset][:2],
+            ['Tomato', 'Tomatillo']
+        )
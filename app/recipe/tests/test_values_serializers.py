@@ -0,0 +1,125 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe import serializers
+
+
+def render(data):
+    return JSONRenderer().render(data)
+
+
+class ValuesSerializerEquivalenceTests(TestCase):
+    """
+    Test the fast list serializers return exactly the same JSON
+    as the model serializers
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            '12345678'
+        )
+
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'Dessert', 'Ñoquis ☃')
+        ]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('Salt', 'Flour')
+        ]
+
+        for i, price in enumerate(('5.00', '12.50', '0.10', '999.99')):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe "{i}"',
+                time_minutes=i,
+                price=price,
+                link='https://example.com' if i % 2 else ''
+            )
+            recipe.tags.add(*tags[:i])
+            recipe.ingredients.add(*reversed(ingredients[:i]))
+
+    def _model_data(self, serializer_class, queryset, **kwargs):
+        data = serializer_class(queryset, many=True, **kwargs).data
+
+        """ The order of the ManyToMany IDs is undefined without sorting """
+        for row in data:
+            for field_name in ('tags', 'ingredients'):
+                if field_name in row:
+                    row[field_name] = sorted(row[field_name])
+
+        return data
+
+    def _values_data(self, values_serializer, queryset):
+        return values_serializer.to_representation(
+            values_serializer.values(queryset)
+        )
+
+    def test_recipes_equivalent(self):
+        """ Test the recipes with every field """
+
+        queryset = Recipe.objects.order_by('id')
+
+        self.assertEqual(
+            render(self._values_data(
+                serializers.RecipeValuesSerializer(),
+                queryset
+            )),
+            render(self._model_data(
+                serializers.RecipeSerializer,
+                queryset.prefetch_related('tags', 'ingredients')
+            ))
+        )
+
+    def test_recipes_sparse_fields_equivalent(self):
+        """ Test the recipes with a subset of the fields """
+
+        fields = ['price', 'ingredients', 'id']
+        queryset = Recipe.objects.order_by('id')
+
+        self.assertEqual(
+            render(self._values_data(
+                serializers.RecipeValuesSerializer(fields),
+                queryset
+            )),
+            render(self._model_data(
+                serializers.RecipeSerializer,
+                queryset,
+                context={'fields': fields}
+            ))
+        )
+
+    def test_tags_and_ingredients_equivalent(self):
+        """ Test the tags and the ingredients """
+
+        for model, serializer_class, values_serializer in (
+            (Tag, serializers.TagSerializer,
+             serializers.TagValuesSerializer()),
+            (Ingredient, serializers.IngredientSerializer,
+             serializers.IngredientValuesSerializer()),
+        ):
+            queryset = model.objects.order_by('-name', 'id')
+
+            self.assertEqual(
+                render(self._values_data(values_serializer, queryset)),
+                render(self._model_data(serializer_class, queryset))
+            )
+
+    def test_benchmark_command(self):
+        """ Test the benchmark reports the throughput of both paths """
+
+        out = StringIO()
+        call_command('benchmark_list_serializers', '--rows=20', stdout=out)
+
+        output = out.getvalue()
+        for name in ('Recipe', 'Tag', 'Ingredient'):
+            self.assertIn(f'{name}: model serializer', output)
+            self.assertIn(f'{name}: values serializer', output)
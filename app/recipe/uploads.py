@@ -0,0 +1,340 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException,
+    NotFound,
+    ValidationError,
+)
+
+from core.models import ImageUpload
+
+from recipe.images import (
+    ImageRejected,
+    inspect_image,
+    set_image_metadata,
+)
+
+
+"""
+Chunked uploads of the recipe images:
+1. the upload is created with the size and SHA-256 of the file,
+2. the chunks are sent in order, each one with the offset it starts at
+   (the number of bytes received so far) and optionally its SHA-256,
+3. the upload is finalized: the file is checked and becomes the image
+   of the recipe.
+The chunks are streamed to a partial file in RECIPE_UPLOAD_DIR,
+READ_SIZE bytes at a time, so neither the chunks nor the file are ever
+held in memory. After a disconnection, the client reads the number of
+bytes received and sends the rest.
+"""
+READ_SIZE = 64 * 1024
+
+"""
+Number of partial files checked per query by expire_uploads
+"""
+EXPIRE_BATCH_SIZE = 1000
+
+"""
+Columns of Recipe written by finalize
+"""
+IMAGE_FIELDS = [
+    'image',
+    'image_width',
+    'image_height',
+    'image_format',
+    'image_placeholder',
+]
+
+"""
+Suffix of the temporary files receiving the chunks, in RECIPE_UPLOAD_DIR
+"""
+CHUNK_SUFFIX = '.chunk'
+
+
+class UploadConflict(APIException):
+    """
+    A chunk not starting at the end of the bytes received,
+    answered with the number of bytes received
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('The offset does not match the bytes received.')
+    default_code = 'offset_mismatch'
+
+    def __init__(self, received):
+        super().__init__()
+        self.received = received
+
+
+class ChunkTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('The chunk is too large.')
+    default_code = 'chunk_too_large'
+
+
+def partial_path(upload):
+    return os.path.join(settings.RECIPE_UPLOAD_DIR, f'{upload.pk}.part')
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(data)
+
+    return digest.hexdigest()
+
+
+def _check_chunk(upload, offset, length):
+    if offset != upload.received:
+        raise UploadConflict(upload.received)
+    if length > settings.RECIPE_UPLOAD_MAX_CHUNK:
+        raise ChunkTooLarge()
+    if length <= 0 or upload.received + length > upload.size:
+        raise ValidationError(_('The chunk must fit in the file size.'))
+
+
+def _receive_chunk(f, stream, length, chunk_sha256):
+    """
+    Stream the `length` bytes of the chunk to the file f,
+    checking they're all received and match their SHA-256
+    """
+
+    digest = hashlib.sha256()
+    remaining = length
+    try:
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            f.write(data)
+            digest.update(data)
+            remaining -= len(data)
+    except OSError:
+        """ The client disconnected (UnreadablePostError) """
+        raise ValidationError(_('The chunk is incomplete.'))
+
+    if remaining:
+        raise ValidationError(_('The chunk is incomplete.'))
+
+    if chunk_sha256 is not None and \
+            digest.hexdigest() != chunk_sha256.lower():
+        raise ValidationError(_('The chunk checksum does not match.'))
+
+
+def append_chunk(upload, offset, stream, length, chunk_sha256=None):
+    """
+    Write the `length` bytes of the stream at the offset of the upload.
+    The chunk is discarded unless it's complete and matches its SHA-256.
+
+    The chunk is first received in a temporary file, without a transaction:
+    a slow client holds no connection nor lock. The upload is then locked
+    for checking the offset again and appending the chunk to the partial
+    file, a local copy, so its chunks are still written one at a time.
+    """
+
+    _check_chunk(upload, offset, length)
+
+    os.makedirs(settings.RECIPE_UPLOAD_DIR, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        dir=settings.RECIPE_UPLOAD_DIR,
+        prefix=f'{upload.pk}.',
+        suffix=CHUNK_SUFFIX
+    ) as chunk:
+        _receive_chunk(chunk, stream, length, chunk_sha256)
+        chunk.flush()
+
+        with transaction.atomic():
+            try:
+                upload = ImageUpload.objects.select_for_update() \
+                    .get(pk=upload.pk)
+            except ImageUpload.DoesNotExist:
+                """ Expired or finalized meanwhile """
+                raise NotFound()
+
+            """ Another request appended a chunk meanwhile """
+            _check_chunk(upload, offset, length)
+
+            fd = os.open(partial_path(upload), os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'r+b') as f:
+                """
+                Writing from the bytes received, over the end of a chunk
+                that wasn't recorded
+                """
+                f.seek(upload.received)
+                chunk.seek(0)
+                shutil.copyfileobj(chunk, f, READ_SIZE)
+                f.truncate()
+
+            upload.received += length
+            upload.save(update_fields=['received', 'updated'])
+
+    return upload
+
+
+def _check_file(path, sha256):
+    """
+    (error, metadata): why the complete file can't be the recipe image,
+    or None with the (width, height, format) of the image
+    """
+
+    try:
+        checksum = _sha256(path)
+    except FileNotFoundError:
+        """ Expired meanwhile, see expire_uploads """
+        return _('The upload has expired.'), None
+
+    if checksum != sha256:
+        return _('The file checksum does not match.'), None
+
+    """ Reading the header only, without decoding the pixels """
+    try:
+        with open(path, 'rb') as f:
+            return None, inspect_image(f)
+    except ImageRejected as error:
+        return str(error), None
+
+
+def finalize(upload):
+    """
+    Check the complete file and make it the image of the recipe,
+    queueing its variants. Returns the recipe.
+    A file missing, not matching its checksum or not an image is deleted
+    with the upload, which has to start over.
+    """
+
+    path = partial_path(upload)
+
+    with transaction.atomic():
+        upload = ImageUpload.objects.select_for_update() \
+            .select_related('recipe') \
+            .get(pk=upload.pk)
+
+        if upload.received != upload.size:
+            raise ValidationError(_('The upload is incomplete.'))
+
+        error, metadata = _check_file(path, upload.sha256)
+        if error is None:
+            recipe = upload.recipe
+            set_image_metadata(recipe, metadata)
+            with open(path, 'rb') as f:
+                """
+                Stored by the save, which releases the replaced image
+                and queues the variants (see recipe.signals).
+                The image only: the rest of the recipe, loaded without a lock,
+                can have been edited meanwhile
+                """
+                recipe.image = File(f, name=upload.filename)
+                recipe.save(update_fields=IMAGE_FIELDS)
+
+        upload.delete()
+
+    _remove(path)
+
+    if error is not None:
+        raise ValidationError(error)
+
+    return recipe
+
+
+def _remove(path):
+    """ Size of the file removed, None when it's already gone """
+
+    try:
+        size = os.stat(path).st_size
+        os.remove(path)
+    except FileNotFoundError:
+        return None
+
+    return size
+
+
+def expire_uploads(cutoff):
+    """
+    Delete the uploads not updated since the cutoff (a datetime) with
+    their partial files, then the partial files older than the cutoff
+    left by no upload (deleted with their recipe or user), and the files
+    of the chunks never appended.
+    The uploads appending a chunk are locked, and skipped.
+    Returns the number of uploads deleted, and the number and the bytes
+    of the files removed.
+    """
+
+    with transaction.atomic():
+        upload_ids = list(
+            ImageUpload.objects.filter(updated__lt=cutoff)
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)
+        )
+        ImageUpload.objects.filter(pk__in=upload_ids).delete()
+
+    files = reclaimed = 0
+    for upload_id in upload_ids:
+        size = _remove(partial_path(ImageUpload(pk=upload_id)))
+        if size is not None:
+            files += 1
+            reclaimed += size
+
+    try:
+        entries = os.scandir(settings.RECIPE_UPLOAD_DIR)
+    except FileNotFoundError:
+        return len(upload_ids), files, reclaimed
+
+    with entries:
+        batch = {}
+        for entry in entries:
+            upload_id, ext = os.path.splitext(entry.name)
+            if ext not in ('.part', CHUNK_SUFFIX) or \
+                    not entry.is_file(follow_symlinks=False) or \
+                    entry.stat().st_mtime >= cutoff.timestamp():
+                continue
+
+            """ Left by a process killed while receiving a chunk """
+            if ext == CHUNK_SUFFIX:
+                size = _remove(entry.path)
+                if size is not None:
+                    files += 1
+                    reclaimed += size
+                continue
+
+            try:
+                batch[uuid.UUID(upload_id)] = entry.path
+            except ValueError:
+                continue
+
+            if len(batch) >= EXPIRE_BATCH_SIZE:
+                removed, size = _remove_orphans(batch)
+                files += removed
+                reclaimed += size
+                batch = {}
+
+        removed, size = _remove_orphans(batch)
+        files += removed
+        reclaimed += size
+
+    return len(upload_ids), files, reclaimed
+
+
+def _remove_orphans(partials):
+    """
+    Remove the partial files, by upload id, of no upload.
+    An upload left, even an old one, is resumed from its file.
+    """
+
+    for upload_id in ImageUpload.objects.filter(pk__in=list(partials)) \
+            .values_list('pk', flat=True):
+        del partials[upload_id]
+
+    sizes = [_remove(path) for path in partials.values()]
+    sizes = [size for size in sizes if size is not None]
+
+    return len(sizes), sum(sizes)
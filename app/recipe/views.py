@@ -1,15 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+
 from rest_framework.decorators import action  # For adding actions to ViewSet
 from rest_framework.response import Response  # For returning a custom response
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import APIException, ValidationError
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import Tag, Ingredient, Recipe, ImageUpload
+
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+
+from recipe import serializers, uploads
+from recipe.cache import list_cache
+from recipe.export import EXPORT_FORMATS, export_rows
+from recipe.filters import filter_recipes, search_recipes, typeahead
+from recipe.pagination import KeysetPagination
+
+
+class NotModified(APIException):
+    """ The client already has the current version of the response """
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = ''
+
+
+class DataVersionETagMixin:
+    """
+    ETag of the GET responses derived from the data version of the user,
+    which changes with any write to its recipes, tags or ingredients.
+    A request with a matching If-None-Match header is answered with
+    a 304 after a single query reading the version, before building
+    any queryset.
+    """
 
-from recipe import serializers
+    """ Actions whose responses change without a new data version """
+    etag_exempt_actions = ()
 
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+        self.etag = None
+        self.data_version = None
+        if request.method not in ('GET', 'HEAD') or \
+                self.action in self.etag_exempt_actions:
+            return
+
+        """ Read again, the authenticated user can be older """
+        version = get_user_model().objects.filter(
+            pk=request.user.pk
+        ).values_list('data_version', flat=True).get()
+        self.data_version = version
+
+        self.etag = f'W/"{request.user.pk}-{version}-' \
+                    f'{request.accepted_renderer.format}"'
+
+        """ If-None-Match uses the weak comparison of the ETags """
+        matches = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if '*' in matches or self._weak(self.etag) in map(self._weak,
+                                                          matches):
+            raise NotModified()
+
+    def _weak(self, etag):
+        return etag[2:] if etag.startswith('W/') else etag
+
+    def handle_exception(self, exc):
+        """ A 304 has no body """
+        if isinstance(exc, NotModified):
+            return Response(status=exc.status_code)
+
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (200, 304):
+            response['ETag'] = etag
+
+        return response
+
+
+class ValuesListMixin:
+    """
+    List action serializing values() rows with values_serializer_class,
+    with the same output as serializer_class but without building
+    a model instance and going through every serializer field per row.
+    """
+
+    values_serializer_class = None
+
+    def get_values_serializer(self):
+        return self.values_serializer_class()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        """ The pagination reads the ordering columns of the last row """
+        serializer = self.get_values_serializer()
+        rows = serializer.values(queryset, *(
+            field.lstrip('-') for field in self.keyset_ordering
+        ))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+
+        return Response(serializer.to_representation(rows))
+
+
+class BaseRecipeAttrViewSet(DataVersionETagMixin,
+                            ValuesListMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """ Base Viewset for user owned recipe attributes """
@@ -17,7 +128,10 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
     """
     How the authentication will be made eg: Cookie, session, token.
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
 
     """
     What permissions the user must have to access this API.
@@ -25,6 +139,13 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
     """
     permission_classes = (IsAuthenticated,)
 
+    """
+    Returning the list in pages selected by an opaque cursor.
+    The id breaks the ties between attributes with the same name.
+    """
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-name', 'id')
+
     def get_queryset(self):
         """
         For returning objects for the current authenticated user only.
@@ -34,12 +155,112 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         """
         Filtering the queryset by the user that made the GET request
         """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        return self.queryset.filter(
+            user=self.request.user
+        ).order_by(*self.keyset_ordering)
+
+    """
+    Number of names returned by the typeahead lookup
+    when not requested and at most.
+    """
+    TYPEAHEAD_LIMIT = 10
+    TYPEAHEAD_MAX_LIMIT = 50
+
+    def list(self, request, *args, **kwargs):
+        """
+        The responses are cached for the user until its data version
+        changes, see recipe.cache
+        """
+
+        key = list_cache.key(
+            request,
+            self.queryset.model,
+            self.data_version
+        )
+        data = list_cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = self._list(request, *args, **kwargs)
+        list_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+
+        return response
+
+    def _list(self, request, *args, **kwargs):
+        """
+        Autocomplete lookup when there is a ?q= param,
+        eg: ?q=tom&limit=5
+        Returning the best names only, without pagination.
+        """
+
+        text = request.query_params.get('q')
+        if not text:
+            return super().list(request, *args, **kwargs)
+
+        queryset = typeahead(
+            self.get_queryset(),
+            text,
+            self._get_typeahead_limit()
+        )
+        serializer = self.get_values_serializer()
+
+        return Response(
+            serializer.to_representation(serializer.values(queryset))
+        )
+
+    def _get_typeahead_limit(self):
+        """ Limit requested by the client, bounded by TYPEAHEAD_MAX_LIMIT """
+
+        limit = self.request.query_params.get('limit')
+        if limit is None:
+            return self.TYPEAHEAD_LIMIT
+
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({'limit': ['A valid integer is required.']})
+
+        return max(1, min(limit, self.TYPEAHEAD_MAX_LIMIT))
 
     def perform_create(self, serializer):
         """ What to do if there is a POST request """
         serializer.save(user=self.request.user)
 
+    def get_serializer_class(self):
+        """ Return appropraite serializer class """
+
+        if self.action == 'bulk':
+            return serializers.BulkNamesSerializer
+
+        return self.serializer_class
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """
+        Creating many names at once
+        through 127.0.0.1:8000/api/recipe/{tags|ingredients}/bulk
+        eg: {"names": ["Salt", "Pepper"]}
+        Returning the id of every name, in the same order,
+        whether it already existed or was just created.
+        """
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        rows = self.queryset.model.objects.bulk_get_or_create(
+            request.user,
+            serializer.validated_data['names']
+        )
+
+        return Response(
+            [
+                {'id': pk, 'name': name, 'created': created}
+                for pk, name, created in rows
+            ],
+            status=status.HTTP_200_OK
+        )
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """
@@ -53,6 +274,7 @@ class TagViewSet(BaseRecipeAttrViewSet):
     queryset = Tag.objects.all()  # Attribute of GenericAPIView
 
     serializer_class = serializers.TagSerializer
+    values_serializer_class = serializers.TagValuesSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -65,21 +287,34 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()  # Attribute of GenericAPIView
 
     serializer_class = serializers.IngredientSerializer
+    values_serializer_class = serializers.IngredientValuesSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(DataVersionETagMixin,
+                    ValuesListMixin,
+                    viewsets.ModelViewSet):
     """ Manage recipes in the database """
 
     serializer_class = serializers.RecipeSerializer
+    values_serializer_class = serializers.RecipeValuesSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-id',)
+    etag_exempt_actions = ('upload_chunk',)
 
-    def _params_to_ints(self, qs):
-        """
-        Convert a list of string IDs separated by commas to a list of integers
-        """
-        return [int(str_id) for str_id in qs.split(',')]
+    """
+    Actions whose response serializes the tags and ingredients of
+    every recipe returned.
+    """
+    PREFETCH_ACTIONS = ('list', 'retrieve')
+
+    """ ManyToMany fields of the recipe serializers """
+    RELATION_FIELDS = ('tags', 'ingredients')
 
     def get_queryset(self):
         """
@@ -88,37 +323,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
         and apply filters if there were requested.
         """
 
-        queryset = self.queryset
+        """
+        Applying the tags and ingredients filters of the GET params,
+        eg: ?tags=1,2&tags_mode=all
+        Each recipe is returned once, even when it matches several IDs.
+        """
+        queryset = filter_recipes(self.queryset, self.request.query_params)
 
         """
-        Retrieving the content of the GET params.
-        If there are not any params, then by default it will be return as None
+        Full text search of the title, tag and ingredient names,
+        eg: ?search=vegan curry
+        The best matches come first.
         """
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, search)
+            self.keyset_ordering = ('-search_rank', '-id')
 
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            """Return all the Recipes that has the matched ids"""
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            """Return all the Recipes that has the matched ids"""
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+        """
+        Batch-loading the ManyToMany relations that the serializers
+        render, one query per relation instead of one per recipe.
+        With ?fields=id,title only the requested columns are selected
+        and the relations not requested are not loaded at all.
+        """
+        if self.action in self.PREFETCH_ACTIONS:
+            fields = self._get_requested_fields()
+            relations = [
+                name for name in self.RELATION_FIELDS
+                if fields is None or name in fields
+            ]
+            if relations:
+                queryset = queryset.prefetch_related(*relations)
+            if fields is not None:
+                queryset = queryset.only('id', *(
+                    name for name in fields
+                    if name not in self.RELATION_FIELDS
+                ))
 
         """
         Filtering the queryset by the user that made the GET request
         """
         return queryset.filter(user=self.request.user)
 
+    def _get_requested_fields(self):
+        """
+        Fields requested with ?fields=id,title for the list and
+        detail responses, None for every field.
+        """
+
+        value = self.request.query_params.get('fields')
+        if self.action not in self.PREFETCH_ACTIONS or not value:
+            return None
+
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+
+        allowed = self.get_serializer_class().Meta.fields
+        unknown = [name for name in fields if name not in allowed]
+        if unknown:
+            raise ValidationError({
+                'fields': [f'Unknown fields: {", ".join(unknown)}.']
+            })
+
+        return fields
+
+    def get_values_serializer(self):
+        """ The list serializer of the requested fields """
+        return self.values_serializer_class(self._get_requested_fields())
+
+    def get_serializer_context(self):
+        """ Passing the requested fields to the serializer """
+        context = super().get_serializer_context()
+        context['fields'] = self._get_requested_fields()
+
+        return context
+
     def get_serializer_class(self):
         """ Return appropraite serializer class """
 
         """ Checking which type of request was made eg: GET, POST, PUT... """
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
-        elif self.action == 'upload_image':
+        elif self.action in ('upload_image', 'image', 'finalize_upload'):
             return serializers.RecipeImageSerializer
+        elif self.action in ('create_upload', 'upload_chunk'):
+            return serializers.ImageUploadSerializer
+        elif self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
 
         return self.serializer_class
 
@@ -126,6 +416,152 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """ What to do if there is a POST request """
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """
+        Creating many recipes at once
+        through 127.0.0.1:8000/api/recipe/recipes/bulk
+        with a list of recipes as the body.
+        Either every recipe is created or none, and the errors are
+        returned per recipe, in the same order as the input.
+        """
+
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.save()
+
+        """
+        Reading back the created recipes for the response,
+        with their relations loaded in one query each.
+        Not through get_queryset: the filters, search and fields
+        of the query string would leave out recipes just created.
+        """
+        queryset = Recipe.objects.filter(
+            user=request.user,
+            id__in=[recipe.id for recipe in recipes]
+        ).prefetch_related('tags', 'ingredients').order_by('id')
+
+        return Response(
+            serializers.RecipeSerializer(queryset, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """
+        Downloading every recipe of the user
+        through 127.0.0.1:8000/api/recipe/recipes/export?output=csv
+        as NDJSON (default) or CSV, with the same filters as the list.
+        The response is streamed while the recipes are read,
+        instead of being built in memory.
+        """
+
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({
+                'output': [f'Must be one of: {", ".join(EXPORT_FORMATS)}.']
+            })
+
+        render, content_type = EXPORT_FORMATS[output]
+
+        response = StreamingHttpResponse(
+            render(export_rows(self.get_queryset())),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{output}"'
+
+        return response
+
+    @action(methods=['GET'], detail=True, url_path='image')
+    def image(self, request, pk=None):
+        """
+        The image of a recipe and its variants, once made
+        through 127.0.0.1:8000/api/recipes/recipe/{id}/image
+        """
+
+        recipe = self.get_object()
+
+        return Response(self.get_serializer(recipe).data)
+
+    def _get_upload(self, upload_id):
+        """ The chunked upload of the recipe in the URL """
+        return get_object_or_404(
+            ImageUpload,
+            pk=upload_id,
+            recipe=self.get_object(),
+            user=self.request.user
+        )
+
+    @action(methods=['POST'], detail=True, url_path='uploads')
+    def create_upload(self, request, pk=None):
+        """
+        Starting a chunked upload of the image of a recipe
+        through 127.0.0.1:8000/api/recipes/recipe/{id}/uploads
+        with the filename, size and sha256 of the file.
+        See recipe.uploads.
+        """
+
+        recipe = self.get_object()
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user, recipe=recipe)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['GET', 'PUT'],
+        detail=True,
+        url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})'
+    )
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """
+        GET: the bytes received, where to resume the upload.
+        PUT: appending the raw body as the next chunk, starting at the
+        Upload-Offset header, checked against the Chunk-SHA256 header
+        if sent. The body is streamed to disk, never parsed.
+        """
+
+        upload = self._get_upload(upload_id)
+
+        if request.method == 'PUT':
+            try:
+                offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except (KeyError, ValueError):
+                raise ValidationError(
+                    'Upload-Offset and Content-Length headers are required.'
+                )
+
+            try:
+                upload = uploads.append_chunk(
+                    upload,
+                    offset,
+                    request.stream,
+                    length,
+                    request.META.get('HTTP_CHUNK_SHA256')
+                )
+            except uploads.UploadConflict as conflict:
+                return Response(
+                    {'detail': conflict.detail, 'received': conflict.received},
+                    status=conflict.status_code
+                )
+
+        return Response(self.get_serializer(upload).data)
+
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path=r'uploads/(?P<upload_id>[0-9a-f-]{36})/finalize'
+    )
+    def finalize_upload(self, request, pk=None, upload_id=None):
+        """ Making the complete upload the image of the recipe """
+
+        recipe = uploads.finalize(self._get_upload(upload_id))
+
+        return Response(self.get_serializer(recipe).data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """
@@ -146,7 +582,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            """ The replaced image is released by recipe.signals """
+            with transaction.atomic():
+                serializer.save()
+
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
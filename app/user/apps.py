@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        """ Connecting the signal receivers of the token cache """
+        import user.signals  # noqa: F401
+
+        """ Registering the system checks of the signed tokens """
+        import user.checks  # noqa: F401
@@ -0,0 +1,236 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from user.tokens import SignedTokenError, verify_access
+
+
+class TokenCache:
+    """
+    In-process LRU cache of the users authenticated by a token,
+    with entries expiring after TOKEN_AUTH_CACHE_TTL seconds,
+    optionally backed by the cache alias TOKEN_AUTH_SHARED_CACHE
+    shared by every process.
+
+    invalidate() removes a token from the cache of this process and from
+    the shared cache. The other processes keep it for the rest of the TTL
+    of their entry at most, which bounds how long a deleted token or
+    a deactivated user stays accepted.
+    The users updated by a queryset instead of save() are invalidated
+    through the users_updated signal of core.models.
+
+    A request reading the token from the database while it's invalidated
+    would cache what it read after the invalidation. The writes are given
+    the generation read before the query, and dropped when an invalidation
+    happened since: in this process, any invalidation; in the shared
+    cache, one of the token, whose generation is stored with the entry
+    and compared when it's read.
+
+    The shared cache holds the user id and is_active only, not the user
+    with its password hash, the user is rebuilt with its other fields
+    deferred (loaded when read).
+    """
+
+    PREFIX = 'token-auth'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._invalidations = 0
+
+    @property
+    def shared(self):
+        alias = getattr(settings, 'TOKEN_AUTH_SHARED_CACHE', None)
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        return f'{self.PREFIX}:{key}'
+
+    def _generation_key(self, key):
+        return f'{self.PREFIX}:generation:{key}'
+
+    def generation(self, key):
+        """ To read before querying the token, then given to set() """
+
+        shared = None
+        if self.shared is not None:
+            shared = self.shared.get(self._generation_key(key), 0)
+
+        with self._lock:
+            return self._invalidations, shared
+
+    def get(self, key):
+        """ The (user, token) of the token key, or None """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if self.shared is not None:
+            found = self.shared.get_many([
+                self._shared_key(key),
+                self._generation_key(key),
+            ])
+            entry = found.get(self._shared_key(key))
+            if entry is not None and \
+                    entry[2] == found.get(self._generation_key(key), 0):
+                user_id, is_active, _ = entry
+                value = self._rebuild(key, user_id, is_active)
+                self._set_local(key, value)
+                return value
+
+        return None
+
+    def _rebuild(self, key, user_id, is_active):
+        """ The (user, token) of a shared entry, the user fields deferred """
+
+        user = get_user_model().from_db(
+            'default',
+            ['id', 'is_active'],
+            [user_id, is_active]
+        )
+        token = Token(key=key, user=user)
+        token._state.adding = False
+
+        return user, token
+
+    def set(self, key, value, generation):
+        """
+        Cache the (user, token) read from the database,
+        unless the token was invalidated since the generation was read
+        """
+
+        local, shared = generation
+        with self._lock:
+            if local != self._invalidations:
+                return
+        self._set_local(key, value)
+
+        if self.shared is not None:
+            user, _ = value
+            self.shared.set(
+                self._shared_key(key),
+                (user.pk, user.is_active, shared),
+                settings.TOKEN_AUTH_SHARED_CACHE_TTL
+            )
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + settings.TOKEN_AUTH_CACHE_TTL,
+                value
+            )
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > settings.TOKEN_AUTH_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._invalidations += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+        if self.shared is not None:
+            self.shared.delete_many([self._shared_key(key) for key in keys])
+            """ Outliving the entries written with the old generation """
+            for key in keys:
+                generation_key = self._generation_key(key)
+                self.shared.add(
+                    generation_key,
+                    0,
+                    2 * settings.TOKEN_AUTH_SHARED_CACHE_TTL
+                )
+                try:
+                    self.shared.incr(generation_key)
+                except ValueError:
+                    self.shared.set(
+                        generation_key,
+                        1,
+                        2 * settings.TOKEN_AUTH_SHARED_CACHE_TTL
+                    )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement of TokenAuthentication that looks up
+    the token and its user in token_cache before the database,
+    saving the token + user query of most requests.
+    The cache is invalidated by user.signals when a token is deleted
+    and when its user is saved (deactivated, new password...).
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            """ Read before the query, see TokenCache """
+            generation = token_cache.generation(key)
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token), generation)
+        else:
+            user, token = cached
+
+        """ Checked again in case the user was cached while active """
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+
+        """
+        A copy for each request: the views can change the user,
+        eg: ManageUserView updating the profile
+        """
+        return copy.copy(user), token
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authentication by the signed access tokens of user.tokens,
+    in the header "Authorization: Bearer <access token>".
+    Only the signature and the deny-list are checked, without a query.
+    Ignored unless SIGNED_TOKENS is enabled.
+    """
+
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        if not settings.SIGNED_TOKENS:
+            return None
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header.')
+
+        try:
+            return verify_access(auth[1].decode())
+        except (SignedTokenError, UnicodeError) as error:
+            raise AuthenticationFailed(str(error))
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from user.tokens import deny_cache_error
+
+
+@register(Tags.security, Tags.caches)
+def check_signed_token_deny_cache(app_configs, **kwargs):
+    """
+    The signed tokens can't be enabled with a deny-list that a logout
+    or a deactivation would only update in one process
+    """
+
+    if not settings.SIGNED_TOKENS:
+        return []
+
+    error = deny_cache_error()
+    if error is None:
+        return []
+
+    return [
+        Error(
+            error,
+            hint='Set SIGNED_TOKEN_DENY_CACHE to the alias of a cache '
+                 'shared by every process (eg: memcached, redis).',
+            id='user.E001',
+        )
+    ]
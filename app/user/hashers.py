@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher with the number of iterations of the setting
+    PASSWORD_HASHER_ITERATIONS, picked by the tune_password_hasher command.
+    The hashes keep their own iterations, the passwords hashed with
+    another number are hashed again at the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHER_ITERATIONS
@@ -0,0 +1,165 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    identify_hasher,
+    make_password,
+)
+from django.core.cache import caches
+from django.utils.translation import ugettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    """
+    Too many passwords hashed or waiting to be hashed.
+    Answered right away, with a Retry-After header.
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins in progress, retry later.')
+    default_code = 'hashing_busy'
+    wait = 1
+
+
+class HashingPool:
+    """
+    The threads hashing the passwords of the login, signup and
+    password change requests: PASSWORD_HASHING_WORKERS threads, with at
+    most PASSWORD_HASHING_MAX_PENDING passwords hashed or waiting
+    in the process, and at most PASSWORD_HASHING_MAX_SHARED_PENDING
+    in every process together when PASSWORD_HASHING_SHARED_CACHE is set.
+
+    A request waits for its hash, but a burst of logins only holds
+    that many request threads (and cores), the others are answered
+    with a 503 at once and keep serving the rest of the API.
+    The limit of the process only sheds when it's below the request
+    threads of the process, single-threaded workers need the shared one.
+    Only the hashing runs in the threads, the database is queried by
+    the request, in its own connection and transaction.
+    """
+
+    SHARED_KEY = 'password-hashing:pending'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    def _get_executor(self):
+        """ Created on first use, in the process serving the requests """
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                thread_name_prefix='password-hashing'
+            )
+
+        return self._executor
+
+    @property
+    def shared(self):
+        alias = settings.PASSWORD_HASHING_SHARED_CACHE
+        return caches[alias] if alias else None
+
+    def _acquire_shared(self):
+        """
+        Counting the hash in the cache shared by the processes.
+        The counter expires, in case a process dies while hashing.
+        """
+
+        if self.shared is None:
+            return
+
+        self.shared.add(
+            self.SHARED_KEY,
+            0,
+            settings.PASSWORD_HASHING_SHARED_TIMEOUT
+        )
+        try:
+            pending = self.shared.incr(self.SHARED_KEY)
+        except ValueError:
+            """ Expired meanwhile """
+            pending = 1
+            self.shared.set(
+                self.SHARED_KEY,
+                pending,
+                settings.PASSWORD_HASHING_SHARED_TIMEOUT
+            )
+
+        if pending > settings.PASSWORD_HASHING_MAX_SHARED_PENDING:
+            self._release_shared()
+            raise HashingBusy()
+
+    def _release_shared(self):
+        if self.shared is None:
+            return
+
+        try:
+            self.shared.decr(self.SHARED_KEY)
+        except ValueError:
+            pass
+
+    def run(self, func, *args):
+        """ The result of func(*args) run in the pool, or HashingBusy """
+
+        with self._lock:
+            if self._pending >= settings.PASSWORD_HASHING_MAX_PENDING:
+                raise HashingBusy()
+            self._pending += 1
+            executor = self._get_executor()
+
+        try:
+            self._acquire_shared()
+            try:
+                return executor.submit(func, *args).result()
+            finally:
+                self._release_shared()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+hashing_pool = HashingPool()
+
+
+def hash_password(password):
+    """ make_password() in the pool """
+    return hashing_pool.run(make_password, password)
+
+
+def authenticate_user(email, password):
+    """
+    The active user with the email and password, or None.
+    Same checks as ModelBackend.authenticate(), with the password
+    hashes computed in the pool.
+    """
+
+    UserModel = get_user_model()
+    try:
+        user = UserModel._default_manager.get_by_natural_key(email)
+    except UserModel.DoesNotExist:
+        """
+        Hashing anyway, so the response time doesn't tell
+        whether the email exists
+        """
+        hash_password(password)
+        return None
+
+    if not hashing_pool.run(check_password, password, user.password):
+        return None
+
+    """ Hashing again with the current hasher and iterations if needed """
+    hasher = identify_hasher(user.password)
+    if hasher.algorithm != get_hasher().algorithm or \
+            hasher.must_update(user.password):
+        user.password = hash_password(password)
+        user.save(update_fields=['password'])
+
+    return user if user.is_active else None
@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+    token_cache,
+)
+from user.tokens import issue_tokens
+
+
+class Command(BaseCommand):
+    """
+    Django command to compare the cost per request of authenticating
+    with the database tokens, the cached database tokens
+    and the signed access tokens.
+    The user and its tokens are created in a transaction that is rolled
+    back, and the deny-list of the signed tokens is the configured one.
+    """
+
+    help = 'Benchmark the token authentication classes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Number of requests authenticated by each class',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic(), override_settings(SIGNED_TOKENS=True):
+            user = get_user_model().objects.create_user(
+                'benchmark-token-auth@localhost'
+            )
+            token = Token.objects.create(user=user)
+            access = issue_tokens(user)['access']
+            token_cache.clear()
+
+            classes = (
+                (TokenAuthentication, f'Token {token.key}'),
+                (CachedTokenAuthentication, f'Token {token.key}'),
+                (SignedTokenAuthentication, f'Bearer {access}'),
+            )
+            for authentication_class, header in classes:
+                self._report(
+                    authentication_class,
+                    header,
+                    options['requests']
+                )
+
+            transaction.set_rollback(True)
+
+    def _report(self, authentication_class, header, requests):
+        """ Time and queries per request of authenticating with the class """
+
+        request = Request(
+            APIRequestFactory().get('/', HTTP_AUTHORIZATION=header)
+        )
+        authentication = authentication_class()
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(requests):
+                authentication.authenticate(request)
+            elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f'{authentication_class.__name__}: '
+            f'{elapsed / requests * 1e6:.1f} us/request, '
+            f'{len(queries) / requests:.2f} queries/request'
+        )
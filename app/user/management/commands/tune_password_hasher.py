@@ -0,0 +1,82 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Django command to pick the PBKDF2 iterations of
+    PASSWORD_HASHER_ITERATIONS hashing a password in a target time
+    on this machine, never below a minimum.
+    """
+
+    help = 'Pick the password hasher iterations for a target latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target-ms',
+            type=float,
+            default=100,
+            help='Time of hashing a password, in milliseconds',
+        )
+        parser.add_argument(
+            '--min-iterations',
+            type=int,
+            default=100000,
+            help='Fewest iterations picked, whatever the time',
+        )
+        parser.add_argument(
+            '--sample-iterations',
+            type=int,
+            default=50000,
+            help='Iterations of the hashes timed',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of hashes timed, the fastest one is used',
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        sample = options['sample_iterations']
+        seconds = self._time(sample, options['repeat'])
+
+        """ The time is proportional to the iterations """
+        iterations = int(
+            options['target_ms'] / 1000 / (seconds / sample) // 1000 * 1000
+        )
+        if iterations < options['min_iterations']:
+            self.stdout.write(self.style.WARNING(
+                f'{iterations} iterations are below the minimum, '
+                f'using {options["min_iterations"]}'
+            ))
+            iterations = options['min_iterations']
+
+        elapsed = self._time(iterations, 1) * 1000
+        current = settings.PASSWORD_HASHER_ITERATIONS
+        self.stdout.write(
+            f'Current: {current} iterations, '
+            f'{self._time(current, 1) * 1000:.0f} ms per hash'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'PASSWORD_HASHER_ITERATIONS={iterations} '
+            f'({elapsed:.0f} ms per hash)'
+        ))
+
+    def _time(self, iterations, repeat):
+        """ Fastest time of hashing a password, in seconds """
+
+        hasher = PBKDF2PasswordHasher()
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            hasher.encode('password', hasher.salt(), iterations)
+            elapsed = time.perf_counter() - started
+
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best
@@ -1,9 +1,12 @@
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
+from django.db import transaction
 """ Using a translation text file when outputting messages to the user """
 from django.utils.translation import ugettext_lazy as _
 
 from rest_framework import serializers
 
+from user.hashing import authenticate_user, hash_password
+
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -35,7 +38,19 @@ class UserSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """ Create a new user with encypted password and return it """
-        return get_user_model().objects.create_user(**validated_data)
+
+        """
+        Hashing the password in the pool of user.hashing,
+        the user is created without one and updated
+        """
+        password = hash_password(validated_data.pop('password'))
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(**validated_data)
+            user.password = password
+            user.save(update_fields=['password'])
+
+        return user
 
     def update(self, instance, validated_data):
         """
@@ -57,7 +72,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            user.password = hash_password(password)
             user.save()
 
         return user
@@ -85,12 +100,10 @@ class AuthTokenSerializer(serializers.Serializer):
         password = attrs.get('password')
 
         """
-        Authenticating the POST fields
+        Authenticating the POST fields,
+        hashing the password in the pool of user.hashing
         """
-        user = authenticate(
-            username=email,
-            password=password
-        )
+        user = authenticate_user(email, password)
 
         if not user:
             """
@@ -102,3 +115,9 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = user
 
         return attrs  # Must return attrs in validate()
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """ Serializer for the refresh token of a signed token session """
+
+    refresh = serializers.CharField(trim_whitespace=False)
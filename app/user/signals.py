@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.models import users_updated
+
+from user.authentication import token_cache
+from user.tokens import revoke_user
+
+
+def _invalidate(*keys):
+    """
+    Forgetting the tokens right away and again on commit,
+    in case a concurrent request cached them before the commit
+    """
+    token_cache.invalidate(*keys)
+    transaction.on_commit(lambda: token_cache.invalidate(*keys))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    _invalidate(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, update_fields, **kwargs):
+    """
+    The cached user of the tokens can be deactivated, have a new password
+    or a new profile. Updating the last login only changes nothing.
+    """
+
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+
+    keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    if keys:
+        _invalidate(*keys)
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_inactive_user_tokens(sender, instance, **kwargs):
+    """
+    The signed access tokens of a deactivated user are valid
+    until they expire, unless denied
+    """
+
+    if not instance.is_active:
+        revoke_user(instance.pk)
+
+
+@receiver(users_updated, sender=get_user_model())
+def invalidate_updated_users_tokens(sender, user_ids, fields, **kwargs):
+    """
+    Same as the receivers of post_save, for the users updated in bulk
+    """
+
+    keys = list(
+        Token.objects.filter(user__in=user_ids).values_list('key', flat=True)
+    )
+    if keys:
+        _invalidate(*keys)
+
+    if 'is_active' in fields:
+        for user_id in get_user_model().objects.filter(
+            pk__in=user_ids,
+            is_active=False
+        ).values_list('pk', flat=True):
+            revoke_user(user_id)
@@ -0,0 +1,220 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, token_cache
+
+
+ME_URL = reverse('user:me')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """ Test the token authentication served from the cache """
+
+    def setUp(self):
+        token_cache.clear()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass',
+            name='Test name'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _status(self, url=ME_URL):
+        return self.client.get(url).status_code
+
+    def test_cached_token_saves_the_query(self):
+        """ Test only the first request looks up the token """
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._status(), status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['email'], self.user.email)
+
+        """ Shared with the recipe API, which reads the data version """
+        with self.assertNumQueries(2):
+            self.assertEqual(self._status(TAGS_URL), status.HTTP_200_OK)
+
+    def test_invalid_token(self):
+        """ Test an unknown token is rejected, and never cached """
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token unknown')
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                self.assertEqual(self._status(), status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """ Test deleting the token invalidates it right away """
+
+        self._status()
+
+        self.token.delete()
+
+        self.assertEqual(self._status(), status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """ Test deactivating the user invalidates the token """
+
+        self._status()
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self._status(), status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_deactivated_user_rejected(self):
+        """ Test a queryset update, eg: an admin action, invalidates too """
+
+        self._status()
+
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+
+        self.assertEqual(self._status(), status.HTTP_401_UNAUTHORIZED)
+
+    def test_data_version_update_keeps_cache(self):
+        """ Test the data version bumps don't empty the cache """
+
+        self._status()
+
+        get_user_model().objects.bump_data_version([self.user.pk])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self._status(), status.HTTP_200_OK)
+
+    def test_password_change_invalidates(self):
+        """ Test a new password or profile is read again """
+
+        self._status()
+
+        res = self.client.patch(ME_URL, {'name': 'New name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['name'], 'New name')
+
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with self.assertNumQueries(1):
+            self._status()
+
+    def test_entries_expire(self):
+        """ Test the token is looked up again after the TTL """
+
+        with patch('user.authentication.time.monotonic', return_value=0):
+            self._status()
+
+        with patch('user.authentication.time.monotonic', return_value=31):
+            with self.assertNumQueries(1):
+                self._status()
+
+    @override_settings(TOKEN_AUTH_CACHE_SIZE=1)
+    def test_least_recently_used_evicted(self):
+        """ Test the cache keeps the most recently used tokens only """
+
+        user2 = get_user_model().objects.create_user(
+            'other@londonappdev.com',
+            'testpass'
+        )
+        token2 = Token.objects.create(user=user2)
+
+        self._status()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token2.key}')
+        self._status()
+
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertIsNotNone(token_cache.get(token2.key))
+
+    @override_settings(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'tokens': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'token-auth-tests',
+            },
+        },
+        TOKEN_AUTH_SHARED_CACHE='tokens'
+    )
+    def test_shared_cache(self):
+        """ Test a process reads the tokens cached by the others """
+
+        caches['tokens'].clear()
+
+        self._status()
+
+        """ No password hash in the shared cache """
+        self.assertEqual(
+            caches['tokens'].get(f'token-auth:{self.token.key}'),
+            (self.user.pk, True, 0)
+        )
+
+        """ Another process, with its own empty cache """
+        token_cache.clear()
+        with self.assertNumQueries(0):
+            user, token = CachedTokenAuthentication() \
+                .authenticate_credentials(self.token.key)
+        self.assertEqual((user.pk, token.key), (self.user.pk, self.token.key))
+
+        """ The other fields of the user are loaded when read """
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], self.user.email)
+
+        token_cache.clear()
+        self.token.delete()
+        self.assertEqual(self._status(), status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'tokens': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'token-auth-tests',
+            },
+        },
+        TOKEN_AUTH_SHARED_CACHE='tokens'
+    )
+    def test_write_after_invalidation_dropped(self):
+        """
+        Test a request that read the token before an invalidation
+        doesn't cache it afterwards, in this process or the shared cache
+        """
+
+        caches['tokens'].clear()
+
+        generation = token_cache.generation(self.token.key)
+        stale = (self.user, self.token)
+
+        token_cache.invalidate(self.token.key)
+        token_cache.set(self.token.key, stale, generation)
+
+        self.assertIsNone(token_cache.get(self.token.key))
+
+        """ Written by another process, which saw no invalidation """
+        caches['tokens'].set(
+            f'token-auth:{self.token.key}',
+            (self.user.pk, True, generation[1])
+        )
+        self.assertIsNone(token_cache.get(self.token.key))
@@ -0,0 +1,206 @@
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.hashing import HashingBusy, hashing_pool
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+
+class PasswordHashingTests(TestCase):
+    """ Test the passwords hashed in the pool of user.hashing """
+
+    def setUp(self):
+        self.client = APIClient()
+
+        self.payload = {
+            'email': 'test@londonappdev.com',
+            'password': 'testpass',
+            'name': 'Test name',
+        }
+
+    def test_signup_and_login(self):
+        """ Test the password hashed in the pool is checked in the pool """
+
+        res = self.client.post(CREATE_USER_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        user = get_user_model().objects.get(email=self.payload['email'])
+        self.assertTrue(user.check_password('testpass'))
+
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertIn('token', res.data)
+
+        res = self.client.post(
+            TOKEN_URL,
+            {**self.payload, 'password': 'wrong'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_inactive_user(self):
+        """ Test an inactive user can't log in """
+
+        get_user_model().objects.create_user(**self.payload, is_active=False)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_rehashes_with_new_iterations(self):
+        """ Test a login hashes the password with the tuned iterations """
+
+        user = get_user_model().objects.create_user(**self.payload)
+
+        with override_settings(PASSWORD_HASHER_ITERATIONS=1000):
+            res = self.client.post(TOKEN_URL, self.payload)
+        self.assertIn('token', res.data)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertTrue(user.check_password('testpass'))
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=0)
+    def test_busy_pool_sheds(self):
+        """ Test the logins and signups are answered 503 when busy """
+
+        for url in (TOKEN_URL, CREATE_USER_URL):
+            res = self.client.post(url, self.payload)
+
+            self.assertEqual(
+                res.status_code,
+                status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+            self.assertEqual(res['Retry-After'], '1')
+
+        self.assertFalse(get_user_model().objects.exists())
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=1)
+    def test_pending_limit(self):
+        """ Test the hashes beyond the limit are refused at once """
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_hash():
+            started.set()
+            release.wait(5)
+
+        thread = threading.Thread(target=hashing_pool.run, args=(slow_hash,))
+        thread.start()
+        started.wait(5)
+
+        try:
+            with self.assertRaises(HashingBusy):
+                hashing_pool.run(str, 'password')
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(hashing_pool.run(str, 'password'), 'password')
+
+    def _concurrent_logins(self, count):
+        """
+        Status of the count concurrent logins, the hashes blocking
+        until the logins refused have been answered
+        """
+
+        hashing = []
+        release = threading.Event()
+        results = []
+
+        def slow_hash(password):
+            hashing.append(password)
+            release.wait(5)
+            return 'hash'
+
+        def login():
+            try:
+                res = APIClient().post(TOKEN_URL, {
+                    'email': 'unknown@londonappdev.com',
+                    'password': 'testpass',
+                })
+                results.append(res.status_code)
+            finally:
+                connection.close()
+
+        with patch('user.hashing.make_password', slow_hash):
+            threads = [threading.Thread(target=login) for _ in range(count)]
+            for thread in threads:
+                thread.start()
+
+            try:
+                """ The logins hashing wait, the others are answered """
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline and \
+                        len(results) + len(hashing) < count:
+                    time.sleep(0.01)
+                shed = list(results)
+            finally:
+                release.set()
+                for thread in threads:
+                    thread.join()
+
+        return shed, results
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=2)
+    def test_concurrent_logins_shed(self):
+        """ Test a burst of logins holds only the request limit """
+
+        shed, results = self._concurrent_logins(5)
+
+        self.assertEqual(shed, [status.HTTP_503_SERVICE_UNAVAILABLE] * 3)
+        self.assertEqual(
+            sorted(results),
+            [status.HTTP_400_BAD_REQUEST] * 2 +
+            [status.HTTP_503_SERVICE_UNAVAILABLE] * 3
+        )
+
+    @override_settings(
+        PASSWORD_HASHING_MAX_PENDING=10,
+        PASSWORD_HASHING_SHARED_CACHE='default',
+        PASSWORD_HASHING_MAX_SHARED_PENDING=1
+    )
+    def test_shared_limit(self):
+        """
+        Test the limit of every process together, eg: of single-threaded
+        workers, counted in the shared cache
+        """
+
+        caches['default'].delete(hashing_pool.SHARED_KEY)
+
+        shed, results = self._concurrent_logins(3)
+
+        self.assertEqual(shed, [status.HTTP_503_SERVICE_UNAVAILABLE] * 2)
+        self.assertEqual(
+            results.count(status.HTTP_400_BAD_REQUEST),
+            1
+        )
+        self.assertEqual(caches['default'].get(hashing_pool.SHARED_KEY), 0)
+
+    def test_tune_command(self):
+        """ Test the command picks iterations above the minimum """
+
+        out = StringIO()
+        call_command(
+            'tune_password_hasher',
+            target_ms=1,
+            min_iterations=2000,
+            sample_iterations=1000,
+            repeat=1,
+            stdout=out
+        )
+
+        self.assertIn('PASSWORD_HASHER_ITERATIONS=2000 ', out.getvalue())
@@ -0,0 +1,255 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.checks import run_checks
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+SIGNED_TOKEN_URL = reverse('user:signed-token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+"""
+The deny-list in a cache shared by the processes, a directory
+"""
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'signed-tokens': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(
+            tempfile.gettempdir(),
+            'recipe-app-signed-token-tests'
+        ),
+    },
+}
+
+
+@override_settings(
+    SIGNED_TOKENS=True,
+    CACHES=SHARED_CACHES,
+    SIGNED_TOKEN_DENY_CACHE='signed-tokens'
+)
+class SignedTokenTests(TestCase):
+    """ Test the signed access and refresh tokens """
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['signed-tokens'].clear()
+
+        self.client = APIClient()
+
+        self.user = get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass',
+            name='Test name'
+        )
+
+    def _login(self):
+        res = self.client.post(
+            SIGNED_TOKEN_URL,
+            {'email': 'test@londonappdev.com', 'password': 'testpass'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        return res.data
+
+    def _get(self, access, url=RECIPES_URL):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_access_token_without_query(self):
+        """ Test the user of an access token is not queried """
+
+        access = self._login()['access']
+
+        """ The data version of the ETag and the list, no user query """
+        with self.assertNumQueries(2):
+            res = self._get(access)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        """ The fields missing from the token are loaded when read """
+        res = self._get(access, ME_URL)
+        self.assertEqual(res.data['name'], 'Test name')
+
+    def test_invalid_credentials(self):
+        """ Test no tokens are issued for a wrong password """
+
+        res = self.client.post(
+            SIGNED_TOKEN_URL,
+            {'email': 'test@londonappdev.com', 'password': 'wrong'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', res.data)
+
+    def test_tampered_or_expired_access_token(self):
+        """ Test a modified or expired access token is rejected """
+
+        tokens = self._login()
+
+        res = self._get(tokens['access'][:-1] + 'x')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        res = self._get(tokens['refresh'])
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with patch('django.core.signing.time.time', return_value=10 ** 10):
+            res = self._get(tokens['access'])
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh(self):
+        """ Test a refresh token issues new access tokens """
+
+        tokens = self._login()
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self._get(res.data['access']).status_code,
+            status.HTTP_200_OK
+        )
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['access']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_new_password_ends_refresh(self):
+        """ Test the refresh tokens issued before a new password fail """
+
+        tokens = self._login()
+
+        self.user.set_password('newpass')
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke(self):
+        """ Test revoking a session denies its access and refresh tokens """
+
+        tokens = self._login()
+        other = self._login()
+
+        res = self.client.post(REVOKE_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertEqual(
+            self._get(tokens['access']).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        """ The other sessions of the user are kept """
+        self.assertEqual(
+            self._get(other['access']).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_deactivated_user(self):
+        """ Test the tokens of a deactivated user are denied """
+
+        tokens = self._login()
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(
+            self._get(tokens['access']).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_deactivated_user(self):
+        """ Test the tokens of users deactivated in bulk are denied """
+
+        tokens = self._login()
+
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+
+        self.assertEqual(
+            self._get(tokens['access']).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
+
+    def test_benchmark_command(self):
+        """ Test the benchmark reports every authentication class """
+
+        out = StringIO()
+        call_command('benchmark_token_auth', requests=5, stdout=out)
+
+        for name in ('TokenAuthentication', 'CachedTokenAuthentication',
+                     'SignedTokenAuthentication'):
+            self.assertIn(f'\n{name}: ', '\n' + out.getvalue())
+
+
+class SignedTokensDisabledTests(TestCase):
+    """ Test the signed tokens are opt-in """
+
+    def test_endpoints_not_found(self):
+        """ Test the endpoints are not found by default """
+
+        get_user_model().objects.create_user(
+            'test@londonappdev.com',
+            'testpass'
+        )
+
+        res = APIClient().post(
+            SIGNED_TOKEN_URL,
+            {'email': 'test@londonappdev.com', 'password': 'testpass'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SIGNED_TOKENS=True, SIGNED_TOKEN_DENY_CACHE=None)
+class SignedTokenDenyCacheCheckTests(TestCase):
+    """ Test the signed tokens require a deny-list shared by the processes """
+
+    def _errors(self):
+        return [
+            message.id for message in run_checks()
+            if message.id.startswith('user.')
+        ]
+
+    def test_deny_cache_required(self):
+        """ Test the system check and the endpoints refuse a missing cache """
+
+        self.assertEqual(self._errors(), ['user.E001'])
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.post(
+                SIGNED_TOKEN_URL,
+                {'email': 'test@londonappdev.com', 'password': 'testpass'}
+            )
+
+    def test_per_process_cache_refused(self):
+        """ Test a cache of each process is refused, a shared one accepted """
+
+        with override_settings(SIGNED_TOKEN_DENY_CACHE='default'):
+            self.assertEqual(self._errors(), ['user.E001'])
+
+        with override_settings(
+            CACHES=SHARED_CACHES,
+            SIGNED_TOKEN_DENY_CACHE='signed-tokens'
+        ):
+            self.assertEqual(self._errors(), [])
+
+        with override_settings(SIGNED_TOKENS=False):
+            self.assertEqual(self._errors(), [])
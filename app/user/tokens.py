@@ -0,0 +1,208 @@
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+"""
+Signed tokens, verified without the database (see SIGNED_TOKENS).
+
+A login issues a refresh token and a short lived access token, sharing
+a session id. The access token holds the user fields most requests need,
+the refresh token holds a fingerprint of the password hash so a new
+password ends the session at the next refresh.
+
+The deny-list only holds the revoked sessions and the users revoked
+as a whole (deactivated), each entry expiring with the last refresh token
+it can match, in the cache alias of SIGNED_TOKEN_DENY_CACHE.
+"""
+ACCESS_SALT = 'user.tokens.access'
+REFRESH_SALT = 'user.tokens.refresh'
+PREFIX = 'signed-token:deny'
+
+"""
+The user fields held by the access tokens.
+The other fields are loaded from the database when a view reads them.
+"""
+USER_CLAIMS = ('id', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+""" Cache backends that can't hold the deny-list """
+PER_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+class SignedTokenError(Exception):
+    """ Invalid, expired or revoked signed token """
+
+
+def deny_cache_error():
+    """
+    Why SIGNED_TOKEN_DENY_CACHE can't hold the deny-list, or None.
+    A revocation must be seen by every process, so the cache can't be
+    one of each process.
+    """
+
+    alias = settings.SIGNED_TOKEN_DENY_CACHE
+    if not alias:
+        return 'SIGNED_TOKEN_DENY_CACHE is not set.'
+
+    try:
+        cache = caches[alias]
+    except InvalidCacheBackendError:
+        return f'SIGNED_TOKEN_DENY_CACHE {alias!r} is not in CACHES.'
+
+    if isinstance(cache, PER_PROCESS_CACHES):
+        return (
+            f'SIGNED_TOKEN_DENY_CACHE {alias!r} is not shared by '
+            f'the processes ({type(cache).__name__}).'
+        )
+
+    return None
+
+
+def _deny_cache():
+    """ Failing closed when the deny-list wouldn't be seen by every process """
+
+    error = deny_cache_error()
+    if error is not None:
+        raise ImproperlyConfigured(error)
+
+    return caches[settings.SIGNED_TOKEN_DENY_CACHE]
+
+
+def _password_fingerprint(user):
+    return salted_hmac(REFRESH_SALT, user.password).hexdigest()[:16]
+
+
+def issue_tokens(user):
+    """ A new session of the user: its access and refresh tokens """
+
+    sid = uuid.uuid4().hex
+    refresh = signing.dumps(
+        {
+            'uid': user.pk,
+            'sid': sid,
+            'iat': time.time(),
+            'pwd': _password_fingerprint(user),
+        },
+        salt=REFRESH_SALT
+    )
+
+    return {'access': _access_token(user, sid), 'refresh': refresh}
+
+
+def _access_token(user, sid):
+    return signing.dumps(
+        {
+            'user': [getattr(user, name) for name in USER_CLAIMS],
+            'sid': sid,
+            'iat': time.time(),
+        },
+        salt=ACCESS_SALT
+    )
+
+
+def _load(token, salt, max_age):
+    try:
+        payload = signing.loads(token, salt=salt, max_age=max_age)
+    except signing.BadSignature:
+        raise SignedTokenError('Invalid or expired token.')
+
+    denied = _deny_cache().get_many([
+        f'{PREFIX}:session:{payload["sid"]}',
+        f'{PREFIX}:user:{_user_id(payload)}',
+    ])
+    revoked_at = denied.get(f'{PREFIX}:user:{_user_id(payload)}')
+    if f'{PREFIX}:session:{payload["sid"]}' in denied or \
+            (revoked_at is not None and revoked_at >= payload['iat']):
+        raise SignedTokenError('Revoked token.')
+
+    return payload
+
+
+def _user_id(payload):
+    return payload['uid'] if 'uid' in payload else payload['user'][0]
+
+
+def verify_access(token):
+    """
+    The user of an access token, built from the token without a query.
+    Raises SignedTokenError.
+    """
+
+    payload = _load(token, ACCESS_SALT, settings.SIGNED_TOKEN_ACCESS_TTL)
+
+    """ from_db() takes the loaded fields in the order of the model """
+    claims = dict(zip(USER_CLAIMS, payload['user']))
+    names = [
+        field.attname
+        for field in get_user_model()._meta.concrete_fields
+        if field.attname in claims
+    ]
+
+    user = get_user_model().from_db(
+        'default',
+        names,
+        [claims[name] for name in names]
+    )
+
+    return user, payload
+
+
+def refresh_access(token):
+    """
+    A new access token of the session of a refresh token,
+    if the user is still active with the same password.
+    Raises SignedTokenError.
+    """
+
+    payload = _load(token, REFRESH_SALT, settings.SIGNED_TOKEN_REFRESH_TTL)
+
+    user = get_user_model().objects.filter(
+        pk=payload['uid'],
+        is_active=True
+    ).first()
+    if user is None or not constant_time_compare(
+            payload['pwd'], _password_fingerprint(user)):
+        raise SignedTokenError('Invalid or expired token.')
+
+    return _access_token(user, payload['sid'])
+
+
+def revoke_session(token):
+    """
+    Deny the session of a refresh token, until its refresh token expires.
+    Raises SignedTokenError.
+    """
+
+    payload = _load(token, REFRESH_SALT, settings.SIGNED_TOKEN_REFRESH_TTL)
+
+    remaining = payload['iat'] + settings.SIGNED_TOKEN_REFRESH_TTL - \
+        time.time()
+    _deny_cache().set(
+        f'{PREFIX}:session:{payload["sid"]}',
+        True,
+        max(int(remaining) + 1, 1)
+    )
+
+
+def revoke_user(user_id):
+    """
+    Deny every token of the user issued until now.
+    Nothing to deny while the signed tokens are disabled.
+    """
+
+    if not settings.SIGNED_TOKENS:
+        return
+
+    _deny_cache().set(
+        f'{PREFIX}:user:{user_id}',
+        time.time(),
+        settings.SIGNED_TOKEN_REFRESH_TTL
+    )
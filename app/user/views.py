@@ -1,7 +1,23 @@
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
-from user.serializer import UserSerializer, AuthTokenSerializer
+from rest_framework.views import APIView
+
+from user import tokens
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from user.serializer import (
+    UserSerializer,
+    AuthTokenSerializer,
+    RefreshTokenSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -24,6 +40,76 @@ class CreateTokenView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class SignedTokenView(APIView):
+    """
+    Base view of the signed tokens endpoints,
+    only found when SIGNED_TOKENS is enabled
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+    serializer_class = RefreshTokenSerializer
+
+    def initial(self, request, *args, **kwargs):
+        if not settings.SIGNED_TOKENS:
+            raise NotFound()
+
+        """ No tokens that couldn't be revoked, see user.checks """
+        error = tokens.deny_cache_error()
+        if error is not None:
+            raise ImproperlyConfigured(error)
+
+        super().initial(request, *args, **kwargs)
+
+    def get_authenticate_header(self, request):
+        """ Answering 401 to the invalid refresh tokens """
+        return SignedTokenAuthentication.keyword
+
+    def validated_data(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        return serializer.validated_data
+
+
+class CreateSignedTokenView(SignedTokenView):
+    """ Create the access and refresh tokens of a new session """
+
+    serializer_class = AuthTokenSerializer
+
+    def post(self, request):
+        user = self.validated_data(request)['user']
+        return Response(tokens.issue_tokens(user))
+
+
+class RefreshSignedTokenView(SignedTokenView):
+    """ Create a new access token from a refresh token """
+
+    def post(self, request):
+        refresh = self.validated_data(request)['refresh']
+
+        try:
+            access = tokens.refresh_access(refresh)
+        except tokens.SignedTokenError as error:
+            raise AuthenticationFailed(str(error))
+
+        return Response({'access': access})
+
+
+class RevokeSignedTokenView(SignedTokenView):
+    """ End the session of a refresh token, and of its access tokens """
+
+    def post(self, request):
+        refresh = self.validated_data(request)['refresh']
+
+        try:
+            tokens.revoke_session(refresh)
+        except tokens.SignedTokenError as error:
+            raise AuthenticationFailed(str(error))
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """
     RetrieveUpdateAPIView -> Used for read or update endpoints
@@ -42,7 +128,10 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     """
     How the authentication will be made eg: Cookie, session, token.
     """
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
 
     def get_object(self):
         """